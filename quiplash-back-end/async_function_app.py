@@ -0,0 +1,406 @@
+"""
+Async variant of the eight endpoints, served under "aio/" (e.g. aio/player/register),
+plus aio/utils/stream which streams utils/get's prompts back as NDJSON, and aio/prompt/suggest_stream
+which streams a suggestion back as server-sent events while it's generated.
+Requests and responses are the same as function_app.py's, but every Cosmos, translator and
+OpenAI call is awaited, so a worker keeps serving other requests during network waits.
+Only registered on the app in function_app.py when the AsyncRoutes app setting is "true".
+"""
+import os
+import json
+import contextvars
+import azure.functions as func
+from azure.cosmos.aio import CosmosClient
+from azure.ai.translation.text.aio import TextTranslationClient
+from azure.core.credentials import AzureKeyCredential
+from azurefunctions.extensions.http.fastapi import Request, StreamingResponse
+
+# shared_code folder helper functions and classes
+from shared_code.player import player, UniquePlayerError, InvalidPlayerError, InvalidPasswordError
+from shared_code.prompt import prompt, UnsupportedLanguageError, InvalidTextError, NonExistingPlayerError, TranslationError
+from shared_code.open_ai import open_ai, ResponseError
+from shared_code.async_utils import async_utils
+from shared_code.utils import TooManyConflictsError
+from shared_code.translation_cache import translation_cache
+from shared_code.clients import clients
+from shared_code.shared_state import podiums, suggestions
+from shared_code.request_log import request_log
+from shared_code.metrics import metrics, tagged
+
+bp = func.Blueprint()
+telemetry = metrics()                                                                           # Request charge and latency of every Cosmos call
+
+# Every client below is only built on its first use (inside the event loop), see shared_code/clients.py.
+registry = clients()
+registry.register("transport", registry.get_async_transport)                                    # Connection pool shared by the async Azure clients
+AsyncCosmos = registry.register("cosmos", lambda: CosmosClient.from_connection_string(           # Async Cosmos Object
+    os.environ['AzureCosmosDBConnectionString'], transport=registry.get("transport")))
+QuiplashProxy = registry.register("database", lambda: AsyncCosmos.get_database_client(os.environ['DatabaseName'])) # Proxy for quiplash database
+PlayerContainerProxy = registry.register("player_container", lambda: telemetry.instrument_async(QuiplashProxy.get_container_client(os.environ['PlayerContainerName']))) # Proxy for player container
+PromptContainerProxy = registry.register("prompt_container", lambda: telemetry.instrument_async(QuiplashProxy.get_container_client(os.environ['PromptContainerName']))) # Proxy for prompt container
+LeaderboardContainerProxy = registry.register("leaderboard_container", lambda: telemetry.instrument_async(QuiplashProxy.get_container_client(os.environ['LeaderboardContainerName']))) # Proxy for leaderboard container
+PromptIndexContainerProxy = (registry.register("prompt_index_container", lambda: telemetry.instrument_async(QuiplashProxy.get_container_client(os.environ['PromptIndexContainerName']))) # Optional proxy for per-language prompt index
+                             if os.environ.get('PromptIndexContainerName') else None)
+TranslatorProxy = registry.register("translator", lambda: TextTranslationClient(endpoint=os.environ['TranslationEndpoint'], # Proxy for translator
+                                                                                credential=AzureKeyCredential(os.environ['TranslationKey']),
+                                                                                transport=registry.get("transport")))
+TranslationCacheProxy = (registry.register("translation_cache_container", lambda: telemetry.instrument_async(QuiplashProxy.get_container_client(os.environ['TranslationCacheContainerName']))) # Optional proxy for shared translation cache
+                         if os.environ.get('TranslationCacheContainerName') else None)
+CachedTranslatorProxy = translation_cache(TranslatorProxy, cache_proxy=TranslationCacheProxy,    # Proxy for translator behind the cache
+                                          max_entries=int(os.environ.get('TranslationCacheSize', '1024')),
+                                          ttl=int(os.environ.get('TranslationCacheTTL', '86400')))
+
+def get_openai_client():
+    """
+    openai (and pydantic) takes a while to import, and only prompt/suggest needs it.
+    """
+    from openai import AsyncAzureOpenAI
+    return AsyncAzureOpenAI(api_key=os.environ['OAIKey'], api_version="2024-02-01",
+                            azure_endpoint=os.environ['OAIEndpoint'],
+                            azure_deployment="gpt-35-turbo",
+                            http_client=registry.get_async_http_client()
+                            )
+
+OpenAIProxy = registry.register("openai", get_openai_client)                                   # Proxy for Open_AI
+
+log = request_log()
+utility = async_utils()
+oai = open_ai()
+
+
+@bp.route(route="aio/player/register", methods=[func.HttpMethod.POST], auth_level=func.AuthLevel.FUNCTION)
+@tagged
+async def player_register_async(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    Recieves a player's username and password in a JSON string to register to player container.
+    e.g. {"username":  "antoni_gn" , "password" : "ILoveTricia"}
+    """
+    input = req.get_json()
+    log.request('Python HTTP trigger function processed an async PLAYER_REGISTER request: %s', log.payload(input))
+
+    # Converted to player object for validation.
+    input_player = player(player_proxy=PlayerContainerProxy,username=input['username'], password=input['password'])
+
+    try:
+        # Lengths are checked locally, then the player is created in one write that fails if the username is taken.
+        if await input_player.register_async():
+            log.info("SUCCESS: Input player is valid and was created.")
+
+            # New players start on 0 ppgr, which may be a podium tier.
+            new_entry = {"username": input_player.username, "games_played": input_player.games_played, "total_score": input_player.total_score}
+            await utility.update_leaderboard(PlayerContainerProxy, LeaderboardContainerProxy, [new_entry])
+            podiums.invalidate()
+            return func.HttpResponse(body=json.dumps({"result": True, "msg": "OK"}),mimetype="application/json")
+
+    # Send error messages based on register_async()'s result.
+    except UniquePlayerError as e:
+        log.info("FAILURE: %s", e)
+        response_body = json.dumps({"result": False, "msg": "Username already exists"})
+        return func.HttpResponse(body=response_body,mimetype="application/json")
+
+    except InvalidPlayerError as e:
+        log.info("FAILURE: %s", e)
+        response_body = json.dumps({"result": False, "msg": "Username less than 5 characters or more than 15 characters"})
+        return func.HttpResponse(body=response_body,mimetype="application/json")
+
+    except InvalidPasswordError as e:
+        log.info("FAILURE: %s", e)
+        response_body = json.dumps({"result": False, "msg": "Password less than 8 characters or more than 15 characters"})
+        return func.HttpResponse(body=response_body,mimetype="application/json")
+
+
+
+@bp.route(route="aio/player/login", methods=[func.HttpMethod.GET], auth_level=func.AuthLevel.FUNCTION)
+@tagged
+async def player_login_async(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    Recieves a login attempt in a JSON document and checks credentials in the DB.
+    e.g. {"username":  "antoni_gn" , "password" : "ILoveTricia"}
+    """
+    input = req.get_json()
+    log.request('Python HTTP trigger function processed an async PLAYER_LOGIN request: %s', log.payload(input))
+
+    # Search for the player's credentials in the database.
+    existing_player = await utility.get_player(PlayerContainerProxy, username=input['username'])
+    if existing_player and existing_player['password'] == input['password']:
+        log.info("SUCCESS: login credentials validated.")
+        response_body = json.dumps({"result": True, "msg": "OK"})
+        return func.HttpResponse(body=response_body,mimetype="application/json")
+    else:
+        log.info("FAILURE: Username or password incorrect")
+        response_body = json.dumps({"result": False, "msg": "Username or password incorrect"})
+        return func.HttpResponse(body=response_body,mimetype="application/json")
+
+
+
+@bp.route(route="aio/player/update/", methods=[func.HttpMethod.PUT], auth_level=func.AuthLevel.FUNCTION)
+@tagged
+async def player_update_async(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    Recieves a update request in a JSON document, updates queried player.
+    e.g. {"username": "user_to_modify" , "add_to_games_played": int , "add_to_score" : int }
+    """
+    input = req.get_json()
+    log.request('Python HTTP trigger function processed an async PLAYER_UPDATE request: %s', log.payload(input))
+
+    # Search for the player in the database
+    existing_player = await utility.get_player(proxy=PlayerContainerProxy, username=input['username'])
+    if existing_player:
+        try:
+            update = await utility.update_player(proxy=PlayerContainerProxy,id=existing_player['id'],
+                                                 games=input['add_to_games_played'],score=input['add_to_score'])
+        except TooManyConflictsError as e:
+            log.warning("FAILURE: %s", e)
+            response_body = json.dumps({"result": False, "msg": "Cannot update player" })
+            return func.HttpResponse(body=response_body,mimetype="application/json")
+        log.info("Player's updated values -> games_played: %s, total_score: %s", update[0], update[1])
+
+        # Keep the leaderboard in step with the player's new stats.
+        updated_entry = {"username": existing_player['username'], "games_played": update[0], "total_score": update[1]}
+        await utility.update_leaderboard(PlayerContainerProxy, LeaderboardContainerProxy, [updated_entry])
+        podiums.invalidate()
+
+        log.info("SUCCESS: Player update executed successfully.")
+        response_body = json.dumps({"result": True, "msg": "OK"})
+        return func.HttpResponse(body=response_body,mimetype="application/json")
+    else:
+        # Non-existent player
+        log.info("FAILURE: Player does not exist")
+        response_body = json.dumps({"result": False, "msg": "Player does not exist" })
+        return func.HttpResponse(body=response_body,mimetype="application/json")
+
+
+
+# Cosmos decorator for registering a new prompt.
+@bp.cosmos_db_output(   arg_name="promptcontainerbinding",
+                        database_name=os.environ['DatabaseName'],
+                        container_name=os.environ['PromptContainerName'],
+                        create_if_not_exists=True,
+                        connection='AzureCosmosDBConnectionString')
+@bp.route(route="aio/prompt/create", methods=[func.HttpMethod.POST], auth_level=func.AuthLevel.FUNCTION)
+@tagged
+async def prompt_create_async(req: func.HttpRequest, promptcontainerbinding: func.Out[func.Document]) -> func.HttpResponse:
+    """
+    Recieves a create prompt request in a JSON document.
+    e.g. {"text": "string", "username": "string" }
+    """
+    input = req.get_json()
+    log.request('Python HTTP trigger function processed an async PROMPT_CREATE request: %s', log.payload(input))
+
+    input_prompt = prompt(PlayerContainerProxy,CachedTranslatorProxy,text=input['text'], username=input['username'])
+
+    try:
+        if await input_prompt.is_valid_async():
+            # Insert in DB if prompt successfully validated.
+            prompt_doc = input_prompt.to_dict()
+            promptcontainerbinding.set(func.Document.from_dict(prompt_doc))
+            telemetry.record_binding(os.environ['PromptContainerName'], promptcontainerbinding.get())
+            if PromptIndexContainerProxy is not None:
+                try:
+                    await utility.add_to_prompt_index(PromptIndexContainerProxy, [prompt_doc])
+                except TooManyConflictsError as e:
+                    # The prompt is created already, only the index is behind.
+                    log.warning("Prompt index is missing prompts, run build_prompt_index.py to catch it up: %s", e)
+            log.info("SUCCESS: Input prompt is valid, out binding successfully set.")
+            return func.HttpResponse(body=json.dumps({"result": True, "msg": "OK"}),mimetype="application/json")
+
+    # Send error messages based on is_valid_async()'s result.
+    except NonExistingPlayerError as e:
+        log.info("FAILURE: %s", e)
+        response_body = json.dumps({"result": False, "msg": "Player does not exist" })
+        return func.HttpResponse(body=response_body,mimetype="application/json")
+
+    except InvalidTextError as e:
+        log.info("FAILURE: %s", e)
+        response_body = json.dumps({"result": False, "msg": "Prompt less than 20 characters or more than 100 characters" })
+        return func.HttpResponse(body=response_body,mimetype="application/json")
+
+    except UnsupportedLanguageError as e:
+        log.info("FAILURE: %s", e)
+        response_body = json.dumps({"result": False, "msg": "Unsupported language" })
+        return func.HttpResponse(body=response_body,mimetype="application/json")
+
+    except TranslationError as e:
+        log.warning("FAILURE: %s", e)
+        response_body = json.dumps({"result": False, "msg": "Cannot translate prompt" })
+        return func.HttpResponse(body=response_body,mimetype="application/json")
+
+
+
+@bp.route(route="aio/prompt/suggest", methods=[func.HttpMethod.POST], auth_level=func.AuthLevel.FUNCTION)
+@tagged
+async def prompt_suggest_async(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    Recieves a create prompt request in a JSON document, and returns the ai-bots response.
+    e.g. {"keyword": "string" }
+    """
+    input = req.get_json()
+    log.request('Python HTTP trigger function processed an async PROMPT_SUGGEST request: %s', log.payload(input))
+    keyword = input['keyword']
+
+    # Answer from the pool if it has one, and top the keyword up in the background either way.
+    suggestion = suggestions.take(keyword)
+    suggestions.request_refill_async(keyword, lambda pooled: oai.suggest_prompts_async(ai_proxy=OpenAIProxy,keyword=pooled))
+    # Same X-Suggestion-Source header as prompt/suggest.
+    if suggestion:
+        log.info("SUCCESS: took the following suggestion from the pool -> %s", suggestion)
+        return func.HttpResponse(body=json.dumps({"suggestion": suggestion}),mimetype="application/json",headers={"X-Suggestion-Source": "pool"})
+
+    try:
+        suggestion, *candidates = await oai.suggest_prompts_async(ai_proxy=OpenAIProxy,keyword=keyword)
+        # The other candidates were paid for too, keep them for the next ask.
+        suggestions.add(keyword, candidates)
+        log.info("SUCCESS: generated the following suggestion -> %s", suggestion)
+        return func.HttpResponse(body=json.dumps({"suggestion": suggestion}),mimetype="application/json",headers={"X-Suggestion-Source": "openai"})
+    except ResponseError as e:
+        # If it gives an invalid response.
+        log.info("FAILURE: %s", e)
+        response_body = json.dumps({"suggestion" : "Cannot generate suggestion" })
+        return func.HttpResponse(body=response_body,mimetype="application/json")
+
+
+
+@bp.route(route="aio/prompt/suggest_stream", methods=[func.HttpMethod.POST], auth_level=func.AuthLevel.FUNCTION)
+@tagged
+async def prompt_suggest_stream_async(req: Request) -> StreamingResponse:
+    """
+    Same request as prompt/suggest, but the suggestion is streamed back as server-sent events while it's generated:
+    e.g. event: token        data: {"text": "Why"}                                   (one per token)
+         event: keyword      data: {}                                                (once the keyword has appeared)
+         event: done         data: {"valid": true, "suggestion": "Why did the boomer cross the road?"}
+    An invalid suggestion ends with {"valid": false, "suggestion": "Cannot generate suggestion"}.
+    A suggestion from the pool is sent whole, as a single token.
+    """
+    input = await req.json()
+    log.request('Python HTTP trigger function processed an async PROMPT_SUGGEST_STREAM request: %s', log.payload(input))
+    keyword = input['keyword']
+    context = contextvars.copy_context()
+
+    suggestion = suggestions.take(keyword)
+    suggestions.request_refill_async(keyword, lambda pooled: oai.suggest_prompts_async(ai_proxy=OpenAIProxy,keyword=pooled))
+
+    async def stream_events():
+        # The body is streamed after the handler returns, outside its context (endpoint tag, log sampling).
+        for variable, value in context.items():
+            variable.set(value)
+
+        async def pooled_events():
+            log.info("SUCCESS: took the following suggestion from the pool -> %s", suggestion)
+            for event in [{"event": "token", "text": suggestion}, {"event": "keyword"}, {"event": "done", "valid": True, "suggestion": suggestion}]:
+                yield event
+
+        events = pooled_events() if suggestion else oai.stream_prompt_async(ai_proxy=OpenAIProxy,keyword=keyword)
+        async for event in events:
+            name = event.pop("event")
+            if name == "done":
+                log.info("%s: streamed the following suggestion -> %s", "SUCCESS" if event['valid'] else "FAILURE", event['suggestion'])
+            yield "event: {}\ndata: {}\n\n".format(name, json.dumps(event))
+
+    return StreamingResponse(stream_events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+
+@bp.route(route="aio/prompt/delete", methods=[func.HttpMethod.POST], auth_level=func.AuthLevel.FUNCTION)
+@tagged
+async def prompt_delete_async(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    Recieves a delete prompt request in a JSON document and deletes all prompts authored by player "username"
+    e.g. {"player" : "username" }
+    """
+    input = req.get_json()
+    log.request('Python HTTP trigger function processed an async PROMPT_DELETE request: %s', log.payload(input))
+
+    # Prompts are partitioned by username, so delete everything in the player's partition
+    count = await utility.delete_partition_items(PromptContainerProxy, partition_key=input['player'])
+    if PromptIndexContainerProxy is not None:
+        await utility.delete_prompt_index(PromptIndexContainerProxy, input['player'], prompt.supported_languages)
+    message = "{} prompts deleted".format(str(count))
+
+    log.info("SUCCESS: %s", message)
+    return func.HttpResponse(body=json.dumps({"result": True, "msg": message}),mimetype="application/json")
+
+
+
+@bp.route(route="aio/utils/get", methods=[func.HttpMethod.GET], auth_level=func.AuthLevel.FUNCTION)
+@tagged
+async def utils_get_async(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    {"players":  [list of usernames], "language": "langcode"} return a list of all prompts' texts in "langcode" language created by the players in the "players" list.
+    Optionally pages the result: {..., "page_size": 50, "continuation": "token from the previous page"}
+    returns {"prompts": [up to 50 prompts], "continuation": "token for the next page" or null on the last page}.
+    """
+    input = req.get_json()
+    log.request('Python HTTP trigger function processed an async UTILS_GET request for %s players in "%s"', len(input['players']), input['language'])
+
+    # Write the SQL to get the given users' prompts in the given language
+    query, parameters = utility.get_texts_query(input['players'], input['language'])
+
+    if 'page_size' in input:
+        # Only one page is fetched, the client asks for the next one with the continuation token.
+        items, continuation = await utility.get_queryed_page(PromptContainerProxy, query=query, page_size=int(input['page_size']),
+                                                             continuation=input.get('continuation'), parameters=parameters)
+        dict_result = {"prompts": [{ "id": item['id'], "text": item['text'], "username": item['username'] } for item in items],
+                       "continuation": continuation}
+        log.info("Sending a page of %s prompts", len(dict_result['prompts']))
+        return func.HttpResponse(body=json.dumps(dict_result),mimetype="application/json")
+
+    if PromptIndexContainerProxy is not None:
+        # One point read per player instead of a cross-partition JOIN.
+        dict_result = await utility.get_indexed_texts(PromptIndexContainerProxy, input['players'], input['language'])
+    else:
+        query_result = await utility.get_queryed_items(PromptContainerProxy, query=query, parameters=parameters)
+
+        # Append the results in the appropriate format
+        dict_result = [{ "id": item['id'], "text": item['text'], "username": item['username'] } for item in query_result]
+
+    log.info("Sending %s prompts", len(dict_result))
+    return func.HttpResponse(body=json.dumps(dict_result),mimetype="application/json")
+
+
+
+@bp.route(route="aio/utils/stream", methods=[func.HttpMethod.GET], auth_level=func.AuthLevel.FUNCTION)
+@tagged
+async def utils_stream_async(req: Request) -> StreamingResponse:
+    """
+    Same request as utils/get, but the prompts are streamed back as NDJSON, one prompt per line,
+    e.g. {"id": "...", "text": "Why the boomer crossed the road?", "username": "antoni_gn"}
+    Each page is sent as soon as Cosmos returns it, so only one page is held in memory.
+    Optional "page_size" sets the page size (default 100).
+    """
+    input = await req.json()
+    log.request('Python HTTP trigger function processed an async UTILS_STREAM request for %s players in "%s"', len(input['players']), input['language'])
+
+    query, parameters = utility.get_texts_query(input['players'], input['language'])
+    page_size = int(input.get('page_size', 100))
+    context = contextvars.copy_context()
+
+    async def stream_prompts():
+        # The body is streamed after the handler returns, outside its context (endpoint tag, log sampling).
+        for variable, value in context.items():
+            variable.set(value)
+        count = 0
+        async for page in utility.iter_queryed_pages(PromptContainerProxy, query=query, page_size=page_size, parameters=parameters):
+            count += len(page)
+            yield "".join(json.dumps({ "id": item['id'], "text": item['text'], "username": item['username'] }) + "\n" for item in page)
+        log.info("Streamed %s prompts", count)
+
+    return StreamingResponse(stream_prompts(), media_type="application/x-ndjson")
+
+
+
+@bp.route(route="aio/utils/podium", methods=[func.HttpMethod.GET], auth_level=func.AuthLevel.FUNCTION)
+@tagged
+async def utils_podium_async(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    Output the dictionary of list of players with the highest ppgr (points per game ratio)
+    Same ETag and If-None-Match handling as utils/podium.
+    """
+    log.request('Python HTTP trigger function processed an async UTILS_PODIUM request')
+    # The leaderboard document already holds the top ranked players in order, and is only read again after a player write.
+    body, etag = await podiums.get_async(lambda: utility.get_leaderboard_podium(PlayerContainerProxy, LeaderboardContainerProxy))
+
+    if podiums.is_not_modified(req.headers.get('If-None-Match'), etag):
+        log.info("Podium not modified: %s", etag)
+        return func.HttpResponse(status_code=304, headers={"ETag": etag})
+    log.info("FINAL PODIUM: %s bytes, ETag %s", len(body), etag)
+    return func.HttpResponse(body=body,mimetype="application/json",headers={"ETag": etag})
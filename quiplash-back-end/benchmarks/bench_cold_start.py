@@ -0,0 +1,207 @@
+"""
+Breaks a cold start of the function app down into phases, every service is a local fake:
+  import    what importing function_app costs, -X importtime aggregated by package
+  deferred  what the first prompt/suggest still imports when it builds the OpenAI client
+  clients   building each client in the registry (sync and async)
+  first     first and second request latency of every route, each route in a fresh process
+Run from the quiplash-back-end folder, --json keeps the numbers for comparing runs over time:
+e.g. python -m benchmarks.bench_cold_start --json cold_start.json
+"""
+import argparse
+import asyncio
+import inspect
+import json
+import os
+import subprocess
+import sys
+import time
+
+# Request bodies for the first request to each route.
+route_requests = {
+    "player_register": {"username": "new_player", "password": "new_password"},
+    "player_login": {"username": "antoni_gn", "password": "ILoveTricia"},
+    "player_update": {"username": "antoni_gn", "add_to_games_played": 1, "add_to_score": 10},
+    "player_update_batch": {"players": [{"username": "antoni_gn", "add_to_games_played": 1, "add_to_score": 10}]},
+    "prompt_create": {"text": "Why the boomer crossed the road again?", "username": "antoni_gn"},
+    "prompt_create_batch": {"prompts": [{"text": "Why the boomer crossed the road again?", "username": "antoni_gn"}]},
+    "prompt_suggest": {"keyword": "boomer"},
+    "prompt_delete": {"player": "antoni_gn"},
+    "utils_get": {"players": ["antoni_gn"], "language": "en"},
+    "utils_podium": None,
+}
+
+
+def get_environment():
+    """
+    The app settings from local.settings.json, with every service pointed at a local fake.
+    """
+    with open('local.settings.json') as settings_file:
+        environment = dict(os.environ, **json.load(settings_file)['Values'])
+    environment.update({
+        "AzureCosmosDBConnectionString": "AccountEndpoint=https://localhost:8081/;AccountKey=ZmFrZQ==;",
+        "TranslationEndpoint": "https://localhost/", "TranslationKey": "fake",
+        "OAIEndpoint": "https://localhost/", "OAIKey": "fake",
+    })
+    return environment
+
+
+def run_child(*args):
+    """
+    Runs python with the fake app settings in a fresh process, returns its (stdout, stderr).
+    """
+    child = subprocess.run([sys.executable, *args], env=get_environment(), capture_output=True, text=True)
+    if child.returncode != 0:
+        raise RuntimeError(child.stderr)
+    return child.stdout, child.stderr
+
+
+def get_package(module: str) -> str:
+    """
+    Groups a module under its package, azure.* packages by their second level.
+    e.g. azure.cosmos._cosmos_client_connection -> azure.cosmos
+    """
+    parts = module.strip().split(".")
+    return ".".join(parts[:2]) if parts[0] in ("azure", "azurefunctions") else parts[0]
+
+
+def aggregate_importtime(lines) -> dict:
+    """
+    Sums -X importtime's self times by package, in milliseconds, most expensive first.
+    """
+    packages = {}
+    for line in lines:
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_time, _, module = line[len("import time:"):].split("|")
+        package = get_package(module)
+        packages[package] = packages.get(package, 0) + int(self_time) / 1000
+    return dict(sorted(((package, round(ms, 1)) for package, ms in packages.items()), key=lambda item: -item[1]))
+
+
+def measure_import() -> dict:
+    """
+    Import phase, plus the wall time the function app recorded for its own import.
+    """
+    code = "import json, function_app; print(json.dumps(function_app.registry.get_timings()))"
+    stdout, stderr = run_child("-X", "importtime", "-c", code)
+    packages = aggregate_importtime(stderr.splitlines())
+    return {"wall_ms": json.loads(stdout)["import"], "total_ms": round(sum(packages.values()), 1), "packages": packages}
+
+
+def measure_deferred() -> dict:
+    """
+    Deferred phase, only what building the OpenAI client imports on top of the function app.
+    """
+    code = "import sys, function_app; sys.stderr.write('deferred\\n'); import openai"
+    stderr = run_child("-X", "importtime", "-c", code)[1].splitlines()
+    packages = aggregate_importtime(stderr[stderr.index("deferred") + 1:])
+    return {"total_ms": round(sum(packages.values()), 1), "packages": packages}
+
+
+def child_clients():
+    """
+    In the child process, builds every registered client and prints their timings.
+    """
+    import function_app
+    from benchmarks.fakes import fake_transport
+
+    # The sync Cosmos client looks its account up when it's built.
+    function_app.registry.override("transport", fake_transport())
+    for name in function_app.registry.factories:
+        function_app.registry.get(name)
+
+    timings = function_app.registry.get_timings()
+
+    # The async clients too, where the fastapi extension the aio/ routes need is installed.
+    try:
+        import async_function_app
+    except ImportError:
+        async_function_app = None
+    if async_function_app is not None:
+        async def build_async():
+            for name in async_function_app.registry.factories:
+                async_function_app.registry.get(name)
+            await async_function_app.registry.get("transport").session.close()
+        asyncio.run(build_async())
+        timings.update({"aio." + name: ms for name, ms in async_function_app.registry.get_timings().items()})
+    timings.pop("import", None)
+    print(json.dumps(timings))
+
+
+def child_first(route: str):
+    """
+    In the child process, sends the route its first two requests and prints their latencies.
+    """
+    started = time.perf_counter()
+    import function_app
+    import azure.functions as func
+    from benchmarks.fakes import use_fakes, seed_player, fake_out
+    imported = time.perf_counter() - started
+
+    # Data clients are fakes, one registered player to log in, update and write prompts for.
+    fakes = use_fakes(function_app.registry)
+    seed_player(fakes, "antoni_gn", "ILoveTricia")
+
+    handlers = {function.get_function_name(): function.get_user_function() for function in function_app.app.get_functions()}
+    handler = handlers[route]
+    body = json.dumps(route_requests[route]).encode() if route_requests[route] is not None else b""
+
+    latencies = []
+    for _ in range(2):
+        req = func.HttpRequest(method="POST", url="/api/" + route, body=body)
+        # Output bindings are the only other parameters.
+        bindings = {name: fake_out() for name in inspect.signature(handler).parameters if name != "req"}
+        started = time.perf_counter()
+        handler(req, **bindings)
+        latencies.append(round((time.perf_counter() - started) * 1000, 2))
+    print(json.dumps({"import_ms": round(imported * 1000, 1), "first_ms": latencies[0], "second_ms": latencies[1]}))
+
+
+def measure_clients() -> dict:
+    """
+    Clients phase, in milliseconds per client.
+    """
+    return json.loads(run_child("-m", "benchmarks.bench_cold_start", "--child", "clients")[0])
+
+
+def measure_first(route: str) -> dict:
+    """
+    First request phase for one route.
+    """
+    return json.loads(run_child("-m", "benchmarks.bench_cold_start", "--child", "first", route)[0])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--routes", nargs="+", default=list(route_requests), choices=list(route_requests))
+    parser.add_argument("--top", type=int, default=10, help="packages listed per import phase")
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--child", nargs="+", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        if args.child[0] == "clients":
+            child_clients()
+        else:
+            child_first(args.child[1])
+        sys.exit()
+
+    results = {"import": measure_import(), "deferred": measure_deferred(), "clients": measure_clients(),
+               "first": {route: measure_first(route) for route in args.routes}}
+
+    print("import: {wall_ms:.1f} ms wall, {total_ms:.1f} ms in imports".format(**results["import"]))
+    for package, ms in list(results["import"]["packages"].items())[:args.top]:
+        print("  {:<36} {:>8.1f} ms".format(package, ms))
+    print("deferred (first prompt/suggest): {total_ms:.1f} ms".format(**results["deferred"]))
+    for package, ms in list(results["deferred"]["packages"].items())[:args.top]:
+        print("  {:<36} {:>8.1f} ms".format(package, ms))
+    print("clients:")
+    for name, ms in results["clients"].items():
+        print("  {:<36} {:>8.1f} ms".format(name, ms))
+    print("{:<22} {:>10} {:>10} {:>10}".format("first request", "import", "first", "second"))
+    for route, timings in results["first"].items():
+        print("  {:<20} {:>7.1f} ms {:>7.2f} ms {:>7.2f} ms".format(route, timings["import_ms"], timings["first_ms"], timings["second_ms"]))
+
+    if args.json:
+        with open(args.json, "w") as results_file:
+            json.dump(results, results_file, indent=2)
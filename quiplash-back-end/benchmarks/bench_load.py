@@ -0,0 +1,214 @@
+"""
+Replays game sessions against the eight routes on synthetic worlds of growing size, all services are local fakes.
+A session is a room of 3 to 8 players: everyone logs in, some ask for a suggestion, everyone writes a prompt,
+fetches the room's prompts and gets their score, then the podium is shown. Some sessions also register a new
+player or delete a player's prompts.
+Reports per route: requests/sec, p50/p99 latency, request units and (with --memory) allocations per request.
+Run from the quiplash-back-end folder, --json writes the results for comparing runs:
+e.g. python -m benchmarks.bench_load --players 1000 100000 --prompts-per-player 10 --sessions 200 --json load.json
+Worlds are held in memory, 10^6 players with 10 prompts each needs several GB.
+Latencies include the fake containers' own time, which grows with the data they scan, like Cosmos' would.
+"""
+import argparse
+import inspect
+import json
+import os
+import random
+import time
+import tracemalloc
+
+from benchmarks.bench_cold_start import get_environment
+
+os.environ.update(get_environment())
+
+import azure.functions as func
+import function_app
+from benchmarks.fakes import use_fakes, fake_out
+from shared_code.prompt import prompt
+from shared_code.utils import utils
+
+utility = utils()
+# get_functions() registers the blueprints again every time it's called, so only once.
+handlers = {function.get_function_name(): function.get_user_function() for function in function_app.app.get_functions()}
+routes = ["player_register", "player_login", "player_update", "prompt_create",
+          "prompt_suggest", "prompt_delete", "utils_get", "utils_podium"]
+keywords = ["boomer", "python", "wedding", "avenue", "battery", "cuphead"]
+
+
+def get_username(index: int) -> str:
+    return "player_{}".format(index)
+
+
+def get_password(index: int) -> str:
+    return "password_{}".format(index)
+
+
+def synthetic_players(count: int, rng: random.Random):
+    """
+    Yields player documents keyed by username.
+    """
+    for index in range(count):
+        games_played = rng.randint(0, 200)
+        yield {"id": utility.get_player_key(get_username(index)), "username": get_username(index), "password": get_password(index),
+               "games_played": games_played, "total_score": rng.randint(0, 100 * games_played)}
+
+
+def synthetic_prompts(players: int, per_player: int, rng: random.Random):
+    """
+    Yields prompt documents with a text in every supported language.
+    """
+    for index in range(players):
+        for number in range(per_player):
+            text = "Why did {} cross the road for the {} time?".format(get_username(index), number)
+            yield {"id": "{}-{}".format(index, number), "username": get_username(index),
+                   "texts": [{"language": language, "text": text} for language in prompt.supported_languages]}
+
+
+def build_world(fakes, players: int, per_player: int, seed: int):
+    """
+    Loads the players and prompts into the fakes, then builds the leaderboard so no session pays for it.
+    """
+    rng = random.Random(seed)
+    fakes["player_container"].load(synthetic_players(players, rng))
+    fakes["prompt_container"].load(synthetic_prompts(players, per_player, rng))
+    utility.rebuild_leaderboard(function_app.PlayerContainerProxy, function_app.LeaderboardContainerProxy)
+
+
+def game_session(rng: random.Random, players: int, registered: list):
+    """
+    Returns one session's requests in order, as [(route, body), ...].
+    """
+    room = rng.sample(range(players), rng.randint(3, min(8, players)))
+    usernames = [get_username(index) for index in room]
+
+    steps = [("player_login", {"username": get_username(index), "password": get_password(index)}) for index in room]
+    for username in usernames:
+        if rng.random() < 0.3:
+            steps.append(("prompt_suggest", {"keyword": rng.choice(keywords)}))
+        steps.append(("prompt_create", {"text": "What would {} never say at a {}?".format(username, rng.choice(keywords)), "username": username}))
+    language = rng.choice(prompt.supported_languages)
+    steps += [("utils_get", {"players": usernames, "language": language}) for _ in usernames]
+    steps += [("player_update", {"username": username, "add_to_games_played": 1, "add_to_score": rng.randint(-100, 500)}) for username in usernames]
+    steps.append(("utils_podium", None))
+
+    if rng.random() < 0.2:
+        registered.append("newbie_{}".format(len(registered)))
+        steps.append(("player_register", {"username": registered[-1], "password": "new_password"}))
+    if rng.random() < 0.1:
+        steps.append(("prompt_delete", {"player": rng.choice(usernames)}))
+    return steps
+
+
+def get_request_charge(fakes) -> float:
+    return sum(fake.request_charge for fake in fakes.values() if hasattr(fake, "request_charge"))
+
+
+def send(handler, route: str, body, fakes):
+    """
+    Calls a handler like the host would, including writing its output binding.
+    """
+    req = func.HttpRequest(method="POST", url="/api/" + route, body=json.dumps(body).encode() if body is not None else b"")
+    bindings = {name: fake_out() for name in inspect.signature(handler).parameters if name != "req"}
+    handler(req, **bindings)
+    for binding in bindings.values():
+        if binding.get() is not None:
+            document = json.loads(binding.get().to_json())
+            container = fakes["player_container"] if "password" in document else fakes["prompt_container"]
+            container.create_item(document)
+
+
+def percentile(values, fraction: float) -> float:
+    """
+    Nearest rank percentile of sorted values.
+    """
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def replay(fakes, steps, memory: bool) -> dict:
+    """
+    Sends every step in order, returns the samples per route as {route: [(seconds, request units, allocated bytes)]}.
+    """
+    samples = {route: [] for route in routes}
+    for route, body in steps:
+        charge = get_request_charge(fakes)
+        if memory:
+            tracemalloc.reset_peak()
+            allocated = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        send(handlers[route], route, body, fakes)
+        elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1] - allocated if memory else None
+        samples[route].append((elapsed, get_request_charge(fakes) - charge, peak))
+    return samples
+
+
+def summarize(samples) -> dict:
+    """
+    Per route requests, requests/sec, latency percentiles (ms), request units and allocations (KB) per request.
+    """
+    summary = {}
+    for route, route_samples in samples.items():
+        if not route_samples:
+            continue
+        latencies = sorted(elapsed for elapsed, _, _ in route_samples)
+        total = sum(latencies)
+        peaks = [peak for _, _, peak in route_samples if peak is not None]
+        summary[route] = {"requests": len(route_samples), "rps": round(len(route_samples) / total, 1),
+                          "p50_ms": round(percentile(latencies, 0.5) * 1000, 3), "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+                          "ru_per_request": round(sum(charge for _, charge, _ in route_samples) / len(route_samples), 2),
+                          "alloc_kb": round(sum(peaks) / len(peaks) / 1024, 1) if peaks else None}
+    return summary
+
+
+def run_world(players: int, per_player: int, sessions: int, latency: float, memory: bool, seed: int) -> dict:
+    """
+    Builds one world and replays the sessions on it, request units spent building it aren't counted.
+    """
+    fakes = use_fakes(function_app.registry, latency=latency)
+    build_world(fakes, players, per_player, seed)
+    for fake in fakes.values():
+        if hasattr(fake, "request_charge"):
+            fake.request_charge = 0.0
+
+    rng = random.Random(seed)
+    registered = []
+    steps = [step for _ in range(sessions) for step in game_session(rng, players, registered)]
+
+    if memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    samples = replay(fakes, steps, memory)
+    elapsed = time.perf_counter() - started
+    if memory:
+        tracemalloc.stop()
+
+    return {"players": players, "prompts": players * per_player, "sessions": sessions, "requests": len(steps),
+            "rps": round(len(steps) / elapsed, 1), "routes": summarize(samples)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--players", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--prompts-per-player", type=int, default=10)
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every fake call")
+    parser.add_argument("--memory", action="store_true", help="also report allocations per request (slower)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    results = []
+    for players in args.players:
+        world = run_world(players, args.prompts_per_player, args.sessions, args.latency, args.memory, args.seed)
+        results.append(world)
+
+        print("{players} players, {prompts} prompts: {requests} requests at {rps} req/s".format(**world))
+        print("  {:<16} {:>8} {:>10} {:>10} {:>10} {:>8} {:>10}".format("route", "requests", "req/s", "p50 (ms)", "p99 (ms)", "RU", "alloc KB"))
+        for route, stats in world["routes"].items():
+            print("  {:<16} {:>8} {:>10} {:>10.3f} {:>10.3f} {:>8} {:>10}".format(
+                route, stats["requests"], stats["rps"], stats["p50_ms"], stats["p99_ms"], stats["ru_per_request"],
+                stats["alloc_kb"] if stats["alloc_kb"] is not None else "-"))
+
+    if args.json:
+        with open(args.json, "w") as results_file:
+            json.dump(results, results_file, indent=2)
@@ -0,0 +1,85 @@
+"""
+Compares the full-sort podium path against the streaming top tiers selector.
+Run from the quiplash-back-end folder:
+e.g. python -m benchmarks.bench_podium --sizes 10000 100000 1000000
+"""
+import argparse
+import random
+import time
+import tracemalloc
+from shared_code.utils import utils
+
+utility = utils()
+
+
+def synthetic_players(count: int, seed: int = 0):
+    """
+    Yields player stats the way a paged query would, one dict at a time.
+    """
+    rng = random.Random(seed)
+    for i in range(count):
+        games_played = rng.randint(0, 200)
+        yield {"username": "player_{}".format(i), "games_played": games_played,
+               "total_score": rng.randint(0, 100 * games_played)}
+
+
+def sort_path(players):
+    """
+    The original path: materialize, tag every player with ppgr, sort everything.
+    """
+    return utility.get_podium(utility.sort_to_ppgr_games_played(list(players)))
+
+
+def select_path(players):
+    """
+    Keeps only the top three tiers while consuming the iterator.
+    """
+    return utility.select_top_tiers(players)
+
+
+def drain_path(players):
+    """
+    Only consumes the players, the cost both paths pay for generating them.
+    """
+    for _ in players:
+        pass
+
+
+def measure(path, count: int, memory: bool):
+    """
+    Returns (seconds, peak bytes or None, podium) for one run of path over count players.
+    """
+    if memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    result = path(synthetic_players(count))
+    elapsed = time.perf_counter() - start
+    peak = None
+    if memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return elapsed, peak, result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--memory", action="store_true", help="also report peak allocations (slower)")
+    args = parser.parse_args()
+
+    print("{:>10} {:>12} {:>12} {:>12} {:>8} {:>14} {:>14}".format(
+        "players", "generate (s)", "sort (s)", "select (s)", "speedup", "sort peak", "select peak"))
+    for count in args.sizes:
+        # Generating the players is shared by both, so it is taken off their times.
+        base_time = measure(drain_path, count, False)[0]
+        sort_time, sort_peak, sorted_podium = measure(sort_path, count, args.memory)
+        select_time, select_peak, selected = measure(select_path, count, args.memory)
+
+        # Both paths must agree on the podium.
+        assert utility.get_podium(selected) == sorted_podium
+
+        sort_time = max(sort_time - base_time, 1e-9)
+        select_time = max(select_time - base_time, 1e-9)
+        print("{:>10} {:>12.3f} {:>12.3f} {:>12.3f} {:>7.1f}x {:>14} {:>14}".format(
+            count, base_time, sort_time, select_time, sort_time / select_time,
+            sort_peak if sort_peak is not None else "-", select_peak if select_peak is not None else "-"))
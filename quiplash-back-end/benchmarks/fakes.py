@@ -0,0 +1,723 @@
+"""
+Local stand-ins for Cosmos, the translator and OpenAI, so the function app runs without any service.
+Containers understand the SQL the app sends (utils.queries and patch filter predicates), can add a latency
+to every call and charge request units like Cosmos roughly would, so handlers can be driven at high rates offline.
+Swap them in with a function app's client registry:
+e.g. fakes = use_fakes(function_app.registry, latency=0.005)
+"""
+import re
+import copy
+import json
+import time
+import uuid
+import asyncio
+import threading
+from functools import lru_cache
+from types import SimpleNamespace
+from typing import Any, Dict, Iterable, List, Optional
+from azure.core import MatchConditions
+from azure.core.pipeline.transport import HttpTransport, HttpResponse
+from azure.cosmos.exceptions import (CosmosResourceNotFoundError, CosmosResourceExistsError,
+                                     CosmosAccessConditionFailedError, CosmosBatchOperationError)
+from azure.ai.translation.text.models import TranslatedTextItem
+from shared_code.utils import utils
+
+
+class fake_response(HttpResponse):
+    """
+    A canned JSON response for fake_transport.
+    """
+
+    def __init__(self, request, status_code: int, body: Dict[str, Any]):
+        super().__init__(request, None)
+        self.status_code = status_code
+        self.reason = "OK"
+        self.content_type = "application/json"
+        self.headers = {"Content-Type": "application/json"}
+        self.content = json.dumps(body).encode("utf-8")
+
+
+    def body(self) -> bytes:
+        return self.content
+
+
+class fake_transport(HttpTransport):
+    """
+    Answers the account lookup the sync CosmosClient makes as soon as it's built, nothing else.
+    e.g. CosmosClient.from_connection_string(connection_string, transport=fake_transport())
+    """
+
+    def __init__(self, endpoint: str = "https://localhost:8081/"):
+        location = {"name": "local", "databaseAccountEndpoint": endpoint}
+        self.account = {"id": "local", "_rid": "local", "_dbs": "//dbs/", "media": "//media/", "addresses": "//addresses/",
+                        "writableLocations": [location], "readableLocations": [location],
+                        "enableMultipleWriteLocations": False, "userReplicationPolicy": {}, "readPolicy": {},
+                        "userConsistencyPolicy": {"defaultConsistencyLevel": "Session"}, "queryEngineConfiguration": "{}"}
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *args):
+        pass
+
+
+    def open(self):
+        pass
+
+
+    def close(self):
+        pass
+
+
+    def send(self, request, **kwargs):
+        if request.method == "GET" and request.url.rstrip("/") == self.account["writableLocations"][0]["databaseAccountEndpoint"].rstrip("/"):
+            return fake_response(request, 200, self.account)
+        return fake_response(request, 404, {"code": "NotFound", "message": "fake_transport only answers the account lookup"})
+
+
+# The query shapes the app sends, e.g. utils.queries["texts"]:
+# SELECT p.id, t.text, p.username FROM prompt p JOIN t IN p.texts WHERE t.language = @language AND ARRAY_CONTAINS(@usernames, p.username)
+query_pattern = re.compile(r"^SELECT\s+(?P<value>VALUE\s+)?(?P<projection>.+?)\s+FROM\s+(?P<container>\w+)(?:\s+(?!JOIN\b|WHERE\b|ORDER\b)(?P<alias>\w+))?"
+                           r"(?:\s+JOIN\s+(?P<join_alias>\w+)\s+IN\s+(?P<join_path>[\w.]+))?"
+                           r"(?:\s+WHERE\s+(?P<where>.+?))?(?:\s+ORDER\s+BY\s+(?P<order>[\w.]+))?\s*$", re.IGNORECASE)
+contains_pattern = re.compile(r"^ARRAY_CONTAINS\(\s*(?P<array>\S+?)\s*,\s*(?P<path>[\w.]+)\s*\)$", re.IGNORECASE)
+compare_pattern = re.compile(r"^(?P<path>[\w.]+)\s*(?P<operator>>=|<=|!=|=|<|>)\s*(?P<value>.+)$")
+
+operators = {"=": lambda a, b: a == b, "!=": lambda a, b: a != b, "<": lambda a, b: a < b,
+             "<=": lambda a, b: a <= b, ">": lambda a, b: a > b, ">=": lambda a, b: a >= b}
+
+
+@lru_cache(maxsize=256)
+def parse_query(query: str) -> Dict[str, Any]:
+    """
+    Parses a query (or a patch filter predicate, which is a query without its SELECT) into its parts.
+    Cached by text, so parameterized queries are only parsed once.
+    """
+    if query.lstrip().upper().startswith("FROM"):
+        query = "SELECT * " + query.strip()
+    match = query_pattern.match(" ".join(query.split()))
+    if match is None:
+        raise NotImplementedError("fake_container doesn't understand: {}".format(query))
+
+    parts = match.groupdict()
+    conditions = []
+    for condition in re.split(r"\s+AND\s+", parts['where'] or "", flags=re.IGNORECASE):
+        if not condition:
+            continue
+        contains = contains_pattern.match(condition)
+        if contains:
+            conditions.append(("contains", contains.group("array"), contains.group("path")))
+            continue
+        compare = compare_pattern.match(condition)
+        if compare is None:
+            raise NotImplementedError("fake_container doesn't understand: {}".format(condition))
+        conditions.append((compare.group("operator"), compare.group("path"), compare.group("value")))
+
+    projection = None if parts['projection'].strip() == "*" else [path.strip() for path in parts['projection'].split(",")]
+    return {"value": bool(parts['value']), "projection": projection, "alias": parts['alias'] or parts['container'],
+            "join_alias": parts['join_alias'], "join_path": parts['join_path'], "conditions": conditions, "order": parts['order']}
+
+
+def get_path(row: Dict[str, Any], path: str):
+    """
+    Resolves an aliased path against a row of {alias: document}.
+    e.g. get_path({"p": {"username": "antoni_gn"}}, "p.username") -> "antoni_gn"
+    """
+    alias, *fields = path.split(".")
+    value = row.get(alias)
+    for field in fields:
+        value = value.get(field) if isinstance(value, dict) else None
+    return value
+
+
+def get_operand(text: str, parameters: Dict[str, Any]):
+    """
+    A literal or a parameter's value.
+    """
+    text = text.strip()
+    if text.startswith("@"):
+        return parameters[text]
+    return json.loads(text.replace("'", '"'))
+
+
+def run_query(parsed: Dict[str, Any], documents, parameters: Dict[str, Any]) -> List[Any]:
+    """
+    Runs a parsed query over the documents, returns the projected results.
+    """
+    rows = []
+    for document in documents:
+        row = {parsed['alias']: document}
+        if parsed['join_alias']:
+            joined = get_path(row, parsed['join_path']) or []
+            rows.extend(dict(row, **{parsed['join_alias']: element}) for element in joined)
+        else:
+            rows.append(row)
+
+    def matches(row):
+        for operator, left, right in parsed['conditions']:
+            if operator == "contains":
+                if get_path(row, right) not in get_operand(left, parameters):
+                    return False
+            else:
+                value = get_path(row, left)
+                if value is None or not operators[operator](value, get_operand(right, parameters)):
+                    return False
+        return True
+
+    rows = [row for row in rows if matches(row)]
+    if parsed['order']:
+        rows.sort(key=lambda row: get_path(row, parsed['order']))
+
+    if parsed['projection'] is None:
+        return [copy.deepcopy(row[parsed['alias']]) for row in rows]
+    if parsed['value']:
+        return [get_path(row, parsed['projection'][0]) for row in rows]
+    return [{path.split(".")[-1]: get_path(row, path) for path in parsed['projection']} for row in rows]
+
+
+class fake_page_iterator():
+    """
+    What by_page returns, the pages left and the continuation token for the next one.
+    """
+
+    def __init__(self, items: List[Any], page_size: int, continuation: Optional[str]):
+        self.items = items
+        self.page_size = page_size
+        self.start = int(continuation or 0)
+        self.continuation_token = continuation
+
+
+    def get_page(self) -> List[Any]:
+        if self.start >= len(self.items):
+            return None
+        end = self.start + self.page_size
+        page = self.items[self.start:end]
+        self.start = end
+        self.continuation_token = str(end) if end < len(self.items) else None
+        return page
+
+
+    def __iter__(self):
+        return self
+
+
+    def __next__(self):
+        page = self.get_page()
+        if page is None:
+            raise StopIteration
+        return iter(page)
+
+
+class fake_pages():
+    """
+    What query_items returns, iterable item by item or page by page.
+    """
+
+    def __init__(self, items: List[Any], page_size: Optional[int]):
+        self.items = items
+        self.page_size = page_size or 100
+
+
+    def __iter__(self):
+        return iter(self.items)
+
+
+    def by_page(self, continuation: Optional[str] = None) -> fake_page_iterator:
+        return fake_page_iterator(self.items, self.page_size, continuation)
+
+
+class fake_container():
+    """
+    In-memory container with the ContainerProxy surface the app uses.
+    Every call waits latency seconds and is charged request units, roughly on Cosmos' scale:
+    1 RU per KB read, about 5.5 RU per KB written, 2.5 RU plus the items returned for a query.
+    The charge of the last call is in client_connection.last_response_headers, and is passed to response_hook, like the real proxy.
+    """
+
+    def __init__(self, partition_key_path: str = "/id", latency: float = 0.0):
+        self.partition_field = partition_key_path.lstrip("/")
+        self.latency = latency
+        self.partitions = {}    # partition key -> id -> document
+        self.lock = threading.Lock()
+        self.request_charge = 0.0
+        self.calls = {}         # operation -> how many times it was called
+        self.client_connection = SimpleNamespace(last_response_headers={})
+
+
+    def charge(self, operation: str, request_units: float, response_hook=None, result=None):
+        """
+        Waits the injected latency and records what the call cost.
+        """
+        if self.latency:
+            time.sleep(self.latency)
+        request_units = round(request_units, 2)
+        with self.lock:
+            self.request_charge += request_units
+            self.calls[operation] = self.calls.get(operation, 0) + 1
+        self.client_connection.last_response_headers = {"x-ms-request-charge": str(request_units)}
+        if response_hook:
+            response_hook(self.client_connection.last_response_headers, result)
+
+
+    def get_size(self, document) -> float:
+        """
+        Size in KB, at least 1.
+        """
+        return max(len(json.dumps(document)) / 1024, 1)
+
+
+    def get_document(self, partition_key, id) -> Dict[str, Any]:
+        document = self.partitions.get(partition_key, {}).get(id)
+        if document is None:
+            raise CosmosResourceNotFoundError(message="Entity with the specified id does not exist in the system.")
+        return document
+
+
+    def load(self, documents: Iterable[Dict[str, Any]]):
+        """
+        Stores documents without charging for them, for building synthetic data sets quickly.
+        The documents are kept as they are, so don't reuse them.
+        """
+        with self.lock:
+            for document in documents:
+                document.setdefault('_etag', str(uuid.uuid4()))
+                self.partitions.setdefault(document[self.partition_field], {})[document['id']] = document
+
+
+    def count(self) -> int:
+        return sum(len(documents) for documents in self.partitions.values())
+
+
+    def check_etag(self, document, etag, match_condition):
+        if match_condition == MatchConditions.IfNotModified and etag != document['_etag']:
+            raise CosmosAccessConditionFailedError(message="Operation cannot be performed because one of the specified precondition is not met.")
+
+
+    def store(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        # Documents go over the wire as JSON, so nothing is shared with the caller.
+        document = dict(copy.deepcopy(body), _etag=str(uuid.uuid4()), _ts=int(time.time()))
+        self.partitions.setdefault(document[self.partition_field], {})[document['id']] = document
+        return copy.deepcopy(document)
+
+
+    def read_item(self, item, partition_key, **kwargs):
+        id = item['id'] if isinstance(item, dict) else item
+        with self.lock:
+            document = copy.deepcopy(self.get_document(partition_key, id))
+        self.charge("read_item", self.get_size(document), kwargs.get('response_hook'), document)
+        return document
+
+
+    def create_item(self, body, **kwargs):
+        with self.lock:
+            if body['id'] in self.partitions.get(body[self.partition_field], {}):
+                raise CosmosResourceExistsError(message="Entity with the specified id already exists in the system.")
+            document = self.store(body)
+        self.charge("create_item", 5.5 * self.get_size(document), kwargs.get('response_hook'), document)
+        return document
+
+
+    def upsert_item(self, body, **kwargs):
+        with self.lock:
+            document = self.store(body)
+        self.charge("upsert_item", 5.5 * self.get_size(document), kwargs.get('response_hook'), document)
+        return document
+
+
+    def replace_item(self, item, body, etag=None, match_condition=None, **kwargs):
+        with self.lock:
+            self.check_etag(self.get_document(body[self.partition_field], body['id']), etag, match_condition)
+            document = self.store(body)
+        self.charge("replace_item", 5.5 * self.get_size(document), kwargs.get('response_hook'), document)
+        return document
+
+
+    def delete_item(self, item, partition_key, etag=None, match_condition=None, **kwargs):
+        id = item['id'] if isinstance(item, dict) else item
+        with self.lock:
+            document = self.get_document(partition_key, id)
+            self.check_etag(document, etag, match_condition)
+            del self.partitions[partition_key][id]
+        self.charge("delete_item", 5.5 * self.get_size(document), kwargs.get('response_hook'))
+
+
+    def apply_patch(self, document, patch_operations):
+        for operation in patch_operations:
+            field = operation['path'].strip("/").split("/")[0]
+            if operation['op'] == "incr":
+                document[field] = document.get(field, 0) + operation['value']
+            elif operation['op'] == "add" and operation['path'].endswith("/-"):
+                document[field] = document.get(field, []) + [operation['value']]
+            elif operation['op'] == "remove":
+                document.pop(field, None)
+            else:
+                document[field] = operation['value']
+
+
+    def patch_item(self, item, partition_key, patch_operations, filter_predicate=None, **kwargs):
+        with self.lock:
+            document = copy.deepcopy(self.get_document(partition_key, item))
+            if filter_predicate and not run_query(parse_query(filter_predicate), [document], {}):
+                raise CosmosAccessConditionFailedError(message="One of the specified pre-condition is not met.")
+            self.apply_patch(document, patch_operations)
+            document = self.store(document)
+        self.charge("patch_item", 10 + 5.5 * self.get_size(document), kwargs.get('response_hook'), document)
+        return document
+
+
+    def get_partition_keys(self, parsed: Dict[str, Any], parameters: Dict[str, Any], partition_key) -> Optional[List[Any]]:
+        """
+        The partitions a query has to look at, None for all of them.
+        Like Cosmos, a filter on the partition key field routes the query to only those partitions.
+        """
+        if partition_key is not None:
+            return [partition_key]
+        path = "{}.{}".format(parsed['alias'], self.partition_field)
+        for operator, left, right in parsed['conditions']:
+            if operator == "contains" and right == path:
+                return list(get_operand(left, parameters))
+            if operator == "=" and left == path:
+                return [get_operand(right, parameters)]
+        return None
+
+
+    def query(self, query, parameters=None, partition_key=None, response_hook=None) -> List[Any]:
+        parsed = parse_query(query)
+        parameters = {parameter['name']: parameter['value'] for parameter in parameters or []}
+        keys = self.get_partition_keys(parsed, parameters, partition_key)
+        with self.lock:
+            partitions = self.partitions.values() if keys is None else [self.partitions.get(key, {}) for key in keys]
+            documents = [document for partition in partitions for document in partition.values()]
+            results = run_query(parsed, documents, parameters)
+        # Queries that can't be routed fan out to every physical partition.
+        self.charge("query_items", 2.5 + (0.5 if keys is None else 0.1 * len(keys)) + 0.1 * len(results), response_hook, {"Documents": results})
+        return results
+
+
+    def query_items(self, query, parameters=None, partition_key=None, max_item_count=None, **kwargs):
+        return fake_pages(self.query(query, parameters, partition_key, kwargs.get('response_hook')), max_item_count)
+
+
+    def read_all_items(self, **kwargs):
+        return self.query_items("SELECT * FROM c")
+
+
+    def execute_item_batch(self, batch_operations, partition_key, **kwargs):
+        """
+        All or nothing, like a transactional batch.
+        """
+        if len(batch_operations) > 100:
+            raise CosmosBatchOperationError(error_index=100, headers={}, status_code=400, message="Batch request has more operations than what is supported.",
+                                            operation_responses=[])
+        with self.lock:
+            snapshot = dict(self.partitions.get(partition_key, {}))
+            charged = self.request_charge
+        results = []
+        try:
+            for operation, args in batch_operations:
+                if operation == "create":
+                    results.append(self.create_item(*args))
+                elif operation == "upsert":
+                    results.append(self.upsert_item(*args))
+                elif operation == "replace":
+                    results.append(self.replace_item(*args))
+                elif operation == "delete":
+                    results.append(self.delete_item(args[0], partition_key))
+                elif operation == "read":
+                    results.append(self.read_item(args[0], partition_key))
+            # One response for the whole batch, charged what its operations cost.
+            if kwargs.get('response_hook'):
+                kwargs['response_hook']({"x-ms-request-charge": str(round(self.request_charge - charged, 2))}, results)
+            return results
+        except (CosmosResourceNotFoundError, CosmosResourceExistsError, CosmosAccessConditionFailedError) as error:
+            # Roll the earlier operations back.
+            with self.lock:
+                self.partitions[partition_key] = snapshot
+            raise CosmosBatchOperationError(error_index=len(results), headers={}, status_code=error.status_code,
+                                            message="There was an error in the transactional batch on index {}.".format(len(results)),
+                                            operation_responses=[])
+
+
+class fake_async_page_iterator(fake_page_iterator):
+    """
+    What the aio by_page returns, the query only runs when the first page is awaited.
+    """
+
+    def __init__(self, container: 'fake_async_container', arguments, page_size: int, continuation: Optional[str]):
+        super().__init__(None, page_size, continuation)
+        self.container = container
+        self.arguments = arguments
+
+
+    def __aiter__(self):
+        return self
+
+
+    async def __anext__(self):
+        if self.items is None:
+            self.items = await self.container.query(*self.arguments)
+        page = self.get_page()
+        if page is None:
+            raise StopAsyncIteration
+        return self.iter_page(page)
+
+
+    async def iter_page(self, items):
+        for item in items:
+            yield item
+
+
+class fake_async_pages():
+    """
+    What the aio query_items returns, async iterable item by item or page by page.
+    """
+
+    def __init__(self, container: 'fake_async_container', query, parameters, partition_key, page_size: Optional[int], response_hook=None):
+        self.container = container
+        self.arguments = (query, parameters, partition_key, response_hook)
+        self.page_size = page_size or 100
+
+
+    async def __aiter__(self):
+        for item in await self.container.query(*self.arguments):
+            yield item
+
+
+    def by_page(self, continuation: Optional[str] = None) -> fake_async_page_iterator:
+        return fake_async_page_iterator(self.container, self.arguments, self.page_size, continuation)
+
+
+class fake_async_container():
+    """
+    Same as fake_container, with the azure.cosmos.aio ContainerProxy surface, latency is awaited.
+    """
+
+    def __init__(self, partition_key_path: str = "/id", latency: float = 0.0):
+        self.container = fake_container(partition_key_path)
+        self.latency = latency
+
+
+    def __getattr__(self, name):
+        # partitions, request_charge, calls and client_connection are shared with the sync container.
+        return getattr(self.container, name)
+
+
+    async def wait(self):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+
+    async def read_item(self, *args, **kwargs):
+        await self.wait()
+        return self.container.read_item(*args, **kwargs)
+
+
+    async def create_item(self, *args, **kwargs):
+        await self.wait()
+        return self.container.create_item(*args, **kwargs)
+
+
+    async def upsert_item(self, *args, **kwargs):
+        await self.wait()
+        return self.container.upsert_item(*args, **kwargs)
+
+
+    async def replace_item(self, *args, **kwargs):
+        await self.wait()
+        return self.container.replace_item(*args, **kwargs)
+
+
+    async def delete_item(self, *args, **kwargs):
+        await self.wait()
+        return self.container.delete_item(*args, **kwargs)
+
+
+    async def patch_item(self, *args, **kwargs):
+        await self.wait()
+        return self.container.patch_item(*args, **kwargs)
+
+
+    async def execute_item_batch(self, *args, **kwargs):
+        await self.wait()
+        return self.container.execute_item_batch(*args, **kwargs)
+
+
+    async def query(self, query, parameters, partition_key, response_hook=None):
+        await self.wait()
+        return self.container.query(query, parameters, partition_key, response_hook)
+
+
+    def query_items(self, query, parameters=None, partition_key=None, max_item_count=None, **kwargs):
+        return fake_async_pages(self, query, parameters, partition_key, max_item_count, kwargs.get('response_hook'))
+
+
+class fake_translator():
+    """
+    Detects every text as English and "translates" it by tagging it with the target language.
+    Counts the characters it would have been billed for.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.characters = 0
+        self.calls = {}
+
+
+    def record(self, operation: str, characters: int = 0):
+        if self.latency:
+            time.sleep(self.latency)
+        self.characters += characters
+        self.calls[operation] = self.calls.get(operation, 0) + 1
+
+
+    def detect(self, body: List[str]):
+        return [SimpleNamespace(detected_language={"language": "en", "score": 1.0}) for _ in body]
+
+
+    def get_translations(self, body: List[str], to_language: List[str]):
+        return [TranslatedTextItem({"detectedLanguage": {"language": "en", "score": 1.0},
+                                    "translations": [{"to": language, "text": text if language == "en" else "[{}] {}".format(language, text)}
+                                                     for language in to_language]})
+                for text in body]
+
+
+    def find_sentence_boundaries(self, body: List[str], **kwargs):
+        self.record("find_sentence_boundaries")
+        return self.detect(body)
+
+
+    def translate(self, body: List[str], to_language: List[str], **kwargs):
+        self.record("translate", sum(len(text) for text in body) * len(to_language))
+        return self.get_translations(body, to_language)
+
+
+class fake_async_translator(fake_translator):
+    """
+    Same as fake_translator, for the async TextTranslationClient.
+    """
+
+    async def record_async(self, operation: str, characters: int = 0):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.characters += characters
+        self.calls[operation] = self.calls.get(operation, 0) + 1
+
+
+    async def find_sentence_boundaries(self, body: List[str], **kwargs):
+        await self.record_async("find_sentence_boundaries")
+        return self.detect(body)
+
+
+    async def translate(self, body: List[str], to_language: List[str], **kwargs):
+        await self.record_async("translate", sum(len(text) for text in body) * len(to_language))
+        return self.get_translations(body, to_language)
+
+
+class fake_openai():
+    """
+    Suggests prompts that always contain the keyword, as many as asked for with n.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+
+    def get_completion(self, messages, n: int = 1):
+        self.calls += 1
+        keyword = messages[-1]['content'].split("exact keyword ")[-1].split(" ")[0]
+        places = ["at a wedding", "in a job interview", "on a first date", "at a funeral", "to the King"]
+        replies = ["What is the worst thing to say about {} {}?".format(keyword, places[index % len(places)]) for index in range(n)]
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=reply), finish_reason="stop") for reply in replies])
+
+
+    def create(self, messages, n: int = 1, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        return self.get_completion(messages, n)
+
+
+class fake_async_stream():
+    """
+    What create(stream=True) returns, the reply a word per chunk, each chunk waits latency.
+    """
+
+    def __init__(self, reply: str, latency: float):
+        self.words = reply.split(" ")
+        self.latency = latency
+        self.closed = False
+
+
+    async def __aiter__(self):
+        for index, word in enumerate(self.words):
+            if self.closed:
+                return
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            delta = SimpleNamespace(content=word if index == 0 else " " + word)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta, finish_reason=None)])
+
+
+    async def close(self):
+        self.closed = True
+
+
+class fake_async_openai(fake_openai):
+    """
+    Same as fake_openai, for AsyncAzureOpenAI, streaming too.
+    """
+
+    async def create(self, messages, n: int = 1, stream: bool = False, **kwargs):
+        if stream:
+            return fake_async_stream(self.get_completion(messages).choices[0].message.content, self.latency)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self.get_completion(messages, n)
+
+
+class fake_out():
+    """
+    Stands in for a Cosmos output binding.
+    """
+
+    def __init__(self):
+        self.value = None
+
+
+    def set(self, value):
+        self.value = value
+
+
+    def get(self):
+        return self.value
+
+
+def use_fakes(registry, latency: float = 0.0, asynchronous: bool = False) -> Dict[str, Any]:
+    """
+    Overrides every data client in a function app's registry with a fake, returns the fakes by name.
+    e.g. fakes = use_fakes(async_function_app.registry, asynchronous=True)
+    """
+    container = fake_async_container if asynchronous else fake_container
+    fakes = {
+        "player_container": container("/id", latency),
+        "prompt_container": container("/username", latency),
+        "leaderboard_container": container("/id", latency),
+        "prompt_index_container": container("/id", latency),
+        "translation_cache_container": container("/id", latency),
+        "translator": (fake_async_translator if asynchronous else fake_translator)(latency),
+        "openai": (fake_async_openai if asynchronous else fake_openai)(latency),
+    }
+    for name, fake in fakes.items():
+        registry.override(name, fake)
+    return fakes
+
+
+def seed_player(fakes: Dict[str, Any], username: str, password: str, games_played: int = 0, total_score: int = 0):
+    """
+    Registers a player straight into the fake player container.
+    """
+    fakes["player_container"].load([{"id": utils().get_player_key(username), "username": username, "password": password,
+                                     "games_played": games_played, "total_score": total_score}])
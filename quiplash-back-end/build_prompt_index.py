@@ -0,0 +1,59 @@
+"""
+Builds the per-language prompt index from every prompt in the prompt container,
+one document per (username, language), so utils/get can use point reads instead of a JOIN.
+Run it once before setting PromptIndexContainerName, after that prompt/create and prompt/delete
+keep the index up to date. Safe to re-run, each player's documents are rewritten from their prompts.
+e.g. python build_prompt_index.py
+"""
+import json
+import logging
+from azure.cosmos import CosmosClient, ContainerProxy
+from shared_code.utils import utils
+
+utility = utils()
+
+
+def index_player(index_proxy: ContainerProxy, prompt_docs: list) -> int:
+    """
+    Writes one player's index documents, returns how many were written.
+    """
+    documents = utility.get_index_documents(prompt_docs)
+    for document in documents.values():
+        index_proxy.upsert_item(body=document)
+    return len(documents)
+
+
+def build_prompt_index(prompt_proxy: ContainerProxy, index_proxy: ContainerProxy) -> int:
+    """
+    Streams every prompt ordered by author, so only one player's prompts are held at a time.
+    """
+    query = "SELECT * FROM prompt p ORDER BY p.username"
+    written = 0
+    username, prompt_docs = None, []
+    for item in prompt_proxy.query_items(query=query, enable_cross_partition_query=True):
+        if item['username'] != username and prompt_docs:
+            written += index_player(index_proxy, prompt_docs)
+            logging.info("Indexed player: {}".format(username))
+            prompt_docs = []
+        username = item['username']
+        prompt_docs.append(item)
+
+    if prompt_docs:
+        written += index_player(index_proxy, prompt_docs)
+        logging.info("Indexed player: {}".format(username))
+    return written
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    # Configure the Proxy objects from the local.settings.json file.
+    with open('local.settings.json') as settings_file:
+        settings = json.load(settings_file)
+    MyCosmos = CosmosClient.from_connection_string(settings['Values']['AzureCosmosDBConnectionString']) # Cosmos Object
+    QuiplashProxy = MyCosmos.get_database_client(settings['Values']['DatabaseName']) # Proxy object for Quiplash database
+    PromptContainerProxy = QuiplashProxy.get_container_client(settings['Values']['PromptContainerName']) # Proxy obj for Prompt container
+    PromptIndexContainerProxy = QuiplashProxy.get_container_client(settings['Values']['PromptIndexContainerName']) # Proxy obj for Prompt index container
+
+    count = build_prompt_index(PromptContainerProxy, PromptIndexContainerProxy)
+    print("{} index documents written".format(count))
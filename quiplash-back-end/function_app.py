@@ -1,3 +1,5 @@
+import time
+import_started = time.perf_counter()
 import os
 import json
 import logging
@@ -5,104 +7,140 @@ import azure.functions as func
 from azure.cosmos import CosmosClient
 from azure.ai.translation.text import TextTranslationClient
 from azure.core.credentials import AzureKeyCredential
-from openai import AzureOpenAI
 
 # shared_code folder helper functions and classes
 from shared_code.player import player, UniquePlayerError, InvalidPlayerError, InvalidPasswordError
-from shared_code.prompt import prompt, UnsupportedLanguageError, InvalidTextError, NonExistingPlayerError
+from shared_code.prompt import prompt, UnsupportedLanguageError, InvalidTextError, NonExistingPlayerError, TranslationError
 from shared_code.open_ai import open_ai, ResponseError
-from shared_code.utils import utils
+from shared_code.utils import utils, TooManyConflictsError
+from shared_code.translation_cache import translation_cache
+from shared_code.clients import clients
+from shared_code.request_log import request_log
+from shared_code.metrics import metrics, tagged
+from shared_code.shared_state import podiums, suggestions
 
 app = func.FunctionApp()
+telemetry = metrics()                                                                           # Request charge and latency of every Cosmos call
 
-MyCosmos = CosmosClient.from_connection_string(os.environ['AzureCosmosDBConnectionString'])     # Cosmos Object
-QuiplashProxy = MyCosmos.get_database_client(os.environ['DatabaseName'])                        # Proxy for quiplash database
-PlayerContainerProxy = QuiplashProxy.get_container_client(os.environ['PlayerContainerName'])    # Proxy for player container
-PromptContainerProxy = QuiplashProxy.get_container_client(os.environ['PromptContainerName'])    # Proxy for prompt container
-TranslatorProxy = TextTranslationClient(endpoint=os.environ['TranslationEndpoint'], 
-                                        credential=AzureKeyCredential(os.environ['TranslationKey'])) # Proxy for translator
-OpenAIProxy = AzureOpenAI(api_key=os.environ['OAIKey'], api_version="2024-02-01", # Proxy for Open_AI
-                        azure_endpoint=os.environ['OAIEndpoint'],
-                        azure_deployment="gpt-35-turbo"
-                        )
+# The async variant under aio/ brings azure.cosmos.aio, aiohttp and the fastapi extension into every cold start,
+# so it's only served once AsyncRoutes is set to "true". Without the extension installed the app still starts, without it.
+if os.environ.get('AsyncRoutes', 'false').lower() == 'true':
+    try:
+        from async_function_app import bp as async_bp
+        app.register_functions(async_bp)
+    except ImportError as e:
+        logging.warning("AsyncRoutes is on but the aio/ routes can't be imported, serving without them: %s", e)
+
+# Every client below is only built on its first use, see shared_code/clients.py.
+registry = clients()
+registry.register("transport", registry.get_transport)                                          # Connection pool shared by the Azure clients
+MyCosmos = registry.register("cosmos", lambda: CosmosClient.from_connection_string(              # Cosmos Object
+    os.environ['AzureCosmosDBConnectionString'], transport=registry.get("transport")))
+QuiplashProxy = registry.register("database", lambda: MyCosmos.get_database_client(os.environ['DatabaseName'])) # Proxy for quiplash database
+PlayerContainerProxy = registry.register("player_container", lambda: telemetry.instrument(QuiplashProxy.get_container_client(os.environ['PlayerContainerName']))) # Proxy for player container
+PromptContainerProxy = registry.register("prompt_container", lambda: telemetry.instrument(QuiplashProxy.get_container_client(os.environ['PromptContainerName']))) # Proxy for prompt container
+LeaderboardContainerProxy = registry.register("leaderboard_container", lambda: telemetry.instrument(QuiplashProxy.get_container_client(os.environ['LeaderboardContainerName']))) # Proxy for leaderboard container
+PromptIndexContainerProxy = (registry.register("prompt_index_container", lambda: telemetry.instrument(QuiplashProxy.get_container_client(os.environ['PromptIndexContainerName']))) # Optional proxy for per-language prompt index
+                             if os.environ.get('PromptIndexContainerName') else None)
+TranslatorProxy = registry.register("translator", lambda: TextTranslationClient(endpoint=os.environ['TranslationEndpoint'], # Proxy for translator
+                                                                                credential=AzureKeyCredential(os.environ['TranslationKey']),
+                                                                                transport=registry.get("transport")))
+TranslationCacheProxy = (registry.register("translation_cache_container", lambda: telemetry.instrument(QuiplashProxy.get_container_client(os.environ['TranslationCacheContainerName']))) # Optional proxy for shared translation cache
+                         if os.environ.get('TranslationCacheContainerName') else None)
+CachedTranslatorProxy = translation_cache(TranslatorProxy, cache_proxy=TranslationCacheProxy,    # Proxy for translator behind the cache
+                                          max_entries=int(os.environ.get('TranslationCacheSize', '1024')),
+                                          ttl=int(os.environ.get('TranslationCacheTTL', '86400')))
+
+def get_openai_client():
+    """
+    openai (and pydantic) takes a while to import, and only prompt/suggest needs it.
+    """
+    from openai import AzureOpenAI
+    return AzureOpenAI(api_key=os.environ['OAIKey'], api_version="2024-02-01",
+                       azure_endpoint=os.environ['OAIEndpoint'],
+                       azure_deployment="gpt-35-turbo",
+                       http_client=registry.get_http_client()
+                       )
+
+OpenAIProxy = registry.register("openai", get_openai_client)                                   # Proxy for Open_AI
 
+log = request_log()
 utility = utils()
 oai = open_ai()
 
 
-# Cosmos decorator for registering a new player.
-@app.cosmos_db_output(  arg_name="playercontainerbinding",
-        	            database_name=os.environ['DatabaseName'],
-                        container_name=os.environ['PlayerContainerName'],
-                        create_if_not_exists=True,
-                        connection='AzureCosmosDBConnectionString')
 @app.route(route="player/register", methods=[func.HttpMethod.POST], auth_level=func.AuthLevel.FUNCTION)
-def player_register(req: func.HttpRequest, playercontainerbinding: func.Out[func.Document]) -> func.HttpResponse:
+@tagged
+def player_register(req: func.HttpRequest) -> func.HttpResponse:
     """
     Recieves a player's username and password in a JSON string to register to player container.
     e.g. {"username":  "antoni_gn" , "password" : "ILoveTricia"}
     """
     input = req.get_json()
-    logging.info('Python HTTP trigger function processed a PLAYER_REGISTER request: {}'.format(input))
+    log.request('Python HTTP trigger function processed a PLAYER_REGISTER request: %s', log.payload(input))
 
     # Converted to player object for validation.
     input_player = player(player_proxy=PlayerContainerProxy,username=input['username'], password=input['password'])
-    logging.info("Inputted new player: {}".format(input_player.to_dict()))
+    log.info("Inputted new player: %s", log.payload(input_player.to_dict()))
 
     try:
-        if input_player.is_valid():
-            # Insert in DB if player successfully validated.
-            player_doc_for_cosmos = func.Document.from_dict(input_player.to_dict())
-            playercontainerbinding.set(player_doc_for_cosmos)
-            logging.info("SUCCESS: Input player is valid, out binding successfully set.")
+        # Lengths are checked locally, then the player is created in one write that fails if the username is taken.
+        if input_player.register():
+            log.info("SUCCESS: Input player is valid and was created.")
+
+            # New players start on 0 ppgr, which may be a podium tier.
+            new_entry = {"username": input_player.username, "games_played": input_player.games_played, "total_score": input_player.total_score}
+            utility.update_leaderboard(PlayerContainerProxy, LeaderboardContainerProxy, [new_entry])
+            podiums.invalidate()
             return func.HttpResponse(body=json.dumps({"result": True, "msg": "OK"}),mimetype="application/json")
 
-    # Send error messages based on is_valid()'s result.
+    # Send error messages based on register()'s result.
     except UniquePlayerError as e:
-        logging.info("FAILURE: {}".format(e))
+        log.info("FAILURE: %s", e)
         response_body = json.dumps({"result": False, "msg": "Username already exists"})
         return func.HttpResponse(body=response_body,mimetype="application/json")
     
     except InvalidPlayerError as e:
-        logging.info("FAILURE: {}".format(e))
+        log.info("FAILURE: %s", e)
         response_body = json.dumps({"result": False, "msg": "Username less than 5 characters or more than 15 characters"})
         return func.HttpResponse(body=response_body,mimetype="application/json")
     
     except InvalidPasswordError as e:
-        logging.info("FAILURE: {}".format(e))
+        log.info("FAILURE: %s", e)
         response_body = json.dumps({"result": False, "msg": "Password less than 8 characters or more than 15 characters"})
         return func.HttpResponse(body=response_body,mimetype="application/json")
 
 
 
 @app.route(route="player/login", methods=[func.HttpMethod.GET], auth_level=func.AuthLevel.FUNCTION)
+@tagged
 def player_login(req: func.HttpRequest) -> func.HttpResponse:
     """
     Recieves a login attempt in a JSON document and checks credentials in the DB.
     e.g. {"username":  "antoni_gn" , "password" : "ILoveTricia"}
     """
     input = req.get_json()
-    logging.info('Python HTTP trigger function processed a PLAYER_LOGIN request: {}'.format(input))
+    log.request('Python HTTP trigger function processed a PLAYER_LOGIN request: %s', log.payload(input))
 
     # Extract the details from the inputted JSON.
     username = input['username']
     password = input['password']
 
     # Search for the player's credentials in the database.
-    query = 'SELECT * FROM player WHERE CONTAINS(player.username, "{0}") AND player.password = "{1}"'.format(username, password)
-    players = utility.get_queryed_items(PlayerContainerProxy,query=query)
-    if players:
-        logging.info("SUCCESS: login credentials validated.")
+    existing_player = utility.get_player(PlayerContainerProxy, username=username)
+    if existing_player and existing_player['password'] == password:
+        log.info("SUCCESS: login credentials validated.")
         response_body = json.dumps({"result": True, "msg": "OK"})
         return func.HttpResponse(body=response_body,mimetype="application/json")
     else:
-        logging.info("FAILURE: Username or password incorrect")
+        log.info("FAILURE: Username or password incorrect")
         response_body = json.dumps({"result": False, "msg": "Username or password incorrect"})
         return func.HttpResponse(body=response_body,mimetype="application/json")
 
 
 
 @app.route(route="player/update/", methods=[func.HttpMethod.PUT], auth_level=func.AuthLevel.FUNCTION)
+@tagged
 def player_update(req: func.HttpRequest) -> func.HttpResponse:
     """
     Recieves a update request in a JSON document, updates queried player.
@@ -110,7 +148,7 @@ def player_update(req: func.HttpRequest) -> func.HttpResponse:
     adds "add_to_games_played" to player's "games_played" and "add_to_score" to player's total_score.
     """
     input = req.get_json()
-    logging.info('Python HTTP trigger function processed an PLAYER_UPDATE request: {}'.format(input))
+    log.request('Python HTTP trigger function processed an PLAYER_UPDATE request: %s', log.payload(input))
 
     # Extract the input parameters
     username = input['username']
@@ -118,28 +156,85 @@ def player_update(req: func.HttpRequest) -> func.HttpResponse:
     add_to_score = input['add_to_score']
 
     # Search for the player's credentials in the database
-    query = 'SELECT * FROM player WHERE CONTAINS(player.username, "{0}")'.format(username)
-    query_result = utility.get_queryed_items(proxy=PlayerContainerProxy,query=query)
-    if query_result:
+    existing_player = utility.get_player(proxy=PlayerContainerProxy, username=username)
+    if existing_player:
         # Retrieve player item
-        id = [item['id'] for item in query_result][0]
-        logging.info('id found: {}'.format(id))        
-
-        update = utility.update_player(proxy=PlayerContainerProxy,id=id,games=add_to_games_played,score=add_to_score)
-        logging.info("Player's updated values -> games_played: {0}, total_score: {1}".format(update[0], update[1]))
+        id = existing_player['id']
+        log.info('id found: %s', id)        
+
+        try:
+            update = utility.update_player(proxy=PlayerContainerProxy,id=id,games=add_to_games_played,score=add_to_score)
+        except TooManyConflictsError as e:
+            log.warning("FAILURE: %s", e)
+            response_body = json.dumps({"result": False, "msg": "Cannot update player" })
+            return func.HttpResponse(body=response_body,mimetype="application/json")
+        log.info("Player's updated values -> games_played: %s, total_score: %s", update[0], update[1])
+
+        # Keep the leaderboard in step with the player's new stats.
+        updated_entry = {"username": existing_player['username'], "games_played": update[0], "total_score": update[1]}
+        utility.update_leaderboard(PlayerContainerProxy, LeaderboardContainerProxy, [updated_entry])
+        podiums.invalidate()
 
         # Send response
-        logging.info("SUCCESS: Player update executed successfully.")
+        log.info("SUCCESS: Player update executed successfully.")
         response_body = json.dumps({"result": True, "msg": "OK"})
         return func.HttpResponse(body=response_body,mimetype="application/json")
     else:
         # Non-existent player
-        logging.info("FAILURE: Player does not exist")
+        log.info("FAILURE: Player does not exist")
         response_body = json.dumps({"result": False, "msg": "Player does not exist" })
         return func.HttpResponse(body=response_body,mimetype="application/json")
 
 
 
+@app.route(route="player/update_batch", methods=[func.HttpMethod.PUT], auth_level=func.AuthLevel.FUNCTION)
+@tagged
+def player_update_batch(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    Recieves every player's update for a finished game in a JSON document, and responds with a result for each one in the same order.
+    e.g. {"players": [{"username": "user_to_modify" , "add_to_games_played": int , "add_to_score" : int }, ...]}
+    """
+    input = req.get_json()
+    log.request('Python HTTP trigger function processed a PLAYER_UPDATE_BATCH request: %s', log.payload(input))
+
+    # Find every player in one go and update them concurrently.
+    updates = input['players']
+    results = utility.update_players(PlayerContainerProxy, updates)
+
+    # Keep the leaderboard in step with the players' new stats, the latest update of each player wins.
+    updated_entries = {}
+    for update, result in zip(updates, results):
+        if isinstance(result, list):
+            updated_entries[update['username']] = {"username": update['username'], "games_played": result[0], "total_score": result[1]}
+    if updated_entries:
+        utility.update_leaderboard(PlayerContainerProxy, LeaderboardContainerProxy, list(updated_entries.values()))
+        podiums.invalidate()
+    for result in results:
+        if isinstance(result, TooManyConflictsError):
+            log.warning("FAILURE: %s", result)
+    log.info("SUCCESS: %s of %s player updates executed.", len([r for r in results if isinstance(r, list)]), len(updates))
+
+    # An update that was given up on can be sent again, unlike one for a player that doesn't exist.
+    response_body = [{"result": True, "msg": "OK"} if isinstance(result, list)
+                     else {"result": False, "msg": "Player does not exist" if result is None else "Cannot update player"}
+                     for result in results]
+    return func.HttpResponse(body=json.dumps(response_body),mimetype="application/json")
+
+
+
+def index_prompts(prompt_docs):
+    """
+    Indexes the created prompts, if there is an index. They're already created, so a failure only leaves the index behind.
+    """
+    if PromptIndexContainerProxy is None:
+        return
+    try:
+        utility.add_to_prompt_index(PromptIndexContainerProxy, prompt_docs)
+    except TooManyConflictsError as e:
+        log.warning("Prompt index is missing prompts, run build_prompt_index.py to catch it up: %s", e)
+
+
+
 # Cosmos decorator for registering a new prompt.
 @app.cosmos_db_output(  arg_name="promptcontainerbinding",
         	            database_name=os.environ['DatabaseName'],
@@ -147,96 +242,155 @@ def player_update(req: func.HttpRequest) -> func.HttpResponse:
                         create_if_not_exists=True,
                         connection='AzureCosmosDBConnectionString')
 @app.route(route="prompt/create", methods=[func.HttpMethod.POST], auth_level=func.AuthLevel.FUNCTION)
+@tagged
 def prompt_create(req: func.HttpRequest, promptcontainerbinding: func.Out[func.Document]) -> func.HttpResponse:
     """
     Recieves a create prompt request in a JSON document.
     e.g. {"text": "string", "username": "string" }
     """
     input = req.get_json()
-    logging.info('Python HTTP trigger function processed an PROMPT_CREATE request: {}'.format(input))
+    log.request('Python HTTP trigger function processed an PROMPT_CREATE request: %s', log.payload(input))
 
     # Get the parameters in the prompt object.
-    input_prompt = prompt(PlayerContainerProxy,TranslatorProxy,text=input['text'], username=input['username'])
-    logging.info(input_prompt.to_dict())
+    input_prompt = prompt(PlayerContainerProxy,CachedTranslatorProxy,text=input['text'], username=input['username'])
+    # Only the input, to_dict() would pay for the translation before any check has run.
+    log.info("Inputted new prompt: %s", log.payload({"text": input_prompt.text, "username": input_prompt.username}))
 
     try:
         if input_prompt.is_valid():
             # Insert in DB if prompt successfully validated. 
-            prompt_doc_for_cosmos = func.Document.from_dict(input_prompt.to_dict())
+            prompt_doc = input_prompt.to_dict()
+            prompt_doc_for_cosmos = func.Document.from_dict(prompt_doc)
             promptcontainerbinding.set(prompt_doc_for_cosmos)
-            logging.info("SUCCESS: Input prompt is valid, out binding successfully set.")
+            telemetry.record_binding(os.environ['PromptContainerName'], prompt_doc_for_cosmos)
+            index_prompts([prompt_doc])
+            log.info("SUCCESS: Input prompt is valid, out binding successfully set.")
             return func.HttpResponse(body=json.dumps({"result": True, "msg": "OK"}),mimetype="application/json")
 
     # Send error messages based on is_valid()'s result. 
     except NonExistingPlayerError as e:
-        logging.info("FAILURE: {}".format(e))
+        log.info("FAILURE: %s", e)
         response_body = json.dumps({"result": False, "msg": "Player does not exist" })
         return func.HttpResponse(body=response_body,mimetype="application/json")
 
     except InvalidTextError as e:
-        logging.info("FAILURE: {}".format(e))
+        log.info("FAILURE: %s", e)
         response_body = json.dumps({"result": False, "msg": "Prompt less than 20 characters or more than 100 characters" })
         return func.HttpResponse(body=response_body,mimetype="application/json")
 
     except UnsupportedLanguageError as e:
-        logging.info("FAILURE: {}".format(e))
+        log.info("FAILURE: %s", e)
         response_body = json.dumps({"result": False, "msg": "Unsupported language" })
         return func.HttpResponse(body=response_body,mimetype="application/json")
 
+    except TranslationError as e:
+        log.warning("FAILURE: %s", e)
+        response_body = json.dumps({"result": False, "msg": "Cannot translate prompt" })
+        return func.HttpResponse(body=response_body,mimetype="application/json")
+
+
+
+@app.route(route="prompt/create_batch", methods=[func.HttpMethod.POST], auth_level=func.AuthLevel.FUNCTION)
+@tagged
+def prompt_create_batch(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    Recieves many create prompt requests in a JSON document, and responds with a result for each one in the same order.
+    e.g. {"prompts": [{"text": "string", "username": "string" }, ...]}
+    """
+    input = req.get_json()
+    log.request('Python HTTP trigger function processed a PROMPT_CREATE_BATCH request: %s', log.payload(input))
+
+    # Validate every prompt together, one player query and packed translator calls.
+    input_prompts = [prompt(PlayerContainerProxy,CachedTranslatorProxy,text=item['text'], username=item['username']) for item in input['prompts']]
+    errors = prompt.validate_all(input_prompts)
+
+    # Insert the valid prompts in DB, one transactional batch per author.
+    valid_indexes = [index for index, error in enumerate(errors) if error is None]
+    valid_prompts = [input_prompts[index].to_dict() for index in valid_indexes]
+    write_errors = utility.create_items_batched(PromptContainerProxy, valid_prompts, partition_field="username")
+    for index, write_error in zip(valid_indexes, write_errors):
+        if write_error is not None:
+            log.warning("FAILURE: prompt by %s was not inserted: %s", input_prompts[index].username, write_error)
+            errors[index] = write_error
+
+    # Only index the prompts whose batch committed.
+    created_prompts = [prompt_doc for prompt_doc, write_error in zip(valid_prompts, write_errors) if write_error is None]
+    index_prompts(created_prompts)
+    log.info("SUCCESS: %s of %s prompts were valid and inserted.", len(created_prompts), len(input_prompts))
+
+    # Same error messages as prompt/create, any other error is a batch that failed to write.
+    error_messages = {NonExistingPlayerError: "Player does not exist",
+                      InvalidTextError: "Prompt less than 20 characters or more than 100 characters",
+                      UnsupportedLanguageError: "Unsupported language",
+                      TranslationError: "Cannot translate prompt"}
+    results = [{"result": True, "msg": "OK"} if error is None
+               else {"result": False, "msg": error_messages.get(type(error), "Cannot create prompt")}
+               for error in errors]
+    return func.HttpResponse(body=json.dumps(results),mimetype="application/json")
+
 
 
 @app.route(route="prompt/suggest", methods=[func.HttpMethod.POST], auth_level=func.AuthLevel.FUNCTION)
+@tagged
 def prompt_suggest(req: func.HttpRequest) -> func.HttpResponse:
     """
     Recieves a create prompt request in a JSON document, and returns the ai-bots response.
     e.g. {"keyword": "string" }
     """
     input = req.get_json()
-    logging.info('Python HTTP trigger function processed a PROMPT_SUGGEST request: {}'.format(input))
+    log.request('Python HTTP trigger function processed a PROMPT_SUGGEST request: %s', log.payload(input))
     
     # Get keyword and input it in the ai bot.
     keyword = input['keyword']
 
+    # Answer from the pool if it has one, and top the keyword up in the background either way.
+    suggestion = suggestions.take(keyword)
+    suggestions.request_refill(keyword, lambda pooled: oai.suggest_prompts(ai_proxy=OpenAIProxy,keyword=pooled))
+    # X-Suggestion-Source tells a pooled suggestion ("pool") from one generated for this request ("openai").
+    if suggestion:
+        log.info("SUCCESS: took the following suggestion from the pool -> %s", suggestion)
+        return func.HttpResponse(body=json.dumps({"suggestion": suggestion}),mimetype="application/json",headers={"X-Suggestion-Source": "pool"})
+
     try:
-        suggestion = oai.suggest_prompt(ai_proxy=OpenAIProxy,keyword=keyword)
+        suggestion, *candidates = oai.suggest_prompts(ai_proxy=OpenAIProxy,keyword=keyword)
+        # The other candidates were paid for too, keep them for the next ask.
+        suggestions.add(keyword, candidates)
         if suggestion:
             # Send the resulted suggestion.
-            logging.info("SUCCESS: generated the following suggestion -> {}".format(suggestion))
-            return func.HttpResponse(body=json.dumps({"suggestion": suggestion}),mimetype="application/json")
+            log.info("SUCCESS: generated the following suggestion -> %s", suggestion)
+            return func.HttpResponse(body=json.dumps({"suggestion": suggestion}),mimetype="application/json",headers={"X-Suggestion-Source": "openai"})
     except ResponseError as e:
         # If it gives an invalid response.
-        logging.info("FAILURE: {}".format(e))
+        log.info("FAILURE: %s", e)
         response_body = json.dumps({"suggestion" : "Cannot generate suggestion" })
         return func.HttpResponse(body=response_body,mimetype="application/json")
 
 
 
 @app.route(route="prompt/delete", methods=[func.HttpMethod.POST], auth_level=func.AuthLevel.FUNCTION)
+@tagged
 def prompt_delete(req: func.HttpRequest) -> func.HttpResponse:
     """
     Recieves a delete prompt request in a JSON document and deletes all prompts authored by player "username"
     e.g. {"player" : "username" } 
     """
     input = req.get_json()
-    logging.info('Python HTTP trigger function processed a PROMPT_DELETE request: {}'.format(input))
+    log.request('Python HTTP trigger function processed a PROMPT_DELETE request: %s', log.payload(input))
 
-    # query all the prompts from inputted player
+    # Prompts are partitioned by username, so delete everything in the player's partition
     username = input['player']
-    query = "SELECT * FROM prompt WHERE prompt.username = '{}'".format(username)
-    query_result = utility.get_queryed_items(PromptContainerProxy, query=query)
-    count = len(query_result)
-    
-    # Delete all the matched items
-    for item in query_result:
-        PromptContainerProxy.delete_item(item=item,partition_key=username)
+    count = utility.delete_partition_items(PromptContainerProxy, partition_key=username)
+    if PromptIndexContainerProxy is not None:
+        utility.delete_prompt_index(PromptIndexContainerProxy, username, prompt.supported_languages)
     message = "{} prompts deleted".format(str(count))
 
-    logging.info("SUCCESS: {}".format(message))
+    log.info("SUCCESS: %s", message)
     return func.HttpResponse(body=json.dumps({"result": True, "msg": message}),mimetype="application/json")
 
 
 
 @app.route(route="utils/get", methods=[func.HttpMethod.GET], auth_level=func.AuthLevel.FUNCTION)
+@tagged
 def utils_get(req: func.HttpRequest) -> func.HttpResponse:
     """
     {"players":  [list of usernames], "language": "langcode"} return a list of all prompts' texts in "langcode" language created by the players in the "players" list. 
@@ -244,44 +398,57 @@ def utils_get(req: func.HttpRequest) -> func.HttpResponse:
     If none of the usernames in the list exist or have prompts, return an empty list. 
     Output can be in any order.
     You may assume we will not test an invalid "langcode"
+    Optionally pages the result: {..., "page_size": 50, "continuation": "token from the previous page"}
+    returns {"prompts": [up to 50 prompts], "continuation": "token for the next page" or null on the last page}.
     """
     input = req.get_json()
-    logging.info('Python HTTP trigger function processed a UTILS_GET request: {}'.format(input))
-
-    # query the list of users and the language
-    usernames = input['players']
-    language = input['language']
+    log.request('Python HTTP trigger function processed a UTILS_GET request for %s players in "%s"', len(input['players']), input['language'])
 
     # Write the SQL to get the given users' prompts in the given language
-    usernames_for_SQL = utility.convert_to_query_list(usernames)
-    query = "SELECT p.id, t.text, p.username FROM prompt p JOIN t IN p.texts WHERE t.language = '{0}' AND p.username IN {1}".format(language,usernames_for_SQL)
-    query_result = utility.get_queryed_items(PromptContainerProxy, query=query)
-
-    # Append the results in the appropriate format
-    dict_result = []
-    for item in query_result:
-        dict_result.append({ "id": item['id'], "text": item['text'], "username": item['username'] })
+    query, parameters = utility.get_texts_query(input['players'], input['language'])
+
+    if 'page_size' in input:
+        # Only one page is fetched, the client asks for the next one with the continuation token.
+        items, continuation = utility.get_queryed_page(PromptContainerProxy, query=query, page_size=int(input['page_size']),
+                                                       continuation=input.get('continuation'), parameters=parameters)
+        dict_result = {"prompts": [{ "id": item['id'], "text": item['text'], "username": item['username'] } for item in items],
+                       "continuation": continuation}
+        log.info("Sending a page of %s prompts", len(dict_result['prompts']))
+        return func.HttpResponse(body=json.dumps(dict_result),mimetype="application/json")
+
+    if PromptIndexContainerProxy is not None:
+        # One point read per player instead of a cross-partition JOIN.
+        dict_result = utility.get_indexed_texts(PromptIndexContainerProxy, input['players'], input['language'])
+    else:
+        # Append the results in the appropriate format
+        dict_result = [{ "id": item['id'], "text": item['text'], "username": item['username'] }
+                       for item in utility.iter_queryed_items(PromptContainerProxy, query=query, parameters=parameters)]
 
-    logging.info("Sending the result: {}".format(dict_result))
+    log.info("Sending %s prompts", len(dict_result))
     return func.HttpResponse(body=json.dumps(dict_result),mimetype="application/json")
 
 
 
 @app.route(route="utils/podium", methods=[func.HttpMethod.GET], auth_level=func.AuthLevel.FUNCTION)
+@tagged
 def utils_podium(req: func.HttpRequest) -> func.HttpResponse:
     """
     Output the dictionary of list of players with the highest ppgr (points per game ratio)
     Note two or more players may have the same points per game ratio, which is why we ask for a dict of lists. 
     In case of multiple players with same ppgr, the list must be ordered by increasing number of games played, then by increasing alphabetic order.
+    The response has an ETag header, sending it back in If-None-Match gets an empty 304 while the podium is unchanged.
     """
-    logging.info('Python HTTP trigger function processed a UTILS_PODIUM request')
-    # Query for the list of players
-    query = "SELECT p.username, p.games_played, p.total_score FROM player p"
-    query_result = utility.get_queryed_items(PlayerContainerProxy, query=query)
+    log.request('Python HTTP trigger function processed a UTILS_PODIUM request')
+    # The leaderboard document already holds the top ranked players in order, and is only read again after a player write.
+    body, etag = podiums.get(lambda: utility.get_leaderboard_podium(PlayerContainerProxy, LeaderboardContainerProxy))
+
+    if podiums.is_not_modified(req.headers.get('If-None-Match'), etag):
+        log.info("Podium not modified: %s", etag)
+        return func.HttpResponse(status_code=304, headers={"ETag": etag})
+    log.info("FINAL PODIUM: %s bytes, ETag %s", len(body), etag)
+    return func.HttpResponse(body=body,mimetype="application/json",headers={"ETag": etag})
+
 
-    # Orders the players in ranking order and present in podium.
-    players_ranked = utility.sort_to_ppgr_games_played(query_result)
-    podium = utility.get_podium(players_ranked)
 
-    logging.info("FINAL PODIUM: {}".format(podium))
-    return func.HttpResponse(body=json.dumps(podium),mimetype="application/json")
\ No newline at end of file
+# Everything above, including async_function_app, is what a cold start imports.
+registry.record("import", time.perf_counter() - import_started)
\ No newline at end of file
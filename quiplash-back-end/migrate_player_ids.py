@@ -0,0 +1,75 @@
+"""
+Online migration that re-keys players stored under a random id to their username key,
+so every lookup becomes a point read. Safe to run while the function app is serving,
+and safe to re-run. Once it reports 0 migrated, set LegacyPlayerLookup to "false".
+e.g. python migrate_player_ids.py
+"""
+import json
+import logging
+from azure.core import MatchConditions
+from azure.cosmos import CosmosClient, ContainerProxy
+from azure.cosmos.exceptions import CosmosResourceExistsError, CosmosResourceNotFoundError, CosmosAccessConditionFailedError
+from shared_code.utils import utils
+
+utility = utils()
+
+
+def migrate_player(proxy: ContainerProxy, legacy: dict) -> bool:
+    """
+    Copies one legacy player to its username key and deletes the old document.
+    Returns True if the player was migrated.
+    """
+    key = utility.get_player_key(legacy['username'])
+    if legacy['id'] == key:
+        return False
+
+    # Copy to the new key, if a previous run already did, the keyed copy is authoritative.
+    keyed = {k: v for k, v in legacy.items() if not k.startswith('_')}
+    keyed['id'] = key
+    try:
+        proxy.create_item(body=keyed)
+    except CosmosResourceExistsError:
+        pass
+
+    while True:
+        try:
+            # Only delete if nothing wrote to the legacy document since we copied it.
+            proxy.delete_item(item=legacy['id'], partition_key=legacy['id'],
+                              etag=legacy['_etag'], match_condition=MatchConditions.IfNotModified)
+            return True
+        except CosmosResourceNotFoundError:
+            return True
+        except CosmosAccessConditionFailedError:
+            # An update landed on the legacy document mid-copy, carry its increments over.
+            # As increments, so they add up with any update_player patch landing on the keyed copy meanwhile.
+            latest = proxy.read_item(item=legacy['id'], partition_key=legacy['id'])
+            proxy.patch_item(item=key, partition_key=key, patch_operations=[
+                {"op": "incr", "path": "/games_played", "value": latest['games_played'] - legacy['games_played']},
+                {"op": "incr", "path": "/total_score", "value": latest['total_score'] - legacy['total_score']}])
+            legacy = latest
+
+
+def migrate_players(proxy: ContainerProxy) -> int:
+    """
+    Streams every player and migrates the ones not stored under their username key.
+    """
+    migrated = 0
+    for item in proxy.query_items(query="SELECT * FROM player", enable_cross_partition_query=True):
+        if migrate_player(proxy, item):
+            migrated += 1
+            logging.info("Migrated player: {}".format(item['username']))
+    return migrated
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    # Configure the Proxy objects from the local.settings.json file.
+    with open('local.settings.json') as settings_file:
+        settings = json.load(settings_file)
+    MyCosmos = CosmosClient.from_connection_string(settings['Values']['AzureCosmosDBConnectionString']) # Cosmos Object
+    QuiplashProxy = MyCosmos.get_database_client(settings['Values']['DatabaseName']) # Proxy object for Quiplash database
+    PlayerContainerProxy = QuiplashProxy.get_container_client(settings['Values']['PlayerContainerName']) # Proxy obj for Player container
+
+    count = migrate_players(PlayerContainerProxy)
+    print("{} players migrated".format(count))
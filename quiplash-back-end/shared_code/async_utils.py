@@ -0,0 +1,233 @@
+from __future__ import annotations
+import asyncio
+import logging
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, AsyncIterator
+from azure.core import MatchConditions
+from azure.cosmos.exceptions import CosmosResourceNotFoundError, CosmosResourceExistsError, CosmosAccessConditionFailedError
+from shared_code.utils import utils, TooManyConflictsError
+
+if TYPE_CHECKING:
+    # Only for annotations, so the sync app doesn't import the aio SDK through player and prompt.
+    from azure.cosmos.aio import ContainerProxy
+
+class async_utils(utils):
+    """
+    The utility class for the async function app.
+    Same methods as utils for the aio routes, but every Cosmos call is awaited on an azure.cosmos.aio proxy.
+    The batch helpers (e.g. create_items_batched, update_players) have no async version, only the sync app has batch routes.
+    """
+
+    async def get_queryed_items(self, proxy: ContainerProxy, query: str, parameters: Optional[List[Dict[str, Any]]] = None):
+        """
+        Returns items from proxy objects' querying.
+        """
+        return [item async for item in proxy.query_items(query=query, parameters=parameters)]
+
+
+    async def get_queryed_page(self, proxy: ContainerProxy, query: str, page_size: int, continuation: Optional[str] = None,
+                               parameters: Optional[List[Dict[str, Any]]] = None):
+        """
+        Returns one page of at most page_size items and the continuation token for the next one.
+        """
+        pages = proxy.query_items(query=query, parameters=parameters, max_item_count=page_size).by_page(continuation)
+        try:
+            items = [item async for item in await pages.__anext__()]
+        except StopAsyncIteration:
+            items = []
+        return items, pages.continuation_token
+
+
+    async def iter_queryed_pages(self, proxy: ContainerProxy, query: str, page_size: int,
+                                 parameters: Optional[List[Dict[str, Any]]] = None) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Yields the query's items a page at a time, only the current page is held in memory.
+        """
+        async for page in proxy.query_items(query=query, parameters=parameters, max_item_count=page_size).by_page():
+            yield [item async for item in page]
+
+
+    async def get_player(self, proxy: ContainerProxy, username: str) -> Optional[Dict[str, Any]]:
+        """
+        Point-reads a player by their exact username, returns None if the player doesn't exist.
+        """
+        key = self.get_player_key(username)
+        try:
+            return await proxy.read_item(item=key, partition_key=key)
+        except CosmosResourceNotFoundError:
+            pass
+
+        return await self.get_legacy_player(proxy, username)
+
+
+    async def get_legacy_player(self, proxy: ContainerProxy, username: str) -> Optional[Dict[str, Any]]:
+        """
+        Looks a player registered before usernames became the key up by an exact match, None once LegacyPlayerLookup is off.
+        """
+        if not self.legacy_player_lookup:
+            return None
+
+        # Player may still be stored under a random id.
+        query, parameters = self.get_query("player", username=username)
+        players = await self.get_queryed_items(proxy, query=query, parameters=parameters)
+        return players[0] if players else None
+
+
+    async def delete_partition_items(self, proxy: ContainerProxy, partition_key: str) -> int:
+        """
+        Deletes every item in one partition, returns how many were deleted.
+        Only ids are streamed back, a page of 100 at a time, and each page is one transactional batch.
+        """
+        query = self.queries["item_ids"]
+        pages = proxy.query_items(query=query, partition_key=partition_key, max_item_count=100).by_page()
+
+        count = 0
+        async for page in pages:
+            operations = [("delete", (id,)) async for id in page]
+            if operations:
+                await proxy.execute_item_batch(batch_operations=operations, partition_key=partition_key)
+                count += len(operations)
+        return count
+
+
+    async def add_to_prompt_index(self, proxy: ContainerProxy, prompt_docs: List[Dict[str, Any]]):
+        """
+        Appends new prompts to their index documents, creating the documents that don't exist yet.
+        """
+        async def add_document(key, document):
+            # A patch holds at most 10 operations.
+            for start in range(0, len(document['prompts']), 10):
+                prompts = document['prompts'][start:start + 10]
+                operations = [{"op": "add", "path": "/prompts/-", "value": indexed} for indexed in prompts]
+                for attempt in range(self.max_attempts):
+                    await asyncio.sleep(self.get_backoff(attempt))
+                    try:
+                        await proxy.patch_item(item=key, partition_key=key, patch_operations=operations)
+                        break
+                    except CosmosResourceNotFoundError:
+                        try:
+                            await proxy.create_item(body=dict(document, prompts=prompts))
+                            break
+                        except CosmosResourceExistsError:
+                            # Another request created it first, append to theirs.
+                            continue
+                else:
+                    raise TooManyConflictsError("Index document {} not written after {} attempts".format(key, self.max_attempts))
+
+        await asyncio.gather(*[add_document(key, document) for key, document in self.get_index_documents(prompt_docs).items()])
+
+
+    async def delete_prompt_index(self, proxy: ContainerProxy, username: str, languages: List[str]):
+        """
+        Deletes a player's index documents in every language.
+        """
+        async def delete_document(key):
+            try:
+                await proxy.delete_item(item=key, partition_key=key)
+            except CosmosResourceNotFoundError:
+                pass
+
+        await asyncio.gather(*[delete_document(self.get_index_key(username, language)) for language in languages])
+
+
+    async def get_indexed_texts(self, proxy: ContainerProxy, usernames: List[str], language: str) -> List[Dict[str, Any]]:
+        """
+        Same result as querying with get_texts_query, from concurrent point reads of the players' index documents.
+        """
+        async def read_document(username):
+            key = self.get_index_key(username, language)
+            try:
+                return await proxy.read_item(item=key, partition_key=key)
+            except CosmosResourceNotFoundError:
+                return None
+
+        documents = await asyncio.gather(*[read_document(username) for username in dict.fromkeys(usernames)])
+        return [{"id": indexed['id'], "text": indexed['text'], "username": document['username']}
+                for document in documents if document is not None for indexed in document['prompts']]
+
+
+    async def update_player(self, proxy: ContainerProxy, id: str, games, score):
+        """
+        Same as utils.update_player(), the retries' backoff is awaited.
+        """
+        patches = self.get_update_patches(games, score)
+        for attempt in range(self.max_attempts):
+            await asyncio.sleep(self.get_backoff(attempt))
+            for patch_operations, filter_predicate in patches:
+                try:
+                    updated = await proxy.patch_item(item=id, partition_key=id, patch_operations=patch_operations,
+                                                     filter_predicate=filter_predicate)
+                    # Return the updated games_played and total_score:
+                    return [ updated['games_played'], updated['total_score'] ]
+                except CosmosAccessConditionFailedError:
+                    # The score didn't match this patch's condition, try the other one.
+                    continue
+        raise TooManyConflictsError("Player {} not updated after {} attempts".format(id, self.max_attempts))
+
+
+    async def rebuild_leaderboard(self, player_proxy: ContainerProxy, leaderboard_proxy: ContainerProxy) -> Dict[str, Any]:
+        """
+        Rebuilds the leaderboard document from every player in the database.
+        """
+        query = self.queries["player_stats"]
+        # One tier more than kept, so trimming tells us whether anyone was left out.
+        tiers = self.leaderboard_tiers + 1
+
+        # Carry the selected players over from page to page, so only one page is held at a time.
+        players = []
+        async for page in player_proxy.query_items(query=query).by_page():
+            players = self.select_top_tiers(players + [item async for item in page], tiers=tiers)
+
+        leaderboard = {"id": self.leaderboard_id, "complete": True, "cutoff": None}
+        self.trim_leaderboard(leaderboard, players)
+        return await leaderboard_proxy.upsert_item(body=leaderboard)
+
+
+    async def drop_leaderboard(self, leaderboard_proxy: ContainerProxy):
+        """
+        Same as utils.drop_leaderboard().
+        """
+        try:
+            await leaderboard_proxy.delete_item(item=self.leaderboard_id, partition_key=self.leaderboard_id)
+        except CosmosResourceNotFoundError:
+            pass
+
+
+    async def update_leaderboard(self, player_proxy: ContainerProxy, leaderboard_proxy: ContainerProxy, updates: List[Dict[str, Any]]):
+        """
+        Same as utils.update_leaderboard(), the retries' backoff is awaited.
+        e.g. updates = [{"username": "antoni_gn", "games_played": 10, "total_score": 40}]
+        """
+        for attempt in range(self.max_attempts):
+            await asyncio.sleep(self.get_backoff(attempt))
+            try:
+                leaderboard = await leaderboard_proxy.read_item(item=self.leaderboard_id, partition_key=self.leaderboard_id)
+            except CosmosResourceNotFoundError:
+                leaderboard = await self.rebuild_leaderboard(player_proxy, leaderboard_proxy)
+
+            if not self.apply_to_leaderboard(leaderboard, updates):
+                # Too many players dropped below the cutoff, recount everyone.
+                leaderboard = await self.rebuild_leaderboard(player_proxy, leaderboard_proxy)
+                self.apply_to_leaderboard(leaderboard, updates)
+
+            try:
+                # Only replace if no other update changed the leaderboard since we read it.
+                await leaderboard_proxy.replace_item(item=self.leaderboard_id, body=leaderboard,
+                                                     etag=leaderboard['_etag'], match_condition=MatchConditions.IfNotModified)
+                return
+            except CosmosAccessConditionFailedError:
+                continue
+
+        logging.warning("Leaderboard kept changing after %s attempts, dropping it to be rebuilt", self.max_attempts)
+        await self.drop_leaderboard(leaderboard_proxy)
+
+
+    async def get_leaderboard_podium(self, player_proxy: ContainerProxy, leaderboard_proxy: ContainerProxy) -> Dict:
+        """
+        Gets the podium from the leaderboard document, building it if it doesn't exist yet.
+        """
+        try:
+            leaderboard = await leaderboard_proxy.read_item(item=self.leaderboard_id, partition_key=self.leaderboard_id)
+        except CosmosResourceNotFoundError:
+            leaderboard = await self.rebuild_leaderboard(player_proxy, leaderboard_proxy)
+
+        return self.get_podium(leaderboard['players'])
@@ -0,0 +1,134 @@
+import os
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict
+
+class lazy_client():
+    """
+    Stands in for a registered client, it is only built the first time one of its attributes is used.
+    Everything is passed straight through to the built client.
+    """
+
+    def __init__(self, registry: 'clients', name: str):
+        self.registry = registry
+        self.name = name
+
+
+    def __getattr__(self, attr):
+        return getattr(self.registry.get(self.name), attr)
+
+
+class clients():
+    """
+    Registry of the function app's service clients.
+    Each client is built on first use and kept warm for the life of the worker, so a cold start
+    only pays for the clients its first request needs (e.g. utils/podium never builds the translator).
+    e.g. PlayerContainerProxy = registry.register("player_container", lambda: ...)
+    """
+
+    # Connections kept open per host, shared by every client on the same transport.
+    pool_size = int(os.environ.get('ClientPoolSize', '32'))
+    # Seconds an idle connection is kept alive.
+    keep_alive = int(os.environ.get('ClientKeepAlive', '60'))
+
+    def __init__(self):
+        self.factories = {}     # name -> function that builds the client
+        self.instances = {}     # name -> built client
+        self.timings = {}       # name -> seconds it took to build (or import)
+        self.lock = threading.RLock()
+
+
+    def register(self, name: str, factory: Callable[[], Any]) -> lazy_client:
+        """
+        Registers how to build a client, returns a stand-in that builds it on first use.
+        """
+        self.factories[name] = factory
+        return lazy_client(self, name)
+
+
+    def get(self, name: str) -> Any:
+        """
+        Returns the built client, building it if this is its first use.
+        """
+        client = self.instances.get(name)
+        if client is not None:
+            return client
+
+        # Factories may get the clients they depend on, hence the re-entrant lock.
+        with self.lock:
+            if name not in self.instances:
+                started = time.perf_counter()
+                self.instances[name] = self.factories[name]()
+                self.record(name, time.perf_counter() - started)
+            return self.instances[name]
+
+
+    def override(self, name: str, client: Any):
+        """
+        Replaces a client, e.g. with a local fake for tests and benchmarks.
+        """
+        with self.lock:
+            self.instances[name] = client
+
+
+    def record(self, name: str, seconds: float):
+        """
+        Records how long a client (or anything else on the cold start path) took.
+        """
+        self.timings[name] = seconds
+        logging.info("%s ready in %.1f ms", name, seconds * 1000)
+
+
+    def get_timings(self) -> Dict[str, float]:
+        """
+        Returns the recorded timings in milliseconds.
+        e.g. {"import": 412.3, "cosmos": 180.5, "player_container": 0.1}
+        """
+        return {name: round(seconds * 1000, 1) for name, seconds in self.timings.items()}
+
+
+    def get_transport(self):
+        """
+        Requests transport with one keep-alive connection pool, shared by the sync Azure SDK clients.
+        """
+        import requests
+        from requests.adapters import HTTPAdapter
+        from azure.core.pipeline.transport import RequestsTransport
+
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        # The session outlives any one client closing its transport.
+        return RequestsTransport(session=session, session_owner=False)
+
+
+    def get_async_transport(self):
+        """
+        aiohttp transport with one keep-alive connection pool, shared by the async Azure SDK clients.
+        Must be built inside the event loop, which first use always is.
+        """
+        import aiohttp
+        from azure.core.pipeline.transport import AioHttpTransport
+
+        connector = aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=self.keep_alive)
+        return AioHttpTransport(session=aiohttp.ClientSession(connector=connector), session_owner=False)
+
+
+    def get_http_client(self):
+        """
+        httpx client for OpenAI, with the same pool size and keep-alive.
+        """
+        import httpx
+        limits = httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size, keepalive_expiry=self.keep_alive)
+        return httpx.Client(limits=limits)
+
+
+    def get_async_http_client(self):
+        """
+        httpx async client for async OpenAI, with the same pool size and keep-alive.
+        """
+        import httpx
+        limits = httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size, keepalive_expiry=self.keep_alive)
+        return httpx.AsyncClient(limits=limits)
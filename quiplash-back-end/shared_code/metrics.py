@@ -0,0 +1,341 @@
+import os
+import json
+import time
+import inspect
+import logging
+import functools
+import contextvars
+from typing import Any, Callable, Dict, Optional
+from azure.core.exceptions import HttpResponseError
+
+# The handler being served, every Cosmos operation it makes is tagged with its name.
+endpoint = contextvars.ContextVar("endpoint", default=None)
+
+
+def tagged(handler: Callable) -> Callable:
+    """
+    Decorates a handler so the Cosmos operations it makes are tagged with its name.
+    Goes under the route decorator, e.g. @app.route(...) then @tagged then def player_login(...)
+    """
+    if inspect.iscoroutinefunction(handler):
+        @functools.wraps(handler)
+        async def tagged_handler(*args, **kwargs):
+            token = endpoint.set(handler.__name__)
+            try:
+                return await handler(*args, **kwargs)
+            finally:
+                endpoint.reset(token)
+    else:
+        @functools.wraps(handler)
+        def tagged_handler(*args, **kwargs):
+            token = endpoint.set(handler.__name__)
+            try:
+                return handler(*args, **kwargs)
+            finally:
+                endpoint.reset(token)
+    return tagged_handler
+
+
+def in_context(function: Callable) -> Callable:
+    """
+    Runs function in a copy of the caller's context, so work handed to a thread pool keeps its endpoint tag.
+    e.g. executor.map(in_context(read_document), usernames)
+    """
+    context = contextvars.copy_context()
+    return lambda *args: context.copy().run(function, *args)
+
+
+class operation():
+    """
+    One Cosmos operation's metrics, added up over every response it took (e.g. every page of a query).
+    Handed to the SDK as the response_hook, which calls it with each response's headers.
+    """
+
+    def __init__(self, recorder: 'metrics', container: str, name: str, query: Optional[str] = None):
+        self.recorder = recorder
+        self.metric = {"endpoint": endpoint.get(), "container": container, "operation": name, "query": query,
+                       "request_charge": 0.0, "pages": 0, "items": 0, "bytes": 0, "elapsed_ms": 0.0, "status": 200}
+        self.emitted = False
+
+
+    def __call__(self, headers, result):
+        # query_items also calls it once with the pager itself, before any page has been fetched.
+        if result is not None and not isinstance(result, (dict, list)):
+            return
+        self.add_headers(headers)
+        self.metric['pages'] += 1
+
+
+    def add_headers(self, headers):
+        self.metric['request_charge'] += float(headers.get('x-ms-request-charge', 0))
+        self.metric['bytes'] += int(headers.get('Content-Length', 0))
+
+
+    def add_items(self, count: int):
+        self.metric['items'] += count
+
+
+    def add_elapsed(self, started: float):
+        self.metric['elapsed_ms'] += (time.perf_counter() - started) * 1000
+
+
+    def fail(self, error: HttpResponseError):
+        """
+        Failed operations still cost request units, e.g. a point read of a missing player.
+        """
+        self.add_headers(getattr(error, 'headers', None) or {})
+        self.metric['status'] = error.status_code
+
+
+    def emit(self):
+        if not self.emitted:
+            self.emitted = True
+            self.recorder.emit(self.metric)
+
+
+class instrumented_pages():
+    """
+    What by_page returns, timing each page's fetch.
+    Emitted after the last page, or when dropped before then (e.g. utils/get fetching a single page).
+    """
+
+    def __init__(self, pages, operation: operation):
+        self.pages = pages
+        self.operation = operation
+
+
+    @property
+    def continuation_token(self):
+        return self.pages.continuation_token
+
+
+    def __iter__(self):
+        return self
+
+
+    def __next__(self):
+        started = time.perf_counter()
+        try:
+            page = list(next(self.pages))
+        except StopIteration:
+            self.operation.add_elapsed(started)
+            self.operation.emit()
+            raise
+        except HttpResponseError as error:
+            self.operation.fail(error)
+            self.operation.add_elapsed(started)
+            self.operation.emit()
+            raise
+        self.operation.add_elapsed(started)
+        self.operation.add_items(len(page))
+        return iter(page)
+
+
+    def __del__(self):
+        self.operation.emit()
+
+
+class instrumented_query():
+    """
+    What query_items returns, iterable item by item or page by page, as one operation.
+    """
+
+    def __init__(self, pager, operation: operation):
+        self.pager = pager
+        self.operation = operation
+
+
+    def __iter__(self):
+        for page in self.by_page():
+            yield from page
+
+
+    def by_page(self, continuation: Optional[str] = None) -> instrumented_pages:
+        return instrumented_pages(self.pager.by_page(continuation), self.operation)
+
+
+class instrumented_container():
+    """
+    Wraps a container proxy so every operation reports its request charge, pages, elapsed time and result size.
+    Anything not wrapped is passed straight through to the proxy.
+    """
+
+    def __init__(self, proxy, recorder: 'metrics'):
+        self.proxy = proxy
+        self.recorder = recorder
+        self.container = proxy.id
+
+
+    def __getattr__(self, attr):
+        return getattr(self.proxy, attr)
+
+
+    def call(self, name: str, method: Callable, *args, **kwargs):
+        """
+        Calls one of the proxy's point operations (or a batch) as one operation.
+        """
+        current = operation(self.recorder, self.container, name)
+        started = time.perf_counter()
+        try:
+            result = method(*args, response_hook=current, **kwargs)
+            current.add_items(len(result) if isinstance(result, list) else int(result is not None))
+            return result
+        except HttpResponseError as error:
+            current.fail(error)
+            raise
+        finally:
+            current.add_elapsed(started)
+            current.emit()
+
+
+    def read_item(self, *args, **kwargs):
+        return self.call("read_item", self.proxy.read_item, *args, **kwargs)
+
+
+    def create_item(self, *args, **kwargs):
+        return self.call("create_item", self.proxy.create_item, *args, **kwargs)
+
+
+    def upsert_item(self, *args, **kwargs):
+        return self.call("upsert_item", self.proxy.upsert_item, *args, **kwargs)
+
+
+    def replace_item(self, *args, **kwargs):
+        return self.call("replace_item", self.proxy.replace_item, *args, **kwargs)
+
+
+    def delete_item(self, *args, **kwargs):
+        return self.call("delete_item", self.proxy.delete_item, *args, **kwargs)
+
+
+    def patch_item(self, *args, **kwargs):
+        return self.call("patch_item", self.proxy.patch_item, *args, **kwargs)
+
+
+    def execute_item_batch(self, *args, **kwargs):
+        return self.call("execute_item_batch", self.proxy.execute_item_batch, *args, **kwargs)
+
+
+    def query_items(self, *args, **kwargs):
+        current = operation(self.recorder, self.container, "query_items", query=kwargs.get('query', args[0] if args else None))
+        return instrumented_query(self.proxy.query_items(*args, response_hook=current, **kwargs), current)
+
+
+class async_instrumented_pages(instrumented_pages):
+    """
+    What the aio by_page returns, timing each page's fetch.
+    """
+
+    def __aiter__(self):
+        return self
+
+
+    async def __anext__(self):
+        started = time.perf_counter()
+        try:
+            page = [item async for item in await self.pages.__anext__()]
+        except StopAsyncIteration:
+            self.operation.add_elapsed(started)
+            self.operation.emit()
+            raise
+        except HttpResponseError as error:
+            self.operation.fail(error)
+            self.operation.add_elapsed(started)
+            self.operation.emit()
+            raise
+        self.operation.add_elapsed(started)
+        self.operation.add_items(len(page))
+        return self.iter_page(page)
+
+
+    async def iter_page(self, items):
+        for item in items:
+            yield item
+
+
+class async_instrumented_query(instrumented_query):
+    """
+    What the aio query_items returns, async iterable item by item or page by page, as one operation.
+    """
+
+    async def __aiter__(self):
+        async for page in self.by_page():
+            async for item in page:
+                yield item
+
+
+    def by_page(self, continuation: Optional[str] = None) -> async_instrumented_pages:
+        return async_instrumented_pages(self.pager.by_page(continuation), self.operation)
+
+
+class async_instrumented_container(instrumented_container):
+    """
+    Same as instrumented_container, for an azure.cosmos.aio proxy.
+    """
+
+    async def call(self, name: str, method: Callable, *args, **kwargs):
+        current = operation(self.recorder, self.container, name)
+        started = time.perf_counter()
+        try:
+            result = await method(*args, response_hook=current, **kwargs)
+            current.add_items(len(result) if isinstance(result, list) else int(result is not None))
+            return result
+        except HttpResponseError as error:
+            current.fail(error)
+            raise
+        finally:
+            current.add_elapsed(started)
+            current.emit()
+
+
+    def query_items(self, *args, **kwargs):
+        current = operation(self.recorder, self.container, "query_items", query=kwargs.get('query', args[0] if args else None))
+        return async_instrumented_query(self.proxy.query_items(*args, response_hook=current, **kwargs), current)
+
+
+class metrics():
+    """
+    Records what every Cosmos operation costs, tagged with the endpoint that made it, as one structured log line each.
+    e.g. COSMOS_METRIC {"endpoint": "utils_get", "container": "prompt", "operation": "query_items", "query": "SELECT ...",
+                        "request_charge": 12.4, "pages": 2, "items": 150, "bytes": 20480, "elapsed_ms": 35.2, "status": 200}
+    In Application Insights: traces | where message startswith "COSMOS_METRIC" | extend metric = parse_json(substring(message, 14))
+    The same dictionary is also passed as the record's custom_dimensions, for log exporters that pick them up.
+    """
+
+    # Set CosmosMetrics to "false" to send Cosmos calls straight to the proxies.
+    enabled = os.environ.get('CosmosMetrics', 'true').lower() == 'true'
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+
+
+    def instrument(self, proxy):
+        """
+        Wraps a container proxy, e.g. PlayerContainerProxy = metrics.instrument(QuiplashProxy.get_container_client(...))
+        """
+        return instrumented_container(proxy, self) if self.enabled else proxy
+
+
+    def instrument_async(self, proxy):
+        """
+        Same as instrument(), for an azure.cosmos.aio container proxy.
+        """
+        return async_instrumented_container(proxy, self) if self.enabled else proxy
+
+
+    def record_binding(self, container: str, document):
+        """
+        Records a document written through an output binding. The host writes it after the handler returns,
+        so only its size is known here, not its request charge.
+        """
+        if self.enabled:
+            self.emit({"endpoint": endpoint.get(), "container": container, "operation": "output_binding", "query": None,
+                       "request_charge": None, "pages": 0, "items": 1, "bytes": len(document.to_json()), "elapsed_ms": 0.0, "status": None})
+
+
+    def emit(self, metric: Dict[str, Any]):
+        if self.logger.isEnabledFor(logging.INFO):
+            if metric['request_charge'] is not None:
+                metric['request_charge'] = round(metric['request_charge'], 2)
+            metric['elapsed_ms'] = round(metric['elapsed_ms'], 2)
+            self.logger.info("COSMOS_METRIC {}".format(json.dumps(metric)), extra={"custom_dimensions": metric})
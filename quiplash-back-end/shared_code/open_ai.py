@@ -1,3 +1,5 @@
+import os
+from typing import Any, AsyncIterator, Dict, List
 from azure.cosmos import ContainerProxy
 
 class ResponseError(ValueError):
@@ -6,26 +8,124 @@ class open_ai():
     """
     Class to handle the open AI operations.
     """
-    
-    def suggest_prompt(self, ai_proxy: ContainerProxy, keyword):
+
+    # Candidates asked for in one call, so one bad sample doesn't cost another round-trip.
+    candidates = int(os.environ.get('SuggestionCandidates', '3'))
+    # A 100 character prompt is about 30 tokens, anything much longer is cut off and fails validation anyway.
+    max_tokens = int(os.environ.get('SuggestionMaxTokens', '60'))
+
+    def get_messages(self, keyword):
         """
-        Uses the chat playground to get the ai repsonse.
+        The chat messages asking for a prompt with the keyword.
         """
-
-        chat_completion = ai_proxy.chat.completions.create(
-            messages=[
+        return [
                 {
                     "role": "user",
                     "content": "Give a funny prompt between 20 and 100 characters with the exact keyword {} at least once for players to answer!".format(keyword)
                 }
-            ],
-            model="gpt-3.5-turbo-0301"
-        )
+            ]
 
-        reply = chat_completion.choices[0].message.content
 
-        # Validate reply to compensate for non-deterministic results
-        if keyword not in reply:
+    def clean_reply(self, reply):
+        """
+        Models like to wrap the prompt in quotes or whitespace, which isn't part of it.
+        e.g. '"Why did the boomer cross the road?"\n' -> 'Why did the boomer cross the road?'
+        """
+        return (reply or "").strip().strip('"').strip()
+
+
+    def check_reply(self, reply, keyword):
+        """
+        Validate reply to compensate for non-deterministic results, same length rules as prompt/create.
+        """
+        if keyword not in reply or not (20 <= len(reply) <= 100):
             raise ResponseError("Cannot generate suggestion")
         else:
-            return reply
\ No newline at end of file
+            return reply
+
+
+    def pick_replies(self, chat_completion, keyword) -> List[str]:
+        """
+        Returns every valid candidate of a completion, in order.
+        """
+        replies = []
+        for choice in chat_completion.choices:
+            try:
+                replies.append(self.check_reply(self.clean_reply(choice.message.content), keyword))
+            except ResponseError:
+                continue
+        if not replies:
+            raise ResponseError("Cannot generate suggestion")
+        return replies
+
+
+    def get_options(self):
+        return {"model": "gpt-3.5-turbo-0301", "n": self.candidates, "max_tokens": self.max_tokens}
+
+
+    def suggest_prompts(self, ai_proxy: ContainerProxy, keyword) -> List[str]:
+        """
+        Asks for several candidates in one call, returns the valid ones (e.g. to fill the suggestion pool).
+        """
+        chat_completion = ai_proxy.chat.completions.create(
+            messages=self.get_messages(keyword),
+            **self.get_options()
+        )
+        return self.pick_replies(chat_completion, keyword)
+
+
+    def suggest_prompt(self, ai_proxy: ContainerProxy, keyword):
+        """
+        Uses the chat playground to get the ai repsonse, the first valid candidate.
+        """
+        return self.suggest_prompts(ai_proxy, keyword)[0]
+
+
+    async def suggest_prompts_async(self, ai_proxy, keyword) -> List[str]:
+        """
+        Same as suggest_prompts(), with an AsyncAzureOpenAI proxy.
+        """
+        chat_completion = await ai_proxy.chat.completions.create(
+            messages=self.get_messages(keyword),
+            **self.get_options()
+        )
+        return self.pick_replies(chat_completion, keyword)
+
+
+    async def stream_prompt_async(self, ai_proxy, keyword) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streams one candidate as it's generated and validates it as it grows, with an AsyncAzureOpenAI proxy.
+        e.g. {"event": "token", "text": "Why"}, ..., {"event": "keyword"} once the keyword has appeared, ...
+             and last {"event": "done", "valid": True, "suggestion": "Why did the boomer cross the road?"}
+        Generation is stopped as soon as the reply is too long to be valid.
+        """
+        stream = await ai_proxy.chat.completions.create(
+            messages=self.get_messages(keyword),
+            model="gpt-3.5-turbo-0301",
+            max_tokens=self.max_tokens,
+            stream=True
+        )
+
+        reply, has_keyword = "", False
+        try:
+            async for chunk in stream:
+                # Azure sends a first chunk with only content filter results.
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if not delta:
+                    continue
+                reply += delta
+                yield {"event": "token", "text": delta}
+
+                # Only the new text (and what the keyword may straddle) needs searching.
+                if not has_keyword and keyword in reply[-(len(delta) + len(keyword)):]:
+                    has_keyword = True
+                    yield {"event": "keyword"}
+                if len(self.clean_reply(reply)) > 100:
+                    break
+        finally:
+            await stream.close()
+
+        try:
+            yield {"event": "done", "valid": True, "suggestion": self.check_reply(self.clean_reply(reply), keyword)}
+        except ResponseError as e:
+            yield {"event": "done", "valid": False, "suggestion": str(e)}
@@ -1,6 +1,7 @@
-import uuid
 from azure.cosmos import ContainerProxy
+from azure.cosmos.exceptions import CosmosResourceExistsError
 from shared_code.utils import utils
+from shared_code.async_utils import async_utils
 
 class UniquePlayerError(ValueError):
     pass
@@ -13,11 +14,12 @@ class player():
     Holds the information of a single player.
     """
     utility = utils()
+    async_utility = async_utils()
 
     # Constructor with default values to faciliate player creation:
     def __init__(self,player_proxy: ContainerProxy,username="guest",password="password",games_played=0,total_score=0):
-        # auto generated unique id
-        self.id = str(uuid.uuid4())
+        # Keyed by username so the player can be point-read
+        self.id = self.utility.get_player_key(username)
         self.PlayerContainerProxy = player_proxy
         self.username = username
         self.password = password
@@ -25,14 +27,43 @@ class player():
         self.total_score = total_score
 
 
-    def is_valid(self):
+    def register(self):
         """
-        Validation method to check the player inputted is correct.
+        Validates the player and stores it in one write, the lengths are checked before any I/O.
+        The document is keyed by username, so of two registrations racing for the same one, the second create conflicts.
         """
-        if not self.is_unique():
+        self.check_lengths()
+        # Players from before usernames became the key aren't caught by the conflict.
+        if self.utility.get_legacy_player(self.PlayerContainerProxy, self.username):
             raise UniquePlayerError("Username already exists")
-        
-        elif not (5 <= len(self.username) <= 15):
+
+        try:
+            self.PlayerContainerProxy.create_item(body=self.to_dict())
+        except CosmosResourceExistsError:
+            raise UniquePlayerError("Username already exists")
+        return True
+
+
+    async def register_async(self):
+        """
+        Same as register(), for a player built with an azure.cosmos.aio proxy.
+        """
+        self.check_lengths()
+        if await self.async_utility.get_legacy_player(self.PlayerContainerProxy, self.username):
+            raise UniquePlayerError("Username already exists")
+
+        try:
+            await self.PlayerContainerProxy.create_item(body=self.to_dict())
+        except CosmosResourceExistsError:
+            raise UniquePlayerError("Username already exists")
+        return True
+
+
+    def check_lengths(self):
+        """
+        Checks the username and password lengths.
+        """
+        if not (5 <= len(self.username) <= 15):
             raise InvalidPlayerError("Username less than 5 characters or more than 15 characters")
         
         elif not (8 <= len(self.password) <= 15):
@@ -41,22 +72,6 @@ class player():
         return True
 
 
-    def is_unique(self):
-        """
-        Iterates over list of players to check if it's unique
-        """
-        # Check if there is a player username already stored
-        username = self.username
-        query = 'SELECT * FROM player WHERE CONTAINS(player.username, "{}")'.format(username)
-        existing_username = self.utility.get_queryed_items(proxy=self.PlayerContainerProxy,query=query)
-        if not existing_username:
-            # If no existing username, then its unique.
-            return True
-        else:
-            # If there is, username already taken.
-            return False
-
-
     def to_dict(self):
         """
         Function return player info as a dictionary.
@@ -0,0 +1,80 @@
+import json
+import time
+import hashlib
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+class podium_cache():
+    """
+    Keeps utils/podium's JSON response between player writes, so polling it costs neither a Cosmos read nor re-serialization.
+    Player writes on this instance invalidate it straight away, writes on other instances show up within ttl seconds.
+    Each response has an ETag, a client that sends it back in If-None-Match gets an empty 304 while the podium is unchanged.
+    e.g. body, etag = podiums.get(lambda: utility.get_leaderboard_podium(PlayerContainerProxy, LeaderboardContainerProxy))
+    """
+
+    def __init__(self, ttl: float = 5):
+        self.ttl = ttl
+        self.entry = None       # (expires_at, body, etag)
+        self.generation = 0     # bumped by every invalidate, so a podium loaded before a write isn't kept
+        self.lock = threading.Lock()
+
+
+    def get_etag(self, body: str) -> str:
+        return '"{}"'.format(hashlib.sha256(body.encode("utf-8")).hexdigest()[:32])
+
+
+    def recall(self) -> Optional[Tuple[str, str]]:
+        entry = self.entry
+        if entry and entry[0] > time.monotonic():
+            return entry[1], entry[2]
+        return None
+
+
+    def store(self, podium: Dict[str, Any], generation: int) -> Tuple[str, str]:
+        body = json.dumps(podium)
+        etag = self.get_etag(body)
+        with self.lock:
+            if generation == self.generation and self.ttl > 0:
+                self.entry = (time.monotonic() + self.ttl, body, etag)
+        return body, etag
+
+
+    def get(self, load: Callable[[], Dict[str, Any]]) -> Tuple[str, str]:
+        """
+        Returns the podium's JSON body and ETag, only calling load if the cached one was invalidated or expired.
+        """
+        cached = self.recall()
+        if cached:
+            return cached
+        generation = self.generation
+        return self.store(load(), generation)
+
+
+    async def get_async(self, load: Callable[[], Awaitable[Dict[str, Any]]]) -> Tuple[str, str]:
+        """
+        Same as get(), awaiting load.
+        """
+        cached = self.recall()
+        if cached:
+            return cached
+        generation = self.generation
+        return self.store(await load(), generation)
+
+
+    def invalidate(self):
+        """
+        Called after every write to the players' stats (register, update).
+        """
+        with self.lock:
+            self.generation += 1
+            self.entry = None
+
+
+    def is_not_modified(self, if_none_match: Optional[str], etag: str) -> bool:
+        """
+        Whether an If-None-Match header matches the ETag, e.g. '"3f2a..."', 'W/"3f2a..."' or '*'.
+        """
+        if not if_none_match:
+            return False
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags or "W/" + etag in tags
@@ -1,7 +1,11 @@
 import uuid
+import asyncio
+from typing import List, Optional
 from azure.cosmos import ContainerProxy
 from azure.core.exceptions import HttpResponseError
 from shared_code.utils import utils
+from shared_code.async_utils import async_utils
+from shared_code.translation_cache import translation_cache
 
 class InvalidTextError(ValueError):
     pass
@@ -9,16 +13,24 @@ class UnsupportedLanguageError(ValueError):
     pass
 class NonExistingPlayerError(ValueError):
     pass
+class TranslationError(ValueError):
+    pass
 
 class prompt():
     """
     Stores temporary information about a single prompt.
     """
     utility = utils()
+    async_utility = async_utils()
 
     # String List of languages
     supported_languages = ["en", "ga", "es", "hi", "zh-Hans", "pl"]
 
+    # Translator request limits, the character limit counts every target language.
+    max_translate_items = 1000
+    max_detect_items = 100
+    max_request_characters = 50000
+
     # Constructor
     def __init__(self,player_proxy: ContainerProxy,trans_proxy: ContainerProxy,text,username):
         # auto generated unique id
@@ -28,40 +40,205 @@ class prompt():
         self.text = text
         self.username = username
 
+        # Translated lazily, once the cheaper checks in is_valid() have passed.
+        self.translation = None
+
+
+    def detect_language(self):
+        """
+        Detects the text's language without translating it (sentence breaking isn't billed per character).
+        A text that's already in the translation cache needs no translator call at all.
+        """
+        if self.translation is None and isinstance(self.TranslatorProxy, translation_cache):
+            self.translation = self.TranslatorProxy.get_translation(self.text, self.supported_languages)
+        if self.translation is not None:
+            return self.translation.detected_language
+        try:
+            return self.TranslatorProxy.find_sentence_boundaries(body=[self.text])[0].detected_language
+        except HttpResponseError as exception:
+            raise TranslationError("Translator failed -> {}".format(exception.message)) from exception
+
+
+    def translate(self):
+        """
+        Translates the text to all the supported languages, only calling the translator once.
+        """
+        if self.translation is None:
+            try:
+                self.translation = self.TranslatorProxy.translate(body=[self.text], to_language=self.supported_languages)[0] # Get translations.
+            except HttpResponseError as exception:
+                raise TranslationError("Translator failed -> {}".format(exception.message)) from exception
+        return self.translation
+
+
+    async def detect_language_async(self):
+        """
+        Same as detect_language(), for the async translator.
+        """
+        if self.translation is None and isinstance(self.TranslatorProxy, translation_cache):
+            self.translation = await self.TranslatorProxy.get_translation_async(self.text, self.supported_languages)
+        if self.translation is not None:
+            return self.translation.detected_language
         try:
-            self.translation = self.TranslatorProxy.translate(body=[self.text], to_language=self.supported_languages)[0] # Get translations.
+            return (await self.TranslatorProxy.find_sentence_boundaries(body=[self.text]))[0].detected_language
         except HttpResponseError as exception:
-            if exception.error is not None:
-                print(f"Error Code: {exception.error.code}")
-                print(f"Message: {exception.error.message}")
+            raise TranslationError("Translator failed -> {}".format(exception.message)) from exception
+
+
+    async def translate_async(self):
+        """
+        Same as translate(), for the async translator behind a translation_cache.
+        """
+        if self.translation is None:
+            try:
+                self.translation = (await self.TranslatorProxy.translate_async(body=[self.text], to_language=self.supported_languages))[0]
+            except HttpResponseError as exception:
+                raise TranslationError("Translator failed -> {}".format(exception.message)) from exception
+        return self.translation
+
+
+    def check_language(self, detected):
+        """
+        Raises if the detected language isn't supported OR language confidence < 0.2
+        """
+        if detected and ((detected["language"] not in self.supported_languages) or detected["score"] < 0.2):
+            raise UnsupportedLanguageError("Unsupported language -> {0}, Confidence Score -> {1}".format(detected["language"], detected["score"]))
+
+
+    def check_text(self):
+        """
+        Raises for the text alone, no I/O needed. A text without a single letter (e.g. "1234") isn't written
+        in any language, so it's an unsupported language before it's a bad length.
+        """
+        if not any(character.isalpha() for character in self.text):
+            raise UnsupportedLanguageError("Unsupported language -> the text has no letters")
+        if not (20 <= len(self.text) <= 100):
+            raise InvalidTextError("Prompt less than 20 characters or more than 100 characters")
 
     
     def is_valid(self):
         """
         Validation method to check if prompt is correctly written.
+        Runs the cheapest checks first and only translates a prompt that passed them all:
+        the text itself, then the player, then the detected language.
+        Raises TranslationError if the translator fails.
         """
-        text = self.text
+        # Check the text is within the range of 20 to 100 characters, costs nothing so it's done first.
+        self.check_text()
 
         # Check if there is a player username already stored
-        username = self.username
-        query = 'SELECT * FROM player WHERE CONTAINS(player.username, "{}")'.format(username)
-        existing_username = self.utility.get_queryed_items(proxy=self.PlayerContainerProxy, query=query)
-        if not existing_username:
+        existing_player = self.utility.get_player(proxy=self.PlayerContainerProxy, username=self.username)
+        if not existing_player:
             # If no existing username.
             raise NonExistingPlayerError("Player does not exist")
-        
-        # Check if the language is supported OR language confidence < 0.2
-        if self.translation:
-            detected = self.translation.detected_language
-            if (detected["language"] not in self.supported_languages) or detected["score"] < 0.2:
-                raise UnsupportedLanguageError("Unsupported language -> {0}, Confidence Score -> {1}".format(detected["language"], detected["score"]))
-
-        # Check if the inital text is within the range of 20 to 100.
-        if not (20 <= len(text) <= 100):
-            raise InvalidTextError("Prompt less than 20 characters or more than 100 characters")
+
+        # Detect the language only, the translation is paid for once it's supported.
+        self.check_language(self.detect_language())
+
+        # Everything passed, now pay for the full translation.
+        self.translate()
 
         return True
     
+    async def is_valid_async(self):
+        """
+        Same checks and error order as is_valid(), for a prompt built with async proxies.
+        The player lookup and language detection don't depend on each other, so they run concurrently.
+        """
+        self.check_text()
+
+        # Both finish before either error is raised, so a missing player is still reported before a translator failure.
+        existing_player, detected = await asyncio.gather(
+            self.async_utility.get_player(proxy=self.PlayerContainerProxy, username=self.username),
+            self.detect_language_async(), return_exceptions=True)
+        if isinstance(existing_player, BaseException):
+            raise existing_player
+        if not existing_player:
+            # If no existing username.
+            raise NonExistingPlayerError("Player does not exist")
+        if isinstance(detected, BaseException):
+            raise detected
+
+        self.check_language(detected)
+
+        # Everything passed, now pay for the full translation.
+        await self.translate_async()
+
+        return True
+
+
+    @classmethod
+    def validate_all(cls, prompts: List["prompt"]) -> List[Optional[ValueError]]:
+        """
+        Validates many prompts in the same stages as is_valid(), but with one player query
+        and packed translator calls. Returns the error for each prompt, None if it's valid.
+        """
+        if not prompts:
+            return []
+        PlayerContainerProxy = prompts[0].PlayerContainerProxy
+        TranslatorProxy = prompts[0].TranslatorProxy
+        errors = [None] * len(prompts)
+
+        # Check the texts themselves before any I/O.
+        for index, p in enumerate(prompts):
+            try:
+                p.check_text()
+            except ValueError as error:
+                errors[index] = error
+
+        # Check every remaining author exists with a single query.
+        pending = [index for index, error in enumerate(errors) if error is None]
+        existing = cls.utility.get_existing_usernames(PlayerContainerProxy, list({prompts[index].username for index in pending}))
+        for index in pending:
+            if prompts[index].username not in existing:
+                errors[index] = NonExistingPlayerError("Player does not exist")
+
+        # Detect the language only.
+        # Texts already in the translation cache know their language, only the others are sent.
+        pending = [index for index, error in enumerate(errors) if error is None]
+        detected = {}
+        if isinstance(TranslatorProxy, translation_cache):
+            for index in pending:
+                prompts[index].translation = TranslatorProxy.get_translation(prompts[index].text, cls.supported_languages)
+                if prompts[index].translation is not None:
+                    detected[index] = prompts[index].translation.detected_language
+        unknown = [index for index in pending if index not in detected]
+        for group in cls.utility.pack_texts([prompts[i].text for i in unknown], cls.max_detect_items, cls.max_request_characters):
+            indexes = [unknown[i] for i in group]
+            try:
+                detections = TranslatorProxy.find_sentence_boundaries(body=[prompts[i].text for i in indexes])
+            except HttpResponseError as exception:
+                # Only this request's prompts fail, the others are still created.
+                for index in indexes:
+                    errors[index] = TranslationError("Translator failed -> {}".format(exception.message))
+                continue
+            for index, detection in zip(indexes, detections):
+                detected[index] = detection.detected_language
+        for index in pending:
+            if index not in detected:
+                continue
+            try:
+                prompts[index].check_language(detected[index])
+            except ValueError as error:
+                errors[index] = error
+
+        # Translate everything that passed and wasn't cached, as few texts per request as the limits allow.
+        pending = [index for index, error in enumerate(errors) if error is None and prompts[index].translation is None]
+        max_characters = cls.max_request_characters // len(cls.supported_languages)
+        for group in cls.utility.pack_texts([prompts[i].text for i in pending], cls.max_translate_items, max_characters):
+            indexes = [pending[i] for i in group]
+            try:
+                translations = TranslatorProxy.translate(body=[prompts[i].text for i in indexes], to_language=cls.supported_languages)
+            except HttpResponseError as exception:
+                for index in indexes:
+                    errors[index] = TranslationError("Translator failed -> {}".format(exception.message))
+                continue
+            for index, translation in zip(indexes, translations):
+                prompts[index].translation = translation
+
+        return errors
+
+
     def to_dict(self):
         """
         Uses the proxy to translate the appropriate languages and returns all supported translations in a dict.
@@ -72,6 +249,7 @@ class prompt():
         """
         # Use the original text in the "texts" list.
         og_text = self.text
+        self.translate()
         detected_lan = self.translation.detected_language["language"]
         fst_entry = { "language": detected_lan, "text": og_text }
 
@@ -0,0 +1,130 @@
+import os
+import json
+import random
+import logging
+import contextvars
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, Iterator
+from shared_code.metrics import endpoint
+
+# Whether the current request's lines are written, decided once per request by request_log.request.
+sampled = contextvars.ContextVar("sampled", default=True)
+
+
+@lru_cache(maxsize=8)
+def parse_rates(setting: str) -> Dict[str, float]:
+    """
+    e.g. "utils_get=0.1,utils_podium=0.01,*=1" -> {"utils_get": 0.1, "utils_podium": 0.01, "*": 1.0}
+    """
+    rates = {}
+    for entry in setting.split(","):
+        if "=" in entry:
+            route, rate = entry.split("=", 1)
+            rates[route.strip()] = float(rate)
+    return rates
+
+
+@lru_cache(maxsize=8)
+def parse_fields(setting: str) -> FrozenSet[str]:
+    return frozenset(field.strip() for field in setting.split(",") if field.strip())
+
+
+class payload():
+    """
+    A request or response body that is only turned into text if its log line is written.
+    Redacted fields are masked at any depth and the JSON stops after limit characters,
+    so summarising a large body costs about as much as the summary.
+    e.g. {"username": "antoni_gn", "password": "***"}
+    """
+
+    def __init__(self, value: Any, limit: int, redacted: FrozenSet[str]):
+        self.value = value
+        self.limit = limit
+        self.redacted = redacted
+
+
+    def iter_json(self, value: Any) -> Iterator[str]:
+        if isinstance(value, dict):
+            yield "{"
+            for index, (key, item) in enumerate(value.items()):
+                yield (", " if index else "") + json.dumps(str(key)) + ": "
+                if key in self.redacted:
+                    yield '"***"'
+                else:
+                    yield from self.iter_json(item)
+            yield "}"
+        elif isinstance(value, (list, tuple)):
+            yield "["
+            for index, item in enumerate(value):
+                if index:
+                    yield ", "
+                yield from self.iter_json(item)
+            yield "]"
+        else:
+            yield json.dumps(value, default=str)
+
+
+    def __str__(self):
+        chunks, size = [], 0
+        for chunk in self.iter_json(self.value):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size > self.limit:
+                return "".join(chunks)[:self.limit] + "... (truncated)"
+        return "".join(chunks)
+
+
+class request_log():
+    """
+    Logging for the handlers that costs next to nothing for the lines it doesn't write.
+    Messages are %-formatted by logging only when written, a share of each route's requests is logged,
+    and payloads are logged as redacted, size-capped summaries.
+    Configured by app settings, read on every request so they can be changed while the app runs:
+      LogSampleRates   share of each handler's requests logged, e.g. "utils_get=0.1,utils_podium=0.01,*=1" (default all)
+                       an async handler falls back to its sync handler's rate, e.g. utils_get_async to utils_get
+      LogPayloadLimit  characters of a payload summary (default 256)
+      LogRedactFields  fields that are never logged (default "password")
+    Warnings and errors are always logged.
+    e.g. log.request("Python HTTP trigger function processed a PLAYER_LOGIN request: %s", log.payload(input))
+    """
+
+    def __init__(self, logger: logging.Logger = None):
+        self.logger = logger or logging.getLogger()
+
+
+    def get_sample_rate(self, route: str) -> float:
+        rates = parse_rates(os.environ.get('LogSampleRates', ''))
+        if route in rates:
+            return rates[route]
+        if route and route.endswith("_async") and route[:-len("_async")] in rates:
+            return rates[route[:-len("_async")]]
+        return rates.get("*", 1.0)
+
+
+    def request(self, message: str, *args):
+        """
+        First line of every handler, decides whether the rest of the request's lines are written.
+        """
+        rate = self.get_sample_rate(endpoint.get())
+        sampled.set(rate >= 1 or random.random() < rate)
+        self.info(message, *args)
+
+
+    def info(self, message: str, *args):
+        if sampled.get() and self.logger.isEnabledFor(logging.INFO):
+            self.logger.info(message, *args)
+
+
+    def warning(self, message: str, *args):
+        self.logger.warning(message, *args)
+
+
+    def error(self, message: str, *args):
+        self.logger.error(message, *args)
+
+
+    def payload(self, value: Any) -> payload:
+        """
+        Summary of a body to pass as a logging argument, e.g. log.info("Sending %s", log.payload(podium))
+        """
+        return payload(value, int(os.environ.get('LogPayloadLimit', '256')), parse_fields(os.environ.get('LogRedactFields', 'password')))
@@ -0,0 +1,18 @@
+"""
+In-process state shared by function_app and async_function_app, so neither app has to import the other for it.
+"""
+import os
+from shared_code.podium_cache import podium_cache
+from shared_code.suggestion_pool import suggestion_pool
+
+# A write through either app invalidates the podium for both.
+podiums = podium_cache(ttl=float(os.environ.get('PodiumCacheTTL', '5')))
+
+# Both apps' prompt/suggest take from and refill the same pool.
+suggestions = suggestion_pool(size=int(os.environ.get('SuggestionPoolSize', '5')),
+                              refill_at=int(os.environ.get('SuggestionPoolRefillAt', '2')),
+                              max_keywords=int(os.environ.get('SuggestionPoolKeywords', '256')),
+                              max_age=float(os.environ.get('SuggestionPoolMaxAge', '3600')),
+                              seed=[keyword for keyword in os.environ.get('SuggestionPoolSeed', '').split(',') if keyword],
+                              min_asks=int(os.environ.get('SuggestionPoolMinAsks', '2')),
+                              ask_window=float(os.environ.get('SuggestionPoolAskWindow', '600')))
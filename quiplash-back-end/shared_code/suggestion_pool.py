@@ -0,0 +1,182 @@
+import time
+import queue
+import asyncio
+import logging
+import threading
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable, List, Optional
+from shared_code.open_ai import ResponseError
+
+class suggestion_pool():
+    """
+    Already validated prompt suggestions per keyword, generated ahead of demand.
+    prompt/suggest takes one from the pool if there is one, and asks for the keyword to be refilled in the background
+    once it runs low, so popular keywords are answered without waiting on OpenAI.
+    Only keywords asked at least min_asks times in the last ask_window seconds are refilled,
+    so a keyword asked once (e.g. a typo) doesn't cost a round of OpenAI calls.
+    Refills run on a worker thread (sync app) or as tasks on the event loop (async app).
+    generate returns one call's valid suggestions for a keyword, every one of them is kept.
+    e.g. suggestion = suggestions.take("boomer"); suggestions.request_refill("boomer", generate)
+    """
+
+    def __init__(self, size: int = 5, refill_at: int = 2, max_keywords: int = 256, max_age: float = 3600, seed: List[str] = None,
+                 min_asks: int = 2, ask_window: float = 600):
+        self.size = size                    # suggestions kept per keyword
+        self.refill_at = refill_at          # a keyword with fewer suggestions than this is refilled
+        self.max_keywords = max_keywords    # least recently asked keywords are evicted past this
+        self.max_age = max_age              # seconds a suggestion is kept
+        self.seed = seed or []              # keywords filled as soon as the pool is first used
+        self.min_asks = min_asks            # asks within ask_window before a keyword is refilled
+        self.ask_window = ask_window
+        self.asks = OrderedDict()           # keyword -> deque of its last min_asks asks' times, least recently asked first
+        self.entries = OrderedDict()        # keyword -> deque of (created_at, suggestion), least recently asked first
+        self.pending = set()                # keywords being refilled
+        self.lock = threading.Lock()
+        self.refills = None                 # queue of (keyword, generate) for the worker thread
+        self.tasks = set()                  # refills running on the event loop
+
+
+    def take(self, keyword: str) -> Optional[str]:
+        """
+        Removes and returns a suggestion for the keyword, None if the pool has none.
+        """
+        with self.lock:
+            suggestions = self.entries.get(keyword)
+            if suggestions is None:
+                return None
+            self.entries.move_to_end(keyword)
+            while suggestions:
+                created_at, suggestion = suggestions.popleft()
+                if time.monotonic() - created_at < self.max_age:
+                    return suggestion
+        return None
+
+
+    def add(self, keyword: str, generated: List[str]):
+        if not generated:
+            return
+        with self.lock:
+            suggestions = self.entries.setdefault(keyword, deque())
+            self.entries.move_to_end(keyword)
+            for suggestion in generated[:self.size - len(suggestions)]:
+                suggestions.append((time.monotonic(), suggestion))
+            while len(self.entries) > self.max_keywords:
+                evicted, _ = self.entries.popitem(last=False)
+                logging.info("Suggestion pool evicted '%s'", evicted)
+
+
+    def ask(self, keyword: str) -> bool:
+        """
+        Counts an ask for the keyword, whether it has been asked at least min_asks times in the last ask_window seconds.
+        At most 4 times max_keywords keywords are tracked, the least recently asked are forgotten.
+        """
+        now = time.monotonic()
+        with self.lock:
+            asks = self.asks.pop(keyword, None) or deque(maxlen=max(self.min_asks, 1))
+            asks.append(now)
+            self.asks[keyword] = asks
+            while len(self.asks) > 4 * self.max_keywords:
+                self.asks.popitem(last=False)
+            return len(asks) >= self.min_asks and now - asks[0] <= self.ask_window
+
+
+    def missing(self, keyword: str) -> int:
+        with self.lock:
+            return self.size - len(self.entries.get(keyword, ()))
+
+
+    def claim(self, keyword: str) -> bool:
+        """
+        Whether the keyword needs refilling and nothing is refilling it yet, if so it is now pending.
+        No more than max_keywords keywords are refilled at once.
+        """
+        with self.lock:
+            if self.size <= 0 or keyword in self.pending or len(self.pending) >= self.max_keywords \
+                    or len(self.entries.get(keyword, ())) >= self.refill_at:
+                return False
+            self.pending.add(keyword)
+            return True
+
+
+    def release(self, keyword: str):
+        with self.lock:
+            self.pending.discard(keyword)
+
+
+    def get_keywords(self, keyword: str) -> List[str]:
+        """
+        The keyword to refill if it's in demand, along with the seed keywords the first time.
+        """
+        demanded = [keyword] if self.ask(keyword) else []
+        with self.lock:
+            seed, self.seed = self.seed, []
+        return seed + demanded
+
+
+    def request_refill(self, keyword: str, generate: Callable[[str], List[str]]):
+        """
+        Refills the keyword on the worker thread if it's in demand and running low, starting the thread on first use.
+        """
+        with self.lock:
+            if self.refills is None:
+                self.refills = queue.Queue()
+                threading.Thread(target=self.run, daemon=True, name="suggestion-pool").start()
+        for pooled in self.get_keywords(keyword):
+            if self.claim(pooled):
+                self.refills.put((pooled, generate))
+
+
+    def run(self):
+        while True:
+            keyword, generate = self.refills.get()
+            try:
+                self.refill(keyword, generate)
+            finally:
+                self.release(keyword)
+
+
+    def refill(self, keyword: str, generate: Callable[[str], List[str]]):
+        """
+        Generates suggestions until the keyword is full, giving up after twice as many calls as it's missing suggestions.
+        """
+        for _ in range(2 * max(self.missing(keyword), 0)):
+            if self.missing(keyword) <= 0:
+                return
+            try:
+                self.add(keyword, generate(keyword))
+            except ResponseError:
+                continue
+            except Exception as e:
+                logging.warning("Suggestion pool could not refill '%s': %s", keyword, e)
+                return
+
+
+    def request_refill_async(self, keyword: str, generate: Callable[[str], Awaitable[List[str]]]):
+        """
+        Same as request_refill(), as a task on the running event loop.
+        """
+        for pooled in self.get_keywords(keyword):
+            if self.claim(pooled):
+                task = asyncio.get_running_loop().create_task(self.refill_async(pooled, generate))
+                # The loop only keeps weak references to its tasks.
+                self.tasks.add(task)
+                task.add_done_callback(self.tasks.discard)
+
+
+    async def refill_async(self, keyword: str, generate: Callable[[str], Awaitable[List[str]]]):
+        """
+        Same as refill(), awaiting generate.
+        """
+        try:
+            for _ in range(2 * max(self.missing(keyword), 0)):
+                if self.missing(keyword) <= 0:
+                    return
+                try:
+                    self.add(keyword, await generate(keyword))
+                except ResponseError:
+                    continue
+                except Exception as e:
+                    logging.warning("Suggestion pool could not refill '%s': %s", keyword, e)
+                    return
+        finally:
+            self.release(keyword)
@@ -0,0 +1,191 @@
+import time
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import List, Optional
+from azure.cosmos import ContainerProxy
+from azure.cosmos.exceptions import CosmosResourceNotFoundError
+from azure.ai.translation.text.models import TranslatedTextItem
+
+class translation_cache():
+    """
+    Sits in front of the translator proxy and remembers translations by normalized text.
+    Hits come from an in-process LRU first, then (optionally) a Cosmos container shared by all instances.
+    Anything else the translator proxy offers is passed straight through.
+    """
+
+    def __init__(self, trans_proxy, cache_proxy: Optional[ContainerProxy] = None, max_entries=1024, ttl=86400):
+        self.TranslatorProxy = trans_proxy
+        self.CacheContainerProxy = cache_proxy
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()    # key -> (expires_at, translation)
+        self.lock = threading.Lock()
+
+
+    def __getattr__(self, name):
+        """
+        Delegates everything that isn't cached to the translator proxy.
+        """
+        return getattr(self.TranslatorProxy, name)
+
+
+    def normalize(self, text: str) -> str:
+        """
+        Texts that only differ in unicode form or whitespace share a translation.
+        """
+        return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+    def get_key(self, text: str, to_language: List[str]) -> str:
+        """
+        Content address of a text translated to the given languages.
+        """
+        content = self.normalize(text) + "\0" + ",".join(to_language)
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+    def recall(self, key: str) -> Optional[TranslatedTextItem]:
+        """
+        Looks a translation up in memory only.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                self.entries.move_to_end(key)
+                return entry[1]
+            self.entries.pop(key, None)
+        return None
+
+
+    def get(self, key: str) -> Optional[TranslatedTextItem]:
+        """
+        Looks a translation up in memory, then in Cosmos.
+        """
+        translation = self.recall(key)
+        if translation is not None or self.CacheContainerProxy is None:
+            return translation
+        try:
+            document = self.CacheContainerProxy.read_item(item=key, partition_key=key)
+        except CosmosResourceNotFoundError:
+            return None
+        translation = TranslatedTextItem(document['translation'])
+        self.remember(key, translation)
+        return translation
+
+
+    def get_translation(self, text: str, to_language: List[str]) -> Optional[TranslatedTextItem]:
+        """
+        A text's cached translation without calling the translator, None on a miss.
+        Its detected_language is the text's, so a hit also answers language detection.
+        """
+        return self.get(self.get_key(text, to_language))
+
+
+    async def get_translation_async(self, text: str, to_language: List[str]) -> Optional[TranslatedTextItem]:
+        """
+        Same as get_translation(), for an azure.cosmos.aio cache proxy.
+        """
+        return await self.get_async(self.get_key(text, to_language))
+
+
+    def remember(self, key: str, translation: TranslatedTextItem):
+        """
+        Stores a translation in memory, evicting the least recently used once full.
+        """
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, translation)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+
+    async def get_async(self, key: str) -> Optional[TranslatedTextItem]:
+        """
+        Same as get(), for an azure.cosmos.aio cache proxy.
+        """
+        translation = self.recall(key)
+        if translation is not None or self.CacheContainerProxy is None:
+            return translation
+        try:
+            document = await self.CacheContainerProxy.read_item(item=key, partition_key=key)
+        except CosmosResourceNotFoundError:
+            return None
+        translation = TranslatedTextItem(document['translation'])
+        self.remember(key, translation)
+        return translation
+
+
+    def put(self, key: str, translation: TranslatedTextItem):
+        """
+        Stores a translation in memory and in Cosmos, "ttl" expires it there too.
+        """
+        self.remember(key, translation)
+        if self.CacheContainerProxy is not None:
+            document = {"id": key, "translation": translation.as_dict(), "ttl": self.ttl}
+            self.CacheContainerProxy.upsert_item(body=document)
+
+
+    def translate(self, body: List[str], to_language: List[str], **kwargs) -> List[TranslatedTextItem]:
+        """
+        Same call as TextTranslationClient.translate, only texts that miss the cache reach the translator.
+        """
+        results = [None] * len(body)
+        misses = {}     # key -> indexes of the texts that need it
+
+        for index, text in enumerate(body):
+            key = self.get_key(text, to_language)
+            translation = self.get(key)
+            if translation is not None:
+                results[index] = translation
+            else:
+                misses.setdefault(key, []).append(index)
+
+        if misses:
+            # Identical texts are only sent once.
+            keys = list(misses)
+            translations = self.TranslatorProxy.translate(body=[body[misses[key][0]] for key in keys], to_language=to_language, **kwargs)
+            for key, translation in zip(keys, translations):
+                self.put(key, translation)
+                for index in misses[key]:
+                    results[index] = translation
+
+        return results
+
+
+    async def put_async(self, key: str, translation: TranslatedTextItem):
+        """
+        Same as put(), for an azure.cosmos.aio cache proxy.
+        """
+        self.remember(key, translation)
+        if self.CacheContainerProxy is not None:
+            document = {"id": key, "translation": translation.as_dict(), "ttl": self.ttl}
+            await self.CacheContainerProxy.upsert_item(body=document)
+
+
+    async def translate_async(self, body: List[str], to_language: List[str], **kwargs) -> List[TranslatedTextItem]:
+        """
+        Same as translate(), in front of the async TextTranslationClient.
+        """
+        results = [None] * len(body)
+        misses = {}     # key -> indexes of the texts that need it
+
+        for index, text in enumerate(body):
+            key = self.get_key(text, to_language)
+            translation = await self.get_async(key)
+            if translation is not None:
+                results[index] = translation
+            else:
+                misses.setdefault(key, []).append(index)
+
+        if misses:
+            # Identical texts are only sent once.
+            keys = list(misses)
+            translations = await self.TranslatorProxy.translate(body=[body[misses[key][0]] for key in keys], to_language=to_language, **kwargs)
+            for key, translation in zip(keys, translations):
+                await self.put_async(key, translation)
+                for index in misses[key]:
+                    results[index] = translation
+
+        return results
@@ -1,61 +1,378 @@
-from typing import List, Dict, Any
+import os
+import time
+import heapq
+import random
+import logging
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Tuple, Union
+from azure.core import MatchConditions
+from azure.core.exceptions import HttpResponseError
 from azure.cosmos import ContainerProxy
+from azure.cosmos.exceptions import CosmosResourceNotFoundError, CosmosResourceExistsError, CosmosAccessConditionFailedError
+from shared_code.metrics import in_context
+
+class TooManyConflictsError(ValueError):
+    pass
 
 class utils():
     """
     Utility class for querying in SQL & building dictionaries.
     """
 
-    def get_queryed_items(self, proxy: ContainerProxy, query: str):
+    # Players registered before usernames became the document key can only be found by querying.
+    # Set LegacyPlayerLookup to "false" once migrate_player_ids.py has been run.
+    legacy_player_lookup = os.environ.get('LegacyPlayerLookup', 'true').lower() == 'true'
+
+    # The leaderboard document keeps every player in the top LeaderboardTiers ppgr tiers,
+    # dropping the lowest ones while it holds more than LeaderboardSize players (but never the three a podium needs).
+    leaderboard_id = "podium"
+    leaderboard_tiers = int(os.environ.get('LeaderboardTiers', '10'))
+    leaderboard_size = int(os.environ.get('LeaderboardSize', '1000'))
+
+    # Most players updated at once by update_players, or index documents read at once by get_indexed_texts.
+    max_update_workers = 16
+
+    # Attempts at a write that keeps losing races (e.g. on the one leaderboard document) before giving up,
+    # the retries wait a random time of up to retry_backoff * 2^attempt seconds so they don't collide again.
+    max_attempts = 5
+    retry_backoff = 0.02
+
+    # Every query the app sends. Values are only ever passed as parameters, so each query keeps
+    # one text and Cosmos can reuse its plan, whatever the values are.
+    queries = {
+        "player": "SELECT * FROM player p WHERE p.username = @username",
+        "existing_usernames": "SELECT VALUE p.username FROM player p WHERE ARRAY_CONTAINS(@usernames, p.username)",
+        "player_ids": "SELECT p.id, p.username FROM player p WHERE ARRAY_CONTAINS(@usernames, p.username)",
+        "player_stats": "SELECT p.username, p.games_played, p.total_score FROM player p",
+        "texts": "SELECT p.id, t.text, p.username FROM prompt p JOIN t IN p.texts WHERE t.language = @language AND ARRAY_CONTAINS(@usernames, p.username)",
+        "item_ids": "SELECT VALUE item.id FROM item",
+    }
+
+    def get_backoff(self, attempt: int) -> float:
+        """
+        Seconds to wait before retrying attempt (0 for the first one).
+        """
+        return random.uniform(0, self.retry_backoff * 2 ** attempt) if attempt else 0
+
+
+    def get_query(self, name: str, **values) -> Tuple[str, List[Dict[str, Any]]]:
+        """
+        Returns a query's text and its parameters.
+        e.g. get_query("player", username="antoni_gn") -> (queries["player"], [{"name": "@username", "value": "antoni_gn"}])
+        """
+        parameters = [{"name": "@" + key, "value": value} for key, value in values.items()]
+        return self.queries[name], parameters
+
+
+    def get_queryed_items(self, proxy: ContainerProxy, query: str, parameters: Optional[List[Dict[str, Any]]] = None):
         """
         Returns items from proxy objects' querying.
         """
-        return list(proxy.query_items(query=query, enable_cross_partition_query=True))
+        return list(proxy.query_items(query=query, parameters=parameters, enable_cross_partition_query=True))
 
 
-    def update_player(self, proxy: ContainerProxy, id: str, games, score):
+    def iter_queryed_items(self, proxy: ContainerProxy, query: str, parameters: Optional[List[Dict[str, Any]]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Returns items from proxy objects' querying lazily, a page at a time.
+        """
+        return iter(proxy.query_items(query=query, parameters=parameters, enable_cross_partition_query=True))
+
+
+    def get_queryed_page(self, proxy: ContainerProxy, query: str, page_size: int, continuation: Optional[str] = None,
+                         parameters: Optional[List[Dict[str, Any]]] = None):
+        """
+        Returns one page of at most page_size items and the continuation token for the next one,
+        the token is None once there are no more pages.
+        """
+        pages = proxy.query_items(query=query, parameters=parameters, enable_cross_partition_query=True,
+                                  max_item_count=page_size).by_page(continuation)
+        items = list(next(pages, []))
+        return items, pages.continuation_token
+
+
+    def get_texts_query(self, usernames: List[str], language: str) -> Tuple[str, List[Dict[str, Any]]]:
+        """
+        The query for the given players' prompt texts in one language, and its parameters.
+        e.g. [{"id": "...", "text": "Why the boomer crossed the road?", "username": "antoni_gn"}]
+        """
+        return self.get_query("texts", language=language, usernames=list(usernames))
+
+
+    def get_player_key(self, username: str) -> str:
+        """
+        Returns the id (and partition key) a player's document is stored under.
+        Cosmos ids can't contain '/', '\\', '?' or '#', so those (and '%') are percent-escaped.
+        """
+        return ''.join('%{:02X}'.format(ord(c)) if c in '%/\\?#' else c for c in username)
+
+
+    def get_player(self, proxy: ContainerProxy, username: str) -> Optional[Dict[str, Any]]:
+        """
+        Point-reads a player by their exact username, returns None if the player doesn't exist.
+        """
+        key = self.get_player_key(username)
+        try:
+            return proxy.read_item(item=key, partition_key=key)
+        except CosmosResourceNotFoundError:
+            pass
+
+        return self.get_legacy_player(proxy, username)
+
+
+    def get_legacy_player(self, proxy: ContainerProxy, username: str) -> Optional[Dict[str, Any]]:
+        """
+        Looks a player registered before usernames became the key up by an exact match, None once LegacyPlayerLookup is off.
+        """
+        if not self.legacy_player_lookup:
+            return None
+
+        # Player may still be stored under a random id.
+        query, parameters = self.get_query("player", username=username)
+        players = self.get_queryed_items(proxy, query=query, parameters=parameters)
+        return players[0] if players else None
+
+
+    def get_existing_usernames(self, proxy: ContainerProxy, usernames: List[str]) -> set:
+        """
+        Returns which of the usernames belong to existing players, in one query.
+        """
+        if not usernames:
+            return set()
+        query, parameters = self.get_query("existing_usernames", usernames=list(usernames))
+        return set(self.get_queryed_items(proxy, query=query, parameters=parameters))
+
+
+    def get_player_ids(self, proxy: ContainerProxy, usernames: List[str]) -> Dict[str, str]:
+        """
+        Returns the document id of each existing player, in one query.
+        """
+        if not usernames:
+            return {}
+        query, parameters = self.get_query("player_ids", usernames=list(usernames))
+        return {item['username']: item['id'] for item in self.get_queryed_items(proxy, query=query, parameters=parameters)}
+
+
+    def create_items_batched(self, proxy: ContainerProxy, items: List[Dict[str, Any]], partition_field: str) -> List[Optional[HttpResponseError]]:
+        """
+        Creates the items with one transactional batch per partition key (at most 100 operations each).
+        Each batch commits or fails as a whole, and a failed one doesn't stop the others.
+        Returns each item's error, None if it was created.
+        """
+        partitions = {}
+        for index, item in enumerate(items):
+            partitions.setdefault(item[partition_field], []).append(index)
+
+        errors = [None] * len(items)
+        for partition_key, indexes in partitions.items():
+            for start in range(0, len(indexes), 100):
+                batch = indexes[start:start + 100]
+                operations = [("create", (items[index],)) for index in batch]
+                try:
+                    proxy.execute_item_batch(batch_operations=operations, partition_key=partition_key)
+                except HttpResponseError as error:
+                    for index in batch:
+                        errors[index] = error
+        return errors
+
+
+    def delete_partition_items(self, proxy: ContainerProxy, partition_key: str) -> int:
+        """
+        Deletes every item in one partition, returns how many were deleted.
+        Only ids are streamed back, a page of 100 at a time, and each page is one transactional batch.
+        """
+        query = self.queries["item_ids"]
+        pages = proxy.query_items(query=query, partition_key=partition_key, max_item_count=100).by_page()
+
+        count = 0
+        for page in pages:
+            operations = [("delete", (id,)) for id in page]
+            if operations:
+                proxy.execute_item_batch(batch_operations=operations, partition_key=partition_key)
+                count += len(operations)
+        return count
+
+
+    def get_index_key(self, username: str, language: str) -> str:
+        """
+        Id (and partition key) of a player's prompt index document for one language.
+        e.g. antoni_gn:es
+        """
+        return "{}:{}".format(self.get_player_key(username), language)
+
+
+    def get_index_documents(self, prompt_docs: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Projects prompt documents onto one index document per (username, language).
+        e.g. {"antoni_gn:es": {"id": "antoni_gn:es", "username": "antoni_gn", "language": "es",
+                               "prompts": [{"id": "...", "text": "¿Por qué el boomer cruzó la calle?"}]}}
+        """
+        documents = {}
+        for prompt_doc in prompt_docs:
+            for entry in prompt_doc['texts']:
+                key = self.get_index_key(prompt_doc['username'], entry['language'])
+                document = documents.setdefault(key, {"id": key, "username": prompt_doc['username'], "language": entry['language'], "prompts": []})
+                document['prompts'].append({"id": prompt_doc['id'], "text": entry['text']})
+        return documents
+
+
+    def add_to_prompt_index(self, proxy: ContainerProxy, prompt_docs: List[Dict[str, Any]]):
+        """
+        Appends new prompts to their index documents, creating the documents that don't exist yet.
+        The appends are patches, so concurrent prompt creations don't overwrite each other.
+        """
+        for key, document in self.get_index_documents(prompt_docs).items():
+            # A patch holds at most 10 operations.
+            for start in range(0, len(document['prompts']), 10):
+                prompts = document['prompts'][start:start + 10]
+                operations = [{"op": "add", "path": "/prompts/-", "value": indexed} for indexed in prompts]
+                for attempt in range(self.max_attempts):
+                    time.sleep(self.get_backoff(attempt))
+                    try:
+                        proxy.patch_item(item=key, partition_key=key, patch_operations=operations)
+                        break
+                    except CosmosResourceNotFoundError:
+                        try:
+                            proxy.create_item(body=dict(document, prompts=prompts))
+                            break
+                        except CosmosResourceExistsError:
+                            # Another request created it first, append to theirs.
+                            continue
+                else:
+                    raise TooManyConflictsError("Index document {} not written after {} attempts".format(key, self.max_attempts))
+
+
+    def delete_prompt_index(self, proxy: ContainerProxy, username: str, languages: List[str]):
+        """
+        Deletes a player's index documents in every language.
+        """
+        for language in languages:
+            key = self.get_index_key(username, language)
+            try:
+                proxy.delete_item(item=key, partition_key=key)
+            except CosmosResourceNotFoundError:
+                pass
+
+
+    def get_indexed_texts(self, proxy: ContainerProxy, usernames: List[str], language: str) -> List[Dict[str, Any]]:
+        """
+        Same result as querying with get_texts_query, from concurrent point reads of the players' index documents.
+        e.g. [{"id": "...", "text": "Why the boomer crossed the road?", "username": "antoni_gn"}]
+        """
+        usernames = list(dict.fromkeys(usernames))
+
+        def read_document(username):
+            key = self.get_index_key(username, language)
+            try:
+                return proxy.read_item(item=key, partition_key=key)
+            except CosmosResourceNotFoundError:
+                return None
+
+        if not usernames:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.max_update_workers, len(usernames))) as executor:
+            documents = list(executor.map(in_context(read_document), usernames))
+
+        return [{"id": indexed['id'], "text": indexed['text'], "username": document['username']}
+                for document in documents if document is not None for indexed in document['prompts']]
+
+
+    def pack_texts(self, texts: List[str], max_items: int, max_characters: int) -> List[List[int]]:
         """
-        Updates the inputted player.
+        Groups the texts' indexes so each group stays within a request's item and character limits.
         """
-        # Retrieve the player from the database.
-        player_to_update = proxy.read_item(item=id,partition_key=id)
-        recent_games_played = player_to_update['games_played']
-        recent_total_score = player_to_update['total_score']
+        groups = []
+        current, characters = [], 0
+        for index, text in enumerate(texts):
+            if current and (len(current) == max_items or characters + len(text) > max_characters):
+                groups.append(current)
+                current, characters = [], 0
+            current.append(index)
+            characters += len(text)
+        if current:
+            groups.append(current)
+        return groups
+
+
+    def get_update_patches(self, games, score):
+        """
+        Returns the conditional patches for updating a player, as [(patch_operations, filter_predicate), ...].
+        Exactly one of them matches whatever the player's current total_score is.
+        """
+        # Patch predicates can't take parameters, so only ever format integers into them.
+        games, score = int(games), int(score)
 
         # Cap negative values of games_played to zero.
         if (games < 0):
             games = 0
 
+        increment = [{"op": "incr", "path": "/games_played", "value": games},
+                     {"op": "incr", "path": "/total_score", "value": score}]
+        if score >= 0:
+            return [(increment, None)]
+
         # If the negative score reaches beyond 0 in the total_score, cap at 0.
-        if (-score > player_to_update['total_score']):
-                recent_total_score = 0
-                score = 0
+        floor = [{"op": "incr", "path": "/games_played", "value": games},
+                 {"op": "set", "path": "/total_score", "value": 0}]
+        return [(increment, "FROM player p WHERE p.total_score >= {}".format(-score)),
+                (floor, "FROM player p WHERE p.total_score < {}".format(-score))]
+
 
-        # Increment the games_played and total_score
-        games_played = recent_games_played + games
-        total_score = recent_total_score + score
+    def update_player(self, proxy: ContainerProxy, id: str, games, score):
+        """
+        Updates the inputted player with an atomic partial update, no read needed.
+        Raises TooManyConflictsError if the score kept changing under the patches' conditions for max_attempts tries.
+        """
+        patches = self.get_update_patches(games, score)
+        for attempt in range(self.max_attempts):
+            time.sleep(self.get_backoff(attempt))
+            for patch_operations, filter_predicate in patches:
+                try:
+                    updated = proxy.patch_item(item=id, partition_key=id, patch_operations=patch_operations,
+                                               filter_predicate=filter_predicate)
+                    # Return the updated games_played and total_score:
+                    return [ updated['games_played'], updated['total_score'] ]
+                except CosmosAccessConditionFailedError:
+                    # The score didn't match this patch's condition, try the other one.
+                    continue
+        raise TooManyConflictsError("Player {} not updated after {} attempts".format(id, self.max_attempts))
 
-        # New Values in a dictionary
-        updates = {"games_played": games_played, "total_score": total_score}
 
-        # Modify the player via field names as keys:
-        for key, value in updates.items():
-            player_to_update[key] = value
+    def update_players(self, proxy: ContainerProxy, updates: List[Dict[str, Any]]) -> List[Union[List[int], None, TooManyConflictsError]]:
+        """
+        Updates many players concurrently, returns each update's [games_played, total_score],
+        None if the player doesn't exist, or the TooManyConflictsError if it was given up on.
+        e.g. updates = [{"username": "antoni_gn", "add_to_games_played": 1, "add_to_score": 300}, ...]
+        """
+        usernames = list({update['username'] for update in updates})
+        if self.legacy_player_lookup:
+            ids = self.get_player_ids(proxy, usernames)
+        else:
+            # Every player is keyed by username, a missing one just fails its patch.
+            ids = {username: self.get_player_key(username) for username in usernames}
 
-        # Replace item
-        proxy.replace_item(item=player_to_update['id'], body=player_to_update)
+        # Updates to the same player are applied in order, different players concurrently.
+        indexes = {}
+        for index, update in enumerate(updates):
+            indexes.setdefault(update['username'], []).append(index)
+        results = [None] * len(updates)
 
-        # Return the updated games_played and total_score:
-        return [ games_played, total_score ]
+        def apply_updates(username):
+            if username not in ids:
+                return
+            for index in indexes[username]:
+                try:
+                    results[index] = self.update_player(proxy, ids[username], updates[index]['add_to_games_played'], updates[index]['add_to_score'])
+                except CosmosResourceNotFoundError:
+                    return
+                except TooManyConflictsError as e:
+                    results[index] = e
 
+        if indexes:
+            with ThreadPoolExecutor(max_workers=min(self.max_update_workers, len(indexes))) as executor:
+                list(executor.map(in_context(apply_updates), indexes))
+        return results
 
-    def convert_to_query_list(self, players: List[str]):
-        """
-        Returns a list of strings to this format for SQL:
-        i.e. ["a","b","c"] -> ("a","b","c")
-        """
-        return '("' + '", "'.join(players) + '")'
-    
 
     def get_ppgr(self, total_score: int, games_played: int) -> int:
         """
@@ -81,11 +398,40 @@ class utils():
         return sorted(player_stats, key=lambda x: (-x['ppgr'], x['games_played'], x['username'].lower()))
     
 
+    def select_top_tiers(self, player_stats: Iterable[Dict[str, Any]], tiers: int = 3) -> List[Dict[str, Any]]:
+        """
+        Streams over the players keeping only those in the top "tiers" distinct ppgrs.
+        Returns them (with their ppgr) in the same order as sort_to_ppgr_games_played.
+        """
+        kept = {}       # ppgr -> players in that tier
+        lowest = []     # min-heap of the kept ppgrs
+
+        for player in player_stats:
+            ppgr = self.get_ppgr(player['total_score'], player['games_played'])
+            if ppgr in kept:
+                kept[ppgr].append(player)
+            elif len(kept) < tiers:
+                kept[ppgr] = [player]
+                heapq.heappush(lowest, ppgr)
+            elif ppgr > lowest[0]:
+                # Better than the lowest tier kept, so that tier drops off.
+                del kept[heapq.heapreplace(lowest, ppgr)]
+                kept[ppgr] = [player]
+
+        ranked = []
+        for ppgr in sorted(kept, reverse=True):
+            for player in sorted(kept[ppgr], key=lambda x: (x['games_played'], x['username'].lower())):
+                ranked.append(dict(player, ppgr=ppgr))
+        return ranked
+
+
     def get_podium(self, leaderboard: List[Dict[str, Any]]) -> Dict:
         """
         Gets the players off from top 3 ggpr scores
         """
         podium = {"gold": [], "silver": [], "bronze": []}
+        if not leaderboard:
+            return podium
         # This tracks if the next player's ppgr is different or not
         current_ppgr = leaderboard[0]['ppgr']
         # This tracks the current entry in the podium
@@ -107,4 +453,128 @@ class utils():
             player.pop('ppgr', None)
             podium[current_rank].append(player)
 
-        return podium
\ No newline at end of file
+        return podium
+
+
+    def get_leaderboard_entry(self, username: str, games_played: int, total_score: int) -> Dict[str, Any]:
+        """
+        Returns a player's stats as stored in the leaderboard document.
+        """
+        return {"username": username, "games_played": games_played, "total_score": total_score,
+                "ppgr": self.get_ppgr(total_score, games_played)}
+
+
+    def trim_leaderboard(self, leaderboard: Dict[str, Any], players: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Sorts the players into the leaderboard, keeping only the top leaderboard_tiers ppgr tiers,
+        and fewer while they hold more than leaderboard_size players (e.g. everyone who hasn't scored yet on 0 ppgr).
+        """
+        players = sorted(players, key=lambda x: (-x['ppgr'], x['games_played'], x['username'].lower()))
+        tiers = sorted({player['ppgr'] for player in players}, reverse=True)
+
+        # Tiers are only ever dropped whole, so everyone at or above the cutoff stays in the leaderboard.
+        counts = Counter(player['ppgr'] for player in players)
+        kept = tiers[:self.leaderboard_tiers]
+        size = sum(counts[ppgr] for ppgr in kept)
+        while len(kept) > 3 and size > self.leaderboard_size:
+            size -= counts[kept.pop()]
+
+        if len(kept) < len(tiers):
+            # Players below the cutoff are dropped, so the leaderboard no longer holds everyone.
+            cutoff = kept[-1]
+            players = [player for player in players if player['ppgr'] >= cutoff]
+            leaderboard['complete'] = False
+            leaderboard['cutoff'] = cutoff
+
+        leaderboard['players'] = players
+        return leaderboard
+
+
+    def apply_to_leaderboard(self, leaderboard: Dict[str, Any], updates: List[Dict[str, Any]]) -> bool:
+        """
+        Applies updated player stats to the leaderboard document.
+        games_played never goes down, so stats with fewer games than the stored entry's are from an update that
+        lost the race to a newer one, and are skipped.
+        Returns False if the leaderboard no longer holds enough tiers for a podium and must be rebuilt.
+        """
+        players = {player['username']: player for player in leaderboard['players']}
+
+        for update in updates:
+            stored = players.get(update['username'])
+            if stored is not None and update['games_played'] < stored['games_played']:
+                continue
+            entry = self.get_leaderboard_entry(update['username'], update['games_played'], update['total_score'])
+            players.pop(entry['username'], None)
+            # Every player at or above the cutoff is in the leaderboard, so only those can be added.
+            if leaderboard['complete'] or entry['ppgr'] >= leaderboard['cutoff']:
+                players[entry['username']] = entry
+
+        self.trim_leaderboard(leaderboard, list(players.values()))
+        tiers = {player['ppgr'] for player in leaderboard['players']}
+        return leaderboard['complete'] or len(tiers) >= 3
+
+
+    def rebuild_leaderboard(self, player_proxy: ContainerProxy, leaderboard_proxy: ContainerProxy) -> Dict[str, Any]:
+        """
+        Rebuilds the leaderboard document from every player in the database.
+        """
+        query = self.queries["player_stats"]
+        # One tier more than kept, so trimming tells us whether anyone was left out.
+        players = self.select_top_tiers(self.iter_queryed_items(player_proxy, query=query), tiers=self.leaderboard_tiers + 1)
+
+        leaderboard = {"id": self.leaderboard_id, "complete": True, "cutoff": None}
+        self.trim_leaderboard(leaderboard, players)
+        return leaderboard_proxy.upsert_item(body=leaderboard)
+
+
+    def drop_leaderboard(self, leaderboard_proxy: ContainerProxy):
+        """
+        Deletes the leaderboard document, the next read or update rebuilds it from the players.
+        """
+        try:
+            leaderboard_proxy.delete_item(item=self.leaderboard_id, partition_key=self.leaderboard_id)
+        except CosmosResourceNotFoundError:
+            pass
+
+
+    def update_leaderboard(self, player_proxy: ContainerProxy, leaderboard_proxy: ContainerProxy, updates: List[Dict[str, Any]]):
+        """
+        Incrementally applies updated player stats to the leaderboard document.
+        Every player write contends on that one document, so after max_attempts lost races the update gives up
+        and drops the document instead, to be rebuilt with everyone's stats.
+        e.g. updates = [{"username": "antoni_gn", "games_played": 10, "total_score": 40}]
+        """
+        for attempt in range(self.max_attempts):
+            time.sleep(self.get_backoff(attempt))
+            try:
+                leaderboard = leaderboard_proxy.read_item(item=self.leaderboard_id, partition_key=self.leaderboard_id)
+            except CosmosResourceNotFoundError:
+                leaderboard = self.rebuild_leaderboard(player_proxy, leaderboard_proxy)
+
+            if not self.apply_to_leaderboard(leaderboard, updates):
+                # Too many players dropped below the cutoff, recount everyone.
+                leaderboard = self.rebuild_leaderboard(player_proxy, leaderboard_proxy)
+                self.apply_to_leaderboard(leaderboard, updates)
+
+            try:
+                # Only replace if no other update changed the leaderboard since we read it.
+                leaderboard_proxy.replace_item(item=self.leaderboard_id, body=leaderboard,
+                                               etag=leaderboard['_etag'], match_condition=MatchConditions.IfNotModified)
+                return
+            except CosmosAccessConditionFailedError:
+                continue
+
+        logging.warning("Leaderboard kept changing after %s attempts, dropping it to be rebuilt", self.max_attempts)
+        self.drop_leaderboard(leaderboard_proxy)
+
+
+    def get_leaderboard_podium(self, player_proxy: ContainerProxy, leaderboard_proxy: ContainerProxy) -> Dict:
+        """
+        Gets the podium from the leaderboard document, building it if it doesn't exist yet.
+        """
+        try:
+            leaderboard = leaderboard_proxy.read_item(item=self.leaderboard_id, partition_key=self.leaderboard_id)
+        except CosmosResourceNotFoundError:
+            leaderboard = self.rebuild_leaderboard(player_proxy, leaderboard_proxy)
+
+        return self.get_podium(leaderboard['players'])
\ No newline at end of file
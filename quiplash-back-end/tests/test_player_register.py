@@ -1,6 +1,7 @@
 import unittest
 import requests
 import json
+from concurrent.futures import ThreadPoolExecutor
 from azure.cosmos import CosmosClient
 
 class test_player_register(unittest.TestCase):
@@ -200,6 +201,53 @@ class test_player_register(unittest.TestCase):
         self.assertEqual(query_result_stripped[0],{"username": "antoni_gn","password": "ILoveTriciaaaaa","games_played": 0,"total_score": 0})
 
 
+    def test_register_taken_username_not_overwritten(self):
+        # Register a username, then again with another password: the second create conflicts.
+        request = {"username": "antoni_gn", "password": "ILoveTricia"}
+        first_response = requests.post(self.TEST_URL,params={"code": self.FUNCTION_KEY},json=request)
+        self.assertEqual(200,first_response.status_code)
+        self.assertEqual(first_response.json(),{"result": True, "msg": "OK"})
+
+        second_request = {"username": "antoni_gn", "password": "AA_Batteries"}
+        second_response = requests.post(self.TEST_URL,params={"code": self.FUNCTION_KEY},json=second_request)
+        self.assertEqual(200,second_response.status_code)
+        self.assertEqual(second_response.json(),{"result": False, "msg": "Username already exists"})
+
+        # Test the DB still only holds the first player, with its password.
+        query = 'SELECT player.password FROM player WHERE player.username = "antoni_gn"'
+        query_result = list(self.PlayerContainerProxy.query_items(query=query, enable_cross_partition_query=True))
+        self.assertEqual(query_result,[{"password": "ILoveTricia"}])
+
+
+    def test_register_taken_username_race(self):
+        # Register the same username from several clients at once, exactly one of them gets it.
+        requests_sent = [{"username": "antoni_gn", "password": "Password{}".format(index)} for index in range(5)]
+        with ThreadPoolExecutor(max_workers=len(requests_sent)) as executor:
+            responses = list(executor.map(lambda request: requests.post(self.TEST_URL,params={"code": self.FUNCTION_KEY},json=request), requests_sent))
+
+        dict_responses = [response.json() for response in responses]
+        self.assertEqual(dict_responses.count({"result": True, "msg": "OK"}),1)
+        self.assertEqual(dict_responses.count({"result": False, "msg": "Username already exists"}),4)
+
+        # Test the DB holds a single player, with the password of the request that won.
+        query = 'SELECT player.password FROM player WHERE player.username = "antoni_gn"'
+        query_result = list(self.PlayerContainerProxy.query_items(query=query, enable_cross_partition_query=True))
+        self.assertEqual(len(query_result),1)
+        winner = dict_responses.index({"result": True, "msg": "OK"})
+        self.assertEqual(query_result[0]['password'],requests_sent[winner]['password'])
+
+
+    def test_register_taken_by_legacy_player(self):
+        # A player stored before usernames became the key, which the create can't conflict with.
+        self.PlayerContainerProxy.create_item({"id": "1", "username" : "antoni_gn", "password": "ILoveTricia" , "games_played" : 0 , "total_score" : 0 })
+
+        # While LegacyPlayerLookup is on, the username is still taken.
+        request = {"username": "antoni_gn", "password": "AA_Batteries"}
+        response = requests.post(self.TEST_URL,params={"code": self.FUNCTION_KEY},json=request)
+        self.assertEqual(200,response.status_code)
+        self.assertEqual(response.json(),{"result": False, "msg": "Username already exists"})
+
+
     #@unittest.skip
     def test_register_existing_player(self):
         # Send a request for the same player twice.
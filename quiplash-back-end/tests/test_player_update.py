@@ -1,6 +1,7 @@
 import unittest
 import requests
 import json
+from concurrent.futures import ThreadPoolExecutor
 from azure.cosmos import CosmosClient
 from shared_code.player import player
 
@@ -142,4 +143,37 @@ class test_player_update(unittest.TestCase):
         query_result_stripped = [{"username": item['username'], "password": item['password'], 
                                  "games_played": item['games_played'], "total_score": item['total_score']}
                                  for item in query_result]
-        self.assertEqual(query_result_stripped[0],{"username": "antoni_gn","password": "ILoveTricia","games_played": 10,"total_score": 0})
\ No newline at end of file
+        self.assertEqual(query_result_stripped[0],{"username": "antoni_gn","password": "ILoveTricia","games_played": 10,"total_score": 0})
+
+
+    def get_stats(self):
+        # Read back player_1's games_played and total_score
+        item = self.PlayerContainerProxy.read_item(item=self.player_1.id, partition_key=self.player_1.id)
+        return {"games_played": item['games_played'], "total_score": item['total_score']}
+
+
+    def send_concurrently(self, updates):
+        # Send every update at once, as the players of a room do when a game ends.
+        with ThreadPoolExecutor(max_workers=len(updates)) as executor:
+            responses = list(executor.map(lambda update: requests.put(self.TEST_URL,params={"code": self.FUNCTION_KEY},json=update), updates))
+        return [response.json() for response in responses]
+
+
+    def test_update_concurrently(self):
+        # Update the same player ten times at once, no update is lost.
+        updates = [{"username": "antoni_gn", "add_to_games_played": 1, "add_to_score" : 100 }] * 10
+        self.assertEqual(self.send_concurrently(updates),[{"result": True, "msg": "OK"}] * 10)
+
+        # Test the DB holds the sum of every update
+        self.assertEqual(self.get_stats(),{"games_played": 10,"total_score": 1000})
+
+
+    def test_update_concurrently_negative_total_score(self):
+        # Give the player 500 points, then take 100 away ten times at once.
+        response = requests.put(self.TEST_URL,params={"code": self.FUNCTION_KEY},json={"username": "antoni_gn", "add_to_games_played": 0, "add_to_score" : 500 })
+        self.assertEqual(200,response.status_code)
+        updates = [{"username": "antoni_gn", "add_to_games_played": 1, "add_to_score" : -100 }] * 10
+        self.assertEqual(self.send_concurrently(updates),[{"result": True, "msg": "OK"}] * 10)
+
+        # Test the DB was correctly updated, the total score is still capped at 0 whatever order they were applied in
+        self.assertEqual(self.get_stats(),{"games_played": 10,"total_score": 0})
\ No newline at end of file
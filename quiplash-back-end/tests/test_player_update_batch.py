@@ -0,0 +1,80 @@
+import unittest
+import requests
+import json
+from azure.cosmos import CosmosClient
+from shared_code.player import player
+
+class test_player_update_batch(unittest.TestCase):
+    """
+    This test set focuses on testing the responses from the server on the PlayerUpdateBatch function.
+    """
+    # URLS to test on
+    LOCAL_DEV_URL = "http://localhost:7071/player/update_batch"
+    PUBLIC_URL = "https://quiplash-ag7g22.azurewebsites.net/player/update_batch"
+    TEST_URL = PUBLIC_URL
+
+    # Configure the Proxy objects from the local.settings.json file.
+    with open('local.settings.json') as settings_file:
+        settings = json.load(settings_file)
+    FUNCTION_KEY = settings['Values']['FunctionAppKey']
+    MyCosmos = CosmosClient.from_connection_string(settings['Values']['AzureCosmosDBConnectionString']) # Cosmos Object
+    QuiplashProxy = MyCosmos.get_database_client(settings['Values']['DatabaseName']) # Proxy object for Quiplash database
+    PlayerContainerProxy = QuiplashProxy.get_container_client(settings['Values']['PlayerContainerName']) # Proxy obj for Player container
+
+    # Valid players
+    player_1 = player(player_proxy=PlayerContainerProxy,username="antoni_gn",password="ILoveTricia")
+    player_2 = player(player_proxy=PlayerContainerProxy,username="Jayranas",password="AA_Batteries")
+
+    # SetUp method executed before each test       
+    def setUp(self):
+        # Register the players
+        self.PlayerContainerProxy.create_item(self.player_1.to_dict())
+        self.PlayerContainerProxy.create_item(self.player_2.to_dict())
+
+    # tearDown method executed before each test
+    # @unittest.skip
+    def tearDown(self) -> None:
+        # Get rid of all the items inbetween tests.
+        for doc in self.PlayerContainerProxy.read_all_items():
+            self.PlayerContainerProxy.delete_item(item=doc,partition_key=doc['id'])
+
+    def get_stats(self, username):
+        # Read back a player's games_played and total_score
+        query = 'SELECT p.games_played, p.total_score FROM player p WHERE p.username = "{}"'.format(username)
+        query_result = list(self.PlayerContainerProxy.query_items(query=query, enable_cross_partition_query=True))
+        return query_result[0]
+
+
+    def test_update_room(self):
+        # Update both players' info, plus one that doesn't exist
+        dict_update = {"players": [{"username": "antoni_gn", "add_to_games_played": 1, "add_to_score" : 2600 },
+                                   {"username": "chaxluc09", "add_to_games_played": 1, "add_to_score" : 100 },
+                                   {"username": "Jayranas", "add_to_games_played": 1, "add_to_score" : -100 }]}
+        response = requests.put(self.TEST_URL,params={"code": self.FUNCTION_KEY},json=dict_update)
+
+        # Get json response, check the response code for brevity
+        self.assertEqual(200,response.status_code)
+        dict_response = response.json()   
+
+        # Check each update got the same response player/update would give.
+        self.assertEqual(dict_response,[{"result": True, "msg": "OK"},
+                                        {"result": False, "msg": "Player does not exist"},
+                                        {"result": True, "msg": "OK"}])
+
+        # Test the DB was correctly updated, negative scores are still capped at 0
+        self.assertEqual(self.get_stats("antoni_gn"),{"games_played": 1,"total_score": 2600})
+        self.assertEqual(self.get_stats("Jayranas"),{"games_played": 1,"total_score": 0})
+
+
+    def test_same_player_twice(self):
+        # Both updates of the same player are applied in order
+        dict_update = {"players": [{"username": "antoni_gn", "add_to_games_played": 1, "add_to_score" : 100 },
+                                   {"username": "antoni_gn", "add_to_games_played": -1, "add_to_score" : -300 }]}
+        response = requests.put(self.TEST_URL,params={"code": self.FUNCTION_KEY},json=dict_update)
+
+        # Get json response, check the response code for brevity
+        self.assertEqual(200,response.status_code)
+        self.assertEqual(response.json(),[{"result": True, "msg": "OK"}] * 2)
+
+        # Test the DB was correctly updated
+        self.assertEqual(self.get_stats("antoni_gn"),{"games_played": 1,"total_score": 0})
@@ -0,0 +1,98 @@
+import unittest
+import requests
+import json
+from azure.cosmos import CosmosClient
+from shared_code.player import player
+
+class test_prompt_create_batch(unittest.TestCase):
+    """
+    This test set focuses on testing the responses from the server on the PromptCreateBatch function.
+    """
+
+    # URLS to test on
+    LOCAL_DEV_URL = "http://localhost:7071/prompt/create_batch"
+    PUBLIC_URL = "https://quiplash-ag7g22.azurewebsites.net/prompt/create_batch"
+    TEST_URL = PUBLIC_URL
+
+    # Configure the Proxy objects from the local.settings.json file.
+    with open('local.settings.json') as settings_file:
+        settings = json.load(settings_file)
+    FUNCTION_KEY = settings['Values']['FunctionAppKey']
+    MyCosmos = CosmosClient.from_connection_string(settings['Values']['AzureCosmosDBConnectionString']) # Cosmos Object
+    QuiplashProxy = MyCosmos.get_database_client(settings['Values']['DatabaseName']) # Proxy object for Quiplash database
+    PlayerContainerProxy = QuiplashProxy.get_container_client(settings['Values']['PlayerContainerName']) # Proxy obj for Player container
+    PromptContainerProxy = QuiplashProxy.get_container_client(settings['Values']['PromptContainerName']) # Proxy obj for Prompt container
+
+    # Valid players
+    player_1 = player(player_proxy=PlayerContainerProxy,username="antoni_gn",password="ILoveTricia")
+    player_2 = player(player_proxy=PlayerContainerProxy,username="Jayranas",password="AA_Batteries")
+
+    # SetUp method executed before each test       
+    def setUp(self):
+        # Register the players
+        self.PlayerContainerProxy.create_item(self.player_1.to_dict())
+        self.PlayerContainerProxy.create_item(self.player_2.to_dict())
+
+    # tearDown method executed before each test
+    # @unittest.skip
+    def tearDown(self) -> None:
+        # Get rid of all the items inbetween tests.
+        for doc in self.PlayerContainerProxy.read_all_items():
+            self.PlayerContainerProxy.delete_item(item=doc,partition_key=doc['id'])
+        for doc in self.PromptContainerProxy.read_all_items():
+            self.PromptContainerProxy.delete_item(item=doc,partition_key=doc['username'])
+
+
+    def test_all_prompts_valid(self):
+        # Send valid prompts from two players
+        request = {"prompts": [{"text": "I'm Monkey D. Luffy and I'm going to be king of the pirates!", "username": "antoni_gn"},
+                               {"text": "Why the millenial crossed the avenue?", "username": "antoni_gn"},
+                               {"text": "Why the ka-boomer crossed the road?", "username": "Jayranas"}]}
+        response = requests.post(self.TEST_URL,params={"code": self.FUNCTION_KEY},json=request)
+
+        # Get json response, check the response code for brevity
+        self.assertEqual(200,response.status_code)
+        dict_response = response.json()
+
+        # Every prompt gets an OK response.
+        self.assertEqual(dict_response,[{"result": True, "msg": "OK"}] * 3)
+
+        # Test the DB was correctly updated, with every supported language
+        query = 'SELECT p.username, ARRAY_LENGTH(p.texts) AS languages FROM prompt p'
+        query_result = list(self.PromptContainerProxy.query_items(query=query, enable_cross_partition_query=True))
+        self.assertEqual(sorted(item['username'] for item in query_result),["Jayranas","antoni_gn","antoni_gn"])
+        self.assertTrue(all(item['languages'] == 6 for item in query_result))
+
+
+    def test_mixed_prompts(self):
+        # Send one prompt for each response, in the same order as prompt/create's tests
+        request = {"prompts": [{"text": "I'm Monkey D. Luffy and I'm going to be king of the pirates!", "username": "antoni_gn"},
+                               {"text": "I'm Monkey D. Luffy and I'm going to be king of the pirates!", "username": "potato"},
+                               {"text": "I'm Monkey D. Luffy", "username": "antoni_gn"},
+                               {"text": "海賊王におれはなる海賊王におれはなる海賊王におれはなる海賊王におれはなる", "username": "antoni_gn"},
+                               {"text": "1234", "username": "antoni_gn"}]}
+        response = requests.post(self.TEST_URL,params={"code": self.FUNCTION_KEY},json=request)
+
+        # Get json response, check the response code for brevity
+        self.assertEqual(200,response.status_code)
+        dict_response = response.json()
+
+        # Check each prompt got the same response prompt/create would give.
+        self.assertEqual(dict_response,[{"result": True, "msg": "OK"},
+                                        {"result": False, "msg": "Player does not exist"},
+                                        {"result": False, "msg": "Prompt less than 20 characters or more than 100 characters"},
+                                        {"result": False, "msg": "Unsupported language"},
+                                        {"result": False, "msg": "Unsupported language"}])
+
+        # Only the valid prompt was inserted.
+        query_result = list(self.PromptContainerProxy.read_all_items())
+        self.assertEqual(len(query_result),1)
+
+
+    def test_empty_batch(self):
+        # Send no prompts
+        response = requests.post(self.TEST_URL,params={"code": self.FUNCTION_KEY},json={"prompts": []})
+
+        # Get json response, check the response code for brevity
+        self.assertEqual(200,response.status_code)
+        self.assertEqual(response.json(),[])
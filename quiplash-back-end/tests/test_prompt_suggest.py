@@ -1,6 +1,7 @@
 import unittest
 import requests
 import json
+import time
 from shared_code.open_ai import open_ai
 
 class test_prompt_suggest(unittest.TestCase):
@@ -21,6 +22,9 @@ class test_prompt_suggest(unittest.TestCase):
     # Access to the OPENAI chatbot.
     openAiBot = open_ai() 
 
+    # Longest the background refill of a keyword in demand may take, it's polled for rather than waited on.
+    REFILL_SECONDS = 60
+
     # SetUp method executed before each test       
     def setUp(self):
         pass
@@ -47,6 +51,52 @@ class test_prompt_suggest(unittest.TestCase):
         self.assertLessEqual(len(dict_response['suggestion']),100)
 
 
+    def suggest(self, keyword):
+        # Send a valid suggestion, return it with where the server took it from ("pool" or "openai").
+        response = requests.post(self.TEST_URL,params={"code": self.FUNCTION_KEY},json={"keyword": keyword})
+        self.assertEqual(200,response.status_code)
+        suggestion = response.json()['suggestion']
+
+        # Pooled or not, it has the keyword inside and is in the character range 20-100
+        self.assertRegex(suggestion,keyword)
+        self.assertGreaterEqual(len(suggestion),20)
+        self.assertLessEqual(len(suggestion),100)
+        return suggestion, response.headers['X-Suggestion-Source']
+
+
+    def test_pooled_suggestions(self):
+        # Ask twice so the keyword is in demand, the pool then refills it in the background.
+        keyword = "pineapple"
+        for _ in range(2):
+            self.suggest(keyword)
+
+        # A generated suggestion only leaves its other candidates in the pool, so a longer run of pooled
+        # answers than that means the refill has landed.
+        candidates = int(self.settings['Values']['SuggestionCandidates'])
+        run = 0
+        deadline = time.monotonic() + self.REFILL_SECONDS
+        while run < candidates and time.monotonic() < deadline:
+            suggestion, source = self.suggest(keyword)
+            run = run + 1 if source == "pool" else 0
+            time.sleep(0.5)
+        self.assertGreaterEqual(run,candidates)
+
+
+    def test_candidates_kept_on_miss(self):
+        # Ask until the pool has nothing left for the keyword and the suggestion is generated there and then.
+        keyword = "volcano"
+        for _ in range(10):
+            generated, source = self.suggest(keyword)
+            if source == "openai":
+                break
+        self.assertEqual("openai",source)
+
+        # That call asked OpenAI for several candidates, the next ask gets another one of them from the pool.
+        suggestion, source = self.suggest(keyword)
+        self.assertEqual("pool",source)
+        self.assertNotEqual(generated,suggestion)
+
+
     # Hard to find a keyword for getting a wrong error, from the prompt given.
     @unittest.skip
     def test_bad_response(self):
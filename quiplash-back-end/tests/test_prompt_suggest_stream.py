@@ -0,0 +1,69 @@
+import unittest
+import requests
+import json
+from shared_code.open_ai import open_ai
+
+class test_prompt_suggest_stream(unittest.TestCase):
+    """
+    This test set focuses on testing the server-sent events from the server on the async PromptSuggestStream function.
+    """
+
+    # URLS to test on
+    LOCAL_DEV_URL = "http://localhost:7071/aio/prompt/suggest_stream"
+    PUBLIC_URL = "https://quiplash-ag7g22.azurewebsites.net/aio/prompt/suggest_stream"
+    TEST_URL = PUBLIC_URL
+
+    # Configure the Proxy objects from the local.settings.json file.
+    with open('local.settings.json') as settings_file:
+        settings = json.load(settings_file)
+    FUNCTION_KEY = settings['Values']['FunctionAppKey']
+
+    # Access to the OPENAI chatbot.
+    openAiBot = open_ai()
+
+    def get_events(self, keyword):
+        # Send a suggestion request and read the whole stream back.
+        response = requests.post(self.TEST_URL,params={"code": self.FUNCTION_KEY},json={"keyword": keyword},stream=True)
+        self.assertEqual(200,response.status_code)
+        self.assertTrue(response.headers['Content-Type'].startswith("text/event-stream"))
+        self.assertEqual("no-cache",response.headers['Cache-Control'])
+        body = response.content.decode("utf-8")
+
+        # Every event is an "event:" line then a "data:" line with a JSON object, and ends with a blank line.
+        self.assertTrue(body.endswith("\n\n"))
+        events = []
+        for block in body[:-2].split("\n\n"):
+            lines = block.split("\n")
+            self.assertEqual(2,len(lines))
+            self.assertTrue(lines[0].startswith("event: "))
+            self.assertTrue(lines[1].startswith("data: "))
+            events.append((lines[0][len("event: "):], json.loads(lines[1][len("data: "):])))
+        return events
+
+
+    def test_stream_framing(self):
+        keyword = "relationship"
+        events = self.get_events(keyword)
+        names = [name for name, _ in events]
+
+        # Tokens (and the keyword once it's appeared), then a single done at the end.
+        self.assertEqual("done",names[-1])
+        self.assertEqual(1,names.count("done"))
+        self.assertTrue(set(names[:-1]) <= {"token", "keyword"})
+        self.assertIn("token",names)
+
+        # The done event carries the whole suggestion, with the keyword inside and in the character range 20-100
+        _, done = events[-1]
+        self.assertTrue(done['valid'])
+        self.assertRegex(done['suggestion'],keyword)
+        self.assertGreaterEqual(len(done['suggestion']),20)
+        self.assertLessEqual(len(done['suggestion']),100)
+
+        # The keyword event is sent exactly once, after the token that completed it.
+        self.assertEqual(1,names.count("keyword"))
+        tokens_before_keyword = "".join(data['text'] for name, data in events[:names.index("keyword")] if name == "token")
+        self.assertIn(keyword,tokens_before_keyword)
+
+        # The tokens put together are the suggestion, before the quotes or whitespace around it are cleaned off.
+        tokens = "".join(data['text'] for name, data in events if name == "token")
+        self.assertEqual(done['suggestion'],self.openAiBot.clean_reply(tokens))
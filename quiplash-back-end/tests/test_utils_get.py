@@ -105,3 +105,26 @@ class test_utils_get(unittest.TestCase):
         dict_expected = [{'id': self.prompt_3.id, 'text': '¿Por qué el ka-boomer cruzó la calle?', 'username': 'Jayranas'}]
 
         self.assertEqual(dict_response,dict_expected)
+
+
+    def test_input_paged(self):
+        # Request player_1 and player_3's prompts one at a time, following the continuation tokens.
+        request = {"players" : ["antoni_gn","Jsidssjdisdfjsndsn"], "language": "en", "page_size": 1}
+        prompts = []
+        while True:
+            response = requests.get(self.TEST_URL,params={"code": self.FUNCTION_KEY},json=request)
+            self.assertEqual(200,response.status_code)
+            dict_response = response.json()
+
+            # Each page holds at most page_size prompts.
+            self.assertLessEqual(len(dict_response['prompts']),1)
+            prompts += dict_response['prompts']
+            if dict_response['continuation'] is None:
+                break
+            request['continuation'] = dict_response['continuation']
+
+        dict_expected = [{'id': self.prompt_1.id, 'text': 'The most useless Python one-line program', 'username': 'antoni_gn'}, 
+                         {'id': self.prompt_2.id, 'text': 'Why the millenial crossed the avenue?', 'username': 'antoni_gn'}, 
+                         {'id': self.prompt_4.id, 'text': 'Why the boomer crossed the road?', 'username': 'Jsidssjdisdfjsndsn'}]
+
+        self.assertCountEqual(prompts,dict_expected)
\ No newline at end of file
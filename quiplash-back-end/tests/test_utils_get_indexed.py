@@ -0,0 +1,110 @@
+import unittest
+import requests
+import json
+from azure.cosmos import CosmosClient
+
+from shared_code.player import player
+
+# Configure the Proxy objects from the local.settings.json file.
+with open('local.settings.json') as settings_file:
+    settings = json.load(settings_file)
+
+@unittest.skipUnless(settings['Values']['PromptIndexContainerName'], "PromptIndexContainerName isn't set, utils/get uses the JOIN query")
+class test_utils_get_indexed(unittest.TestCase):
+    """
+    This test set focuses on testing the responses from the server on the UtilsGet function when it reads the per-language prompt index.
+    Prompts are created and deleted through the server, which keeps the index up to date.
+    """
+
+    # URLS to test on
+    LOCAL_DEV_URL = "http://localhost:7071/utils/get"
+    PUBLIC_URL = "https://quiplash-ag7g22.azurewebsites.net/utils/get"
+    TEST_URL = PUBLIC_URL
+
+    # Need the create and delete URLs to write the prompts
+    LOCAL_CREATE_URL = "http://localhost:7071/prompt/create_batch"
+    PUBLIC_CREATE_URL = "https://quiplash-ag7g22.azurewebsites.net/prompt/create_batch"
+    TEST_CREATE_URL = PUBLIC_CREATE_URL
+    LOCAL_DELETE_URL = "http://localhost:7071/prompt/delete"
+    PUBLIC_DELETE_URL = "https://quiplash-ag7g22.azurewebsites.net/prompt/delete"
+    TEST_DELETE_URL = PUBLIC_DELETE_URL
+
+    FUNCTION_KEY = settings['Values']['FunctionAppKey']
+    MyCosmos = CosmosClient.from_connection_string(settings['Values']['AzureCosmosDBConnectionString']) # Cosmos Object
+    QuiplashProxy = MyCosmos.get_database_client(settings['Values']['DatabaseName']) # Proxy object for Quiplash database
+    PlayerContainerProxy = QuiplashProxy.get_container_client(settings['Values']['PlayerContainerName']) # Proxy obj for Player container
+    PromptContainerProxy = QuiplashProxy.get_container_client(settings['Values']['PromptContainerName']) # Proxy obj for Prompt container
+    PromptIndexContainerProxy = QuiplashProxy.get_container_client(settings['Values']['PromptIndexContainerName']) # Proxy obj for Prompt index container
+
+    # Valid players
+    player_1 = player(player_proxy=PlayerContainerProxy,username="antoni_gn",password="ILoveTricia")
+    player_2 = player(player_proxy=PlayerContainerProxy,username="Jayranas",password="AA_Batteries")
+
+    # SetUp method executed before each test
+    def setUp(self):
+        # Register the players, then create their prompts through the server so they are indexed.
+        self.PlayerContainerProxy.create_item(self.player_1.to_dict())
+        self.PlayerContainerProxy.create_item(self.player_2.to_dict())
+        request = {"prompts": [{"text": "The most useless Python one-line program", "username": "antoni_gn"},
+                               {"text": "Why the millenial crossed the avenue?", "username": "antoni_gn"},
+                               {"text": "Why the ka-boomer crossed the road?", "username": "Jayranas"}]}
+        response = requests.post(self.TEST_CREATE_URL,params={"code": self.FUNCTION_KEY},json=request)
+        self.assertEqual(response.json(),[{"result": True, "msg": "OK"}] * 3)
+
+    # tearDown method executed after each test
+    # @unittest.skip
+    def tearDown(self) -> None:
+        # Get rid of all the items inbetween tests.
+        for doc in self.PlayerContainerProxy.read_all_items():
+            self.PlayerContainerProxy.delete_item(item=doc,partition_key=doc['id'])
+        for doc in self.PromptContainerProxy.read_all_items():
+            self.PromptContainerProxy.delete_item(item=doc,partition_key=doc['username'])
+        for doc in self.PromptIndexContainerProxy.read_all_items():
+            self.PromptIndexContainerProxy.delete_item(item=doc,partition_key=doc['id'])
+
+    def get_prompts(self, request):
+        response = requests.get(self.TEST_URL,params={"code": self.FUNCTION_KEY},json=request)
+        self.assertEqual(200,response.status_code)
+        return response.json()
+
+    def get_prompts_paged(self, request):
+        # Paged requests still query the prompt container, so they show what the index should hold.
+        request = dict(request, page_size=100)
+        prompts = []
+        while True:
+            dict_response = self.get_prompts(request)
+            prompts += dict_response['prompts']
+            if dict_response['continuation'] is None:
+                return prompts
+            request['continuation'] = dict_response['continuation']
+
+
+    def test_input_with_prompts(self):
+        # Request player_1 and a player that doesn't exist in english, from the index.
+        request = {"players" : ["antoni_gn","Chaxluc09"], "language": "en"}
+        dict_response = self.get_prompts(request)
+
+        texts = [(item['text'], item['username']) for item in dict_response]
+        self.assertCountEqual(texts,[("The most useless Python one-line program", "antoni_gn"),
+                                     ("Why the millenial crossed the avenue?", "antoni_gn")])
+        self.assertCountEqual(dict_response,self.get_prompts_paged(request))
+
+
+    def test_input_translated(self):
+        # Every supported language is indexed, with the same prompts the prompt container holds.
+        for language in ["es", "ga", "hi", "zh-Hans", "pl"]:
+            request = {"players" : ["antoni_gn","Jayranas"], "language": language}
+            dict_response = self.get_prompts(request)
+            self.assertEqual(3,len(dict_response))
+            self.assertCountEqual(dict_response,self.get_prompts_paged(request))
+
+
+    def test_input_after_delete(self):
+        # Deleting a player's prompts removes them from the index too.
+        response = requests.post(self.TEST_DELETE_URL,params={"code": self.FUNCTION_KEY},json={"player": "antoni_gn"})
+        self.assertEqual(200,response.status_code)
+
+        request = {"players" : ["antoni_gn","Jayranas"], "language": "en"}
+        dict_response = self.get_prompts(request)
+        self.assertEqual([(item['text'], item['username']) for item in dict_response],[("Why the ka-boomer crossed the road?", "Jayranas")])
+        self.assertCountEqual(dict_response,self.get_prompts_paged(request))
@@ -6,6 +6,7 @@ from azure.ai.translation.text import TextTranslationClient
 from azure.core.credentials import AzureKeyCredential
 
 from shared_code.utils import utils
+from shared_code.player import player
 
 class test_utils_podium(unittest.TestCase):
     """
@@ -30,13 +31,17 @@ class test_utils_podium(unittest.TestCase):
     QuiplashProxy = MyCosmos.get_database_client(settings['Values']['DatabaseName']) # Proxy object for Quiplash database
     PlayerContainerProxy = QuiplashProxy.get_container_client(settings['Values']['PlayerContainerName']) # Proxy obj for Player container
     PromptContainerProxy = QuiplashProxy.get_container_client(settings['Values']['PromptContainerName']) # Proxy obj for Prompt container
+    LeaderboardContainerProxy = QuiplashProxy.get_container_client(settings['Values']['LeaderboardContainerName']) # Proxy obj for Leaderboard container
     TranslatorProxy = TextTranslationClient(endpoint=settings['Values']['TranslationEndpoint'], 
                                             credential=AzureKeyCredential(settings['Values']['TranslationKey'])) # proxy for Translator
     utility = utils()
 
     # SetUp method executed before each test       
     def setUp(self):
-        pass
+        # Players are inserted directly, so start with no leaderboard and let the app rebuild it.
+        # Each test then writes through the app before reading the podium, which drops the one the previous test cached.
+        for doc in self.LeaderboardContainerProxy.read_all_items():
+            self.LeaderboardContainerProxy.delete_item(item=doc,partition_key=doc['id'])
 
     # tearDown method executed before each test
     # @unittest.skip
@@ -85,6 +90,10 @@ class test_utils_podium(unittest.TestCase):
         self.PlayerContainerProxy.create_item({"id": "8", "username" : "banana_boi", "password": "ILoveTricia" , "games_played" : 10 , "total_score" : 40   })
         self.PlayerContainerProxy.create_item({"id": "9", "username" : "ghostlysandvich", "password": "ILoveTricia" , "games_played" : 10 , "total_score" : 40   })
         self.PlayerContainerProxy.create_item({"id": "10", "username" : "eddgerant", "password": "ILoveTricia" , "games_played" : 0 , "total_score" : 0   })
+
+        # A write through the app that changes nothing, only to drop any podium it still has cached.
+        response = requests.put(self.TEST_UPDATE_URL,params={"code": self.FUNCTION_KEY},json={"username": "eddgerant", "add_to_games_played": 0, "add_to_score" : 0 })
+        self.assertEqual(200,response.status_code)
         
         # Check if function responds.
         podium_response = requests.get(self.TEST_URL,params={"code": self.FUNCTION_KEY})
@@ -96,4 +105,41 @@ class test_utils_podium(unittest.TestCase):
                          'silver': [{'username': 'banana_boi', 'games_played': 10, 'total_score': 40}, {'username': 'ghostlysandvich', 'games_played': 10, 'total_score': 40}], 
                          'bronze': [{'username': 'eddgerant', 'games_played': 0, 'total_score': 0}]} 
         
-        self.assertEqual(expected_dict,actual_dict)
\ No newline at end of file
+        self.assertEqual(expected_dict,actual_dict)
+
+
+    def test_podium_etag(self):
+        # Register players, keyed by username like player/register does.
+        self.PlayerContainerProxy.create_item(player(self.PlayerContainerProxy,username="antoni_gn",password="ILoveTricia",games_played=10,total_score=80).to_dict())
+        self.PlayerContainerProxy.create_item(player(self.PlayerContainerProxy,username="Jayranas",password="AA_Batteries",games_played=10,total_score=40).to_dict())
+        self.PlayerContainerProxy.create_item(player(self.PlayerContainerProxy,username="Chaxluc09",password="CupheadRules",games_played=10,total_score=20).to_dict())
+
+        # A write through the app drops any podium it still has cached.
+        response = requests.put(self.TEST_UPDATE_URL,params={"code": self.FUNCTION_KEY},json={"username": "Chaxluc09", "add_to_games_played": 0, "add_to_score" : 0 })
+        self.assertEqual(200,response.status_code)
+
+        # The podium comes with an ETag.
+        podium_response = requests.get(self.TEST_URL,params={"code": self.FUNCTION_KEY})
+        self.assertEqual(200,podium_response.status_code)
+        etag = podium_response.headers['ETag']
+        self.assertEqual(podium_response.json()['gold'],[{'username': 'antoni_gn', 'games_played': 10, 'total_score': 80}])
+
+        # Sending it back gets an empty 304 while the podium is unchanged, weak or not.
+        for if_none_match in [etag, "W/" + etag, '"stale", ' + etag]:
+            not_modified = requests.get(self.TEST_URL,params={"code": self.FUNCTION_KEY},headers={"If-None-Match": if_none_match})
+            self.assertEqual(304,not_modified.status_code)
+            self.assertEqual(b"",not_modified.content)
+            self.assertEqual(etag,not_modified.headers['ETag'])
+
+        # Any other ETag gets the whole podium.
+        other_response = requests.get(self.TEST_URL,params={"code": self.FUNCTION_KEY},headers={"If-None-Match": '"stale"'})
+        self.assertEqual(200,other_response.status_code)
+        self.assertEqual(podium_response.json(),other_response.json())
+
+        # Once a player update changes the podium, the old ETag gets the new one.
+        response = requests.put(self.TEST_UPDATE_URL,params={"code": self.FUNCTION_KEY},json={"username": "Jayranas", "add_to_games_played": 0, "add_to_score" : 60 })
+        self.assertEqual(200,response.status_code)
+        changed_response = requests.get(self.TEST_URL,params={"code": self.FUNCTION_KEY},headers={"If-None-Match": etag})
+        self.assertEqual(200,changed_response.status_code)
+        self.assertNotEqual(etag,changed_response.headers['ETag'])
+        self.assertEqual(changed_response.json()['gold'],[{'username': 'Jayranas', 'games_played': 10, 'total_score': 100}])
\ No newline at end of file
@@ -18,6 +18,7 @@ let socketsToUsers = new Map(); // user's socket -> username
 
 let admin_name = null; // Storing the username of the admin
 let podium = null;
+let podium_etag = null; // ETag of the last podium, the back-end answers 304 while it's unchanged
 
 // Display client
 let display_client_socket = null;
@@ -257,19 +258,37 @@ async function startGameOver() {
   updateAll();
 }
 
-// Get the podium with the /utils/podium API function.
+// Get the podium with the /utils/podium API function, keeping the last one if it hasn't changed.
 async function getPodium() {
   console.log('Getting Podium...');
-  return await requestBackend('/utils/podium', 'POST', {});
+  const headers = { 'Content-Type': 'application/json' };
+  if (podium && podium_etag) {
+    headers['If-None-Match'] = podium_etag;
+  }
+  try {
+    const response = await fetch(BACKEND_ENDPOINT + '/utils/podium', { method: 'POST', headers: headers, body: JSON.stringify({}) });
+    if (response.status == 304) {
+      console.log('Success: podium unchanged');
+      return podium;
+    }
+    podium_etag = response.headers.get('ETag');
+    const data = await response.json();
+    console.log('Success:', data);
+    return data;
+  } catch (error) {
+    console.error('Error:', error);
+    throw error;
+  }
 }
 
 
-// Update everyone's scores to the database.
+// Update everyone's scores to the database in one /player/update_batch request.
 async function updateScoresToDB() {
+  const updates = [];
   for (const [username,user] of users) {
-    const json_body = {username: username , add_to_games_played: 1 , add_to_score : user.total_score }
-    await requestBackend('/player/update/', 'PUT', json_body);
+    updates.push({username: username , add_to_games_played: 1 , add_to_score : user.total_score });
   }
+  await requestBackend('/player/update_batch', 'PUT', {players: updates});
 }
 
 